@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""5つのパーサーの処理速度とメモリ使用量を、合成した入力で計測します。
+
+入力はsynth_captures.pyで同じseedから作りますので、何度実行しても同じ入力になります。
+ピークRSSを正しく測るため、パーサーごとに別のプロセスで計測します。
+
+計測する値
+
+  lines_per_sec     1秒あたりに処理した行数(repeat回のうち最速のもの)
+  records_per_sec   1秒あたりに出力したレコード数
+  peak_rss_kb       プロセスのピークRSS。入力の行のリストを含む
+  parse_rss_kb      結果をリストに溜めたときに増えたピークRSS
+  alloc_peak_kb     結果をリストに溜めたときの、tracemallocで測ったメモリ確保のピーク
+  alloc_blocks      結果をリストに溜めたときに増えたメモリブロック数(sys.getallocatedblocks)
+
+処理速度は結果を溜めずに読み捨てて測ります。
+
+CPythonには確保した回数の累計を得る方法がないので、確保量のピークと残ったブロック数で代わりとします。
+
+--saveで結果をベースラインとして保存し、次からは--compareでベースラインと比べます。
+処理速度が下がったり、メモリが増えたりしてthresholdを超えたら、終了コード1で終わります。
+ベースラインは計測したマシンでしか意味がありませんので、マシンごとに保存してください。
+
+Examples:
+  $ python bench/bench_parsers.py
+  $ python bench/bench_parsers.py --save bench/baseline.json
+  $ python bench/bench_parsers.py --compare bench/baseline.json
+  $ python bench/bench_parsers.py -c "show ip route" -n 1000000
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+
+def here(path=''):
+  """相対パスを絶対パスに変換して返却します"""
+  return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+if not here("../bin") in sys.path:
+  sys.path.append(here("../bin"))
+
+from synth_captures import GENERATORS, generate  # pylint: disable=wrong-import-position
+
+# 値が大きいほど良いもの。それ以外は小さいほど良い
+HIGHER_IS_BETTER = ("lines_per_sec", "records_per_sec")
+
+# ベースラインと比べる値
+COMPARED = ("lines_per_sec", "records_per_sec", "parse_rss_kb", "alloc_peak_kb")
+
+# コマンドごとの既定の件数。show interfacesは1ポートで約30行になるので少なめにする
+DEFAULT_SIZES = OrderedDict([
+  ("show ip route", 100000),
+  ("show interfaces", 2000),
+  ("show interfaces status", 20000),
+  ("show logging", 100000),
+  ("show cdp neighbors", 20000),
+])
+
+
+def max_rss_kb():
+  """このプロセスのピークRSSをKBで返却します。resourceがない環境では0を返却します"""
+  try:
+    import resource
+  except ImportError:
+    return 0
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # macOSはバイト、Linuxはキロバイト
+  return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def measure(command, n, seed, repeat):
+  """このプロセスでcommandのパーサーを計測し、結果を辞書型で返却します"""
+  import tracemalloc
+  from cisco_ios_session import CiscoIosSessionSplitter
+
+  _, func = CiscoIosSessionSplitter().find_command(command)
+  lines = list(generate(command, n, seed))
+  rss_before = max_rss_kb()
+
+  best = None
+  records = 0
+  for _ in range(repeat):
+    start = time.perf_counter()
+    records = sum(1 for _ in func(lines))
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  # 結果をリストに溜める使い方でのメモリを測る
+  results = list(func(lines))
+  rss_after = max_rss_kb()
+  del results
+
+  blocks = sys.getallocatedblocks()
+  tracemalloc.start()
+  results = list(func(lines))
+  _, alloc_peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  blocks = sys.getallocatedblocks() - blocks
+  del results
+
+  d = OrderedDict()
+  d["command"] = command
+  d["lines"] = len(lines)
+  d["records"] = records
+  d["sec"] = round(best, 4)
+  d["lines_per_sec"] = round(len(lines) / best)
+  d["records_per_sec"] = round(records / best)
+  d["peak_rss_kb"] = rss_after
+  d["parse_rss_kb"] = rss_after - rss_before
+  d["alloc_peak_kb"] = alloc_peak // 1024
+  d["alloc_blocks"] = blocks
+  return d
+
+
+def run_isolated(command, n, seed, repeat):
+  """別のプロセスでmeasure()を実行し、結果を辞書型で返却します"""
+  cmd = [sys.executable, __file__, "--worker", "-c", command, "-n", str(n), "--seed", str(seed), "--repeat", str(repeat)]
+  out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  return json.loads(out, object_pairs_hook=OrderedDict)
+
+
+def compare(results, baseline, threshold):
+  """ベースラインと比べて、(コマンド, 値の名前, ベースライン, 今回, 変化率, 悪化したか)のリストを返却します
+
+  >>> compare([{"command": "a", "lines_per_sec": 80, "records_per_sec": 100, "parse_rss_kb": 0, "alloc_peak_kb": 10}],
+  ...         {"results": {"a": {"lines_per_sec": 100, "records_per_sec": 100, "parse_rss_kb": 0, "alloc_peak_kb": 10}}}, 0.1)[0]
+  ('a', 'lines_per_sec', 100, 80, -0.2, True)
+  """
+  rows = []
+  for d in results:
+    base = baseline.get("results", {}).get(d["command"])
+    # 入力の行数が違えば比べられない
+    if not base or base.get("lines", d.get("lines")) != d.get("lines"):
+      continue
+    for key in COMPARED:
+      old, new = base.get(key), d.get(key)
+      if old is None or new is None:
+        continue
+      change = (new - old) / old if old else 0.0
+      worse = -change if key in HIGHER_IS_BETTER else change
+      # RSSの増分は数百KB単位でぶれるので、1MB未満の増加は悪化とみなさない
+      if key == "parse_rss_kb" and new - old < 1024:
+        worse = 0.0
+      rows.append((d["command"], key, old, new, round(change, 3), worse > threshold))
+  return rows
+
+
+def environment():
+  """結果を比べるときの前提となる実行環境"""
+  d = OrderedDict()
+  d["python"] = platform.python_version()
+  d["implementation"] = platform.python_implementation()
+  d["machine"] = platform.machine()
+  d["node"] = platform.node()
+  return d
+
+
+def main():
+  """メイン関数
+
+  Returns:
+    int -- 正常終了は0、ベースラインより悪化したら1を返却
+  """
+
+  # 引数処理
+  parser = argparse.ArgumentParser(description='benchmark all show command parsers on synthesized input.')
+  parser.add_argument('-c', '--command', action='append', choices=list(GENERATORS), help='Parser to benchmark (default: all)')
+  parser.add_argument('-n', type=int, help='Number of records to synthesize for every parser (default: per parser)')
+  parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  parser.add_argument('--repeat', type=int, default=5, help='Runs per parser, the fastest is reported (default: 5)')
+  parser.add_argument('--save', metavar='baseline.json', help='Save results as a baseline')
+  parser.add_argument('--compare', metavar='baseline.json', help='Compare results with a baseline')
+  parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression ratio (default: 0.2)')
+  parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+
+  commands = args.command or list(GENERATORS)
+
+  if args.worker:
+    print(json.dumps(measure(commands[0], args.n or DEFAULT_SIZES[commands[0]], args.seed, args.repeat)))
+    return 0
+
+  results = []
+  print("{0:<24}{1:>10}{2:>10}{3:>14}{4:>14}{5:>12}{6:>12}{7:>12}{8:>12}".format(
+    "command", "lines", "records", "lines/sec", "records/sec", "peak RSS KB", "parse RSS", "alloc KB", "blocks"))
+  for command in commands:
+    d = run_isolated(command, args.n or DEFAULT_SIZES[command], args.seed, args.repeat)
+    results.append(d)
+    print("{command:<24}{lines:>10}{records:>10}{lines_per_sec:>14,}{records_per_sec:>14,}{peak_rss_kb:>12,}{parse_rss_kb:>12,}{alloc_peak_kb:>12,}{alloc_blocks:>12,}".format(**d))
+
+  status = 0
+  if args.compare:
+    with open(args.compare, encoding="utf-8") as f:
+      baseline = json.load(f)
+    for d in results:
+      base = baseline.get("results", {}).get(d["command"])
+      if base and base.get("lines") != d["lines"]:
+        print("warning: {0} was measured on {1} lines in the baseline, skipped".format(d["command"], base.get("lines")))
+    print()
+    for command, key, old, new, change, regressed in compare(results, baseline, args.threshold):
+      print("{0:<24}{1:<18}{2:>14,}{3:>14,}{4:>+9.1%}{5}".format(command, key, old, new, change, "  REGRESSION" if regressed else ""))
+      if regressed:
+        status = 1
+
+  if args.save:
+    baseline = OrderedDict()
+    baseline["n"] = args.n
+    baseline["seed"] = args.seed
+    baseline["environment"] = environment()
+    baseline["results"] = OrderedDict((d["command"], d) for d in results)
+    with open(args.save, mode="w", encoding="utf-8") as f:
+      json.dump(baseline, f, indent=2)
+    print("saved baseline to {0}".format(args.save))
+
+  return status
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""CiscoIosShowLoggingParserの処理速度を計測します。
+
+testdata/show_logging.logの行を繰り返して、指定した行数の入力を作ります。
+入力はジェネレータで作りますので、何千万行を指定してもメモリは消費しません。
+
+比較のために、トークンごとに正規表現を適用していた以前の実装(6回マッチ)も計測できます。
+--bytesを付けると、デコードしていないbytesの行をparse_bytes()でパースする場合も計測します。
+
+Examples:
+  $ python bench/bench_show_logging.py
+  $ python bench/bench_show_logging.py -n 20000000 --legacy
+  $ python bench/bench_show_logging.py --bytes
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import argparse
+import itertools
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+
+def here(path=''):
+  """相対パスを絶対パスに変換して返却します"""
+  return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+if not here("../bin") in sys.path:
+  sys.path.append(here("../bin"))
+
+from cisco_ios_show_logging import CiscoIosShowLoggingParser  # pylint: disable=wrong-import-position
+
+
+class LegacyShowLoggingParser(object):
+  """比較用。トークンごとに正規表現を適用していた以前の実装です。"""
+
+  def __init__(self):
+    self.token_dict = OrderedDict()
+    self.token_dict["date"] = re.compile(r"^(\S.*): %.*-\d-.*: .*$")
+    self.token_dict["facility"] = re.compile(r"^\S.*: %(\S+)-\d-.*: .*$")
+    self.token_dict["severity"] = re.compile(r"^\S.*: %.*-(\d)-.*: .*$")
+    self.token_dict["mnemonic"] = re.compile(r"^\S.*: %.*-\d-(\S+): .*$")
+    self.token_dict["description"] = re.compile(r"^\S.*: %.*-\d-.*: (.*)$")
+
+  def parse(self, lines):
+    rex_log = re.compile(r"^\S.*: (%.*-\d-.*): .*")
+    for line in lines:
+      line = line.rstrip()
+      if rex_log.match(line):
+        d = OrderedDict()
+        for k, v in self.token_dict.items():
+          match = v.match(line)
+          if match:
+            d[k] = match.group(1)
+        yield d
+
+
+def scaled_lines(filename, num_lines):
+  """filenameの行を繰り返してnum_lines行をyieldします"""
+  with open(filename, mode="r", encoding="utf-8") as f:
+    lines = [x.rstrip() for x in f]
+  return itertools.islice(itertools.cycle(lines), num_lines)
+
+
+def scaled_byte_lines(filename, num_lines):
+  """filenameの行をbytesのまま繰り返してnum_lines行をyieldします"""
+  with open(filename, mode="rb") as f:
+    lines = [x.rstrip() for x in f]
+  return itertools.islice(itertools.cycle(lines), num_lines)
+
+
+def bench(name, parser, filename, num_lines, use_bytes=False):
+  """parserでnum_lines行をパースして、所要時間と行数/秒を表示します"""
+  num_records = 0
+  if use_bytes:
+    records = parser.parse_bytes(scaled_byte_lines(filename, num_lines))
+  else:
+    records = parser.parse(scaled_lines(filename, num_lines))
+  start = time.perf_counter()
+  for _d in records:
+    num_records += 1
+  elapsed = time.perf_counter() - start
+  print("{0:>8} : {1:,} lines, {2:,} records, {3:.2f} sec, {4:,.0f} lines/sec".format(
+    name, num_lines, num_records, elapsed, num_lines / elapsed))
+  return elapsed
+
+
+def main():
+  """メイン関数"""
+  parser = argparse.ArgumentParser(description='benchmark CiscoIosShowLoggingParser.')
+  parser.add_argument('-n', '--lines', dest='num_lines', type=int, default=10000000, help='number of input lines (default: 10000000)')
+  parser.add_argument('--legacy', action='store_true', help='also measure the previous 6-regex implementation')
+  parser.add_argument('--bytes', action='store_true', help='also measure parse_bytes() over undecoded lines')
+  parser.add_argument('input_filename', nargs='?', default=here("../testdata/show_logging.log"), help='log file to be repeated')
+  args = parser.parse_args()
+
+  elapsed = bench("combined", CiscoIosShowLoggingParser(), args.input_filename, args.num_lines)
+  if args.legacy:
+    legacy_elapsed = bench("legacy", LegacyShowLoggingParser(), args.input_filename, args.num_lines)
+    print("speedup : {0:.2f}x".format(legacy_elapsed / elapsed))
+  if args.bytes:
+    bytes_elapsed = bench("bytes", CiscoIosShowLoggingParser(), args.input_filename, args.num_lines, use_bytes=True)
+    print("speedup : {0:.2f}x".format(elapsed / bytes_elapsed))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
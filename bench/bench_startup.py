@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""bin/のモジュールのインポート時間と、スクリプトの起動時間を計測します。
+
+モジュールごとに別のプロセスで python -X importtime -c "import モジュール" を実行し、
+そのモジュールのインポートにかかった時間(依存するモジュールを含む)を読み取ります。
+スクリプトは python bin/スクリプト --help が終わるまでの時間を計ります。
+
+どちらもrepeat回のうち最速のものを使います。
+.pycがないとソースのコンパイル時間まで含まれてしまうので、一時ディレクトリにバイトコードを書き出して、
+1回空実行してから計測します。PYTHONDONTWRITEBYTECODEが設定されていても同じです。
+
+インポート時間がtarget(ミリ秒)を超えたモジュールか、
+起動時間がscript_target(ミリ秒)を超えたスクリプトがあれば、終了コード1で終わります。
+スクリプトの起動時間にはインタプリタ自身の起動とargparseなどの標準ライブラリのインポートも含まれますので、
+script_targetはtargetより大きくしてあります。
+時間はマシンに依存しますので、どちらもマシンに合わせて指定してください。
+
+計測する値
+
+  import_ms    モジュールのインポートにかかった時間。依存するモジュールを含む
+  self_ms      そのうちモジュール自身の実行にかかった時間
+  heaviest     一番時間のかかった依存モジュールとその時間
+
+Examples:
+  $ python bench/bench_startup.py
+  $ python bench/bench_startup.py --target 40 --script-target 80 --repeat 10
+  $ python bench/bench_startup.py -m cisco_ios_show_logging --tree
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+
+def here(path=''):
+  """相対パスを絶対パスに変換して返却します"""
+  return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+# 計測するモジュール。パーサーと、ライブラリとして使われるもの
+MODULES = [
+  "cisco_ios_show_interfaces",
+  "cisco_ios_show_interfaces_status",
+  "cisco_ios_show_cdp_neighbors",
+  "cisco_ios_show_ip_route",
+  "cisco_ios_show_logging",
+  "cisco_ios_session",
+  "cisco_ios_sink",
+]
+
+# 起動時間を計測するスクリプト
+SCRIPTS = [
+  "cisco_ios_show_interfaces.py",
+  "cisco_ios_show_interfaces_status.py",
+  "cisco_ios_show_cdp_neighbors.py",
+  "cisco_ios_show_ip_route.py",
+  "cisco_ios_show_logging.py",
+]
+
+# import time:       self [us] | cumulative | imported package
+rex_importtime = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(text):
+  """-X importtimeの出力を(名前, 深さ, self_us, cumulative_us)のリストにして返却します
+
+  >>> parse_importtime("import time: self [us] | cumulative | imported package\\nimport time:       120 |        120 |   json.decoder\\nimport time:       300 |        420 | json")
+  [('json.decoder', 1, 120, 120), ('json', 0, 300, 420)]
+  """
+  rows = []
+  for line in text.splitlines():
+    m = rex_importtime.match(line)
+    if m:
+      rows.append((m.group(4), (len(m.group(3)) - 1) // 2, int(m.group(1)), int(m.group(2))))
+  return rows
+
+
+def python_env(pycache_dir):
+  """バイトコードを一時ディレクトリに書き出し、bin/からインポートできる環境変数を返却します"""
+  env = dict(os.environ)
+  env.pop("PYTHONDONTWRITEBYTECODE", None)
+  env["PYTHONPYCACHEPREFIX"] = pycache_dir
+  env["PYTHONPATH"] = os.pathsep.join([here("../bin")] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+  return env
+
+
+def measure_import(module, env, repeat):
+  """moduleのインポート時間を計測し、辞書型と最速だったときの-X importtimeの出力を返却します"""
+  cmd = [sys.executable, "-X", "importtime", "-c", "import " + module]
+  best = None
+  for i in range(repeat + 1):
+    text = subprocess.run(cmd, env=env, check=True, stderr=subprocess.PIPE, universal_newlines=True).stderr
+    # 1回目は.pycを作るための空実行
+    if i == 0:
+      continue
+    rows = parse_importtime(text)
+    top = [r for r in rows if r[0] == module and r[1] == 0][-1]
+    if best is None or top[3] < best[0][3]:
+      best = (top, rows, text)
+
+  top, rows, text = best
+  deps = [r for r in rows if r[0] != module]
+  heaviest = max(deps, key=lambda r: r[3]) if deps else ("", 0, 0, 0)
+
+  d = OrderedDict()
+  d["module"] = module
+  d["import_ms"] = round(top[3] / 1000, 2)
+  d["self_ms"] = round(top[2] / 1000, 2)
+  d["heaviest"] = heaviest[0]
+  d["heaviest_ms"] = round(heaviest[3] / 1000, 2)
+  return d, text
+
+
+def measure_script(script, env, repeat):
+  """python bin/script --helpの実行時間を計測し、最速のミリ秒を返却します"""
+  cmd = [sys.executable, here(os.path.join("../bin", script)), "--help"]
+  best = None
+  for i in range(repeat + 1):
+    start = time.perf_counter()
+    subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    if i == 0:
+      continue
+    best = elapsed if best is None else min(best, elapsed)
+  return round(best * 1000, 2)
+
+
+def main():
+  """メイン関数
+
+  Returns:
+    int -- 正常終了は0、インポート時間がtargetを超えるか、起動時間がscript_targetを超えたら1を返却
+  """
+
+  # 引数処理
+  parser = argparse.ArgumentParser(description='measure import time of bin/ modules and startup time of the scripts.')
+  parser.add_argument('-m', '--module', action='append', help='Module to measure (default: parsers, session and sink)')
+  parser.add_argument('--repeat', type=int, default=5, help='Runs per module, the fastest is reported (default: 5)')
+  parser.add_argument('--target', type=float, default=50.0, help='Fail if a module takes longer to import in ms (default: 50)')
+  parser.add_argument('--script-target', type=float, default=100.0, help='Fail if a script takes longer to print --help in ms (default: 100)')
+  parser.add_argument('--no-scripts', dest='scripts', action='store_false', help='Do not measure script startup')
+  parser.add_argument('--tree', action='store_true', help='Print the -X importtime output of the fastest run')
+  parser.add_argument('--json', metavar='startup.json', help='Write the results as JSON')
+  args = parser.parse_args()
+
+  pycache_dir = tempfile.mkdtemp(prefix="bench_startup_")
+  try:
+    env = python_env(pycache_dir)
+
+    # 比べるための、インタプリタだけの起動時間
+    baseline = measure_import("site", env, args.repeat)[0]
+
+    status = 0
+    results = []
+    print("{0:<36}{1:>12}{2:>10}  {3}".format("module", "import_ms", "self_ms", "heaviest"))
+    for module in args.module or MODULES:
+      d, text = measure_import(module, env, args.repeat)
+      d["over_target"] = d["import_ms"] > args.target
+      results.append(d)
+      print("{module:<36}{import_ms:>12.2f}{self_ms:>10.2f}  {heaviest} ({heaviest_ms:.2f})".format(**d) + ("  OVER TARGET" if d["over_target"] else ""))
+      if args.tree:
+        print(text)
+      if d["over_target"]:
+        status = 1
+
+    scripts = OrderedDict()
+    if args.scripts and not args.module:
+      print()
+      print("{0:<36}{1:>12}".format("script --help", "wall_ms"))
+      for script in SCRIPTS:
+        scripts[script] = measure_script(script, env, args.repeat)
+        over_target = scripts[script] > args.script_target
+        print("{0:<36}{1:>12.2f}".format(script, scripts[script]) + ("  OVER TARGET" if over_target else ""))
+        if over_target:
+          status = 1
+
+    print()
+    print("site (interpreter startup) {0:.2f} ms, target {1:.0f} ms, script target {2:.0f} ms".format(baseline["import_ms"], args.target, args.script_target))
+
+    if args.json:
+      report = OrderedDict()
+      report["python"] = sys.version.split()[0]
+      report["target_ms"] = args.target
+      report["script_target_ms"] = args.script_target
+      report["modules"] = results
+      report["scripts"] = scripts
+      with open(args.json, mode="w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+  finally:
+    shutil.rmtree(pycache_dir, ignore_errors=True)
+
+  return status
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""ベンチマーク用に、showコマンドの出力を指定した規模で合成します。
+
+testdata/のファイルは小さいので、性能の確認には足りません。
+ここでは実機の出力と同じ書式の行を、指定した件数だけ作ります。
+
+  show ip route          フルテーブル規模の経路。/8ごとのsubnetted、variably subnettedの見出し、ECMPの継続行を含む
+  show interfaces        シャーシ規模の物理インタフェースと、Port-channel、SVI
+  show interfaces status show interfacesと同じポート構成の一覧
+  show logging           リンクのup/down、EtherChannel、STP、OSPFなどのメッセージ
+  show cdp neighbors     17文字を超えるデバイスIDは2行に折り返す
+
+同じseedからは常に同じ出力になりますので、ベンチマークの結果を比較できます。
+行はジェネレータで作りますので、件数を大きくしてもメモリは増えません。
+
+Examples:
+  $ python bench/synth_captures.py "show ip route" -n 1000000 -o route.log
+  $ python bench/synth_captures.py "show logging" -n 100000 | head
+
+  >>> lines = list(generate("show interfaces status", 3))
+  >>> lines[-4]
+  'Te1/1/1                          notconnect   254          full    10G 10GBase-SR'
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import datetime
+import random
+from collections import OrderedDict
+
+HOSTNAME = "S-Cat6880X-01"
+
+#
+# 関数定義
+#
+
+def header(command, now="10:52:36.678 JST Wed Apr 20 2016"):
+  """プロンプトとコマンド、負荷とNTPの行をyieldします"""
+  yield "%s#%s" % (HOSTNAME, command)
+  yield "Load for five secs: 4%/0%; one minute: 6%; five minutes: 6%"
+  yield "Time source is NTP, %s" % now
+  yield ""
+
+
+def interface_names(n):
+  """シャーシ規模の物理インタフェース名を(長い名前, 短い名前, 速度)でn個yieldします。
+  スロットあたり16ポート、3スロットごとに1Gと10Gを交互に並べます
+  """
+  for i in range(n):
+    slot, port = divmod(i, 16)
+    switch, module = divmod(slot, 6)
+    if module % 3 == 2:
+      yield "GigabitEthernet%d/%d/%d" % (switch + 1, module + 1, port + 1), "Gi%d/%d/%d" % (switch + 1, module + 1, port + 1), "1000"
+    else:
+      yield "TenGigabitEthernet%d/%d/%d" % (switch + 1, module + 1, port + 1), "Te%d/%d/%d" % (switch + 1, module + 1, port + 1), "10G"
+
+
+def port_states(n, seed=0):
+  """interface_names()と同じ順に、(長い名前, 短い名前, 速度, 状態, 説明, VLAN)をn個yieldします"""
+  rnd = random.Random(seed)
+  for name, short, speed in interface_names(n):
+    r = rnd.random()
+    if r < 0.55:
+      status = "connected"
+    elif r < 0.85:
+      status = "notconnect"
+    elif r < 0.97:
+      status = "disabled"
+    else:
+      status = "err-disabled"
+    description = "core-sw%02d %s" % (rnd.randint(1, 40), short) if status == "connected" else ""
+    vlan = rnd.choice(["trunk", "1", "10", "20", "102", "129", "254", "999"])
+    yield name, short, speed, status, description, vlan
+
+
+def gen_show_interfaces_status(n, seed=0):
+  """show interfaces statusの出力をyieldします。nはポート数です"""
+  for line in header("show int status"):
+    yield line
+  yield ""
+  yield "Port          Name               Status       Vlan       Duplex  Speed Type"
+  for _, short, speed, status, description, vlan in port_states(n, seed):
+    if speed == "10G":
+      duplex, speed_col, media = "full", "10G", "10GBase-SR"
+    else:
+      duplex, speed_col, media = "a-full", "a-1000", "10/100/1000BaseT"
+    if status != "connected":
+      duplex, speed_col = ("full", speed) if speed == "10G" else ("auto", "auto")
+    yield "%-14s%-19s%-13s%-11s%6s %6s %s" % (short, description[:18], status, vlan, duplex, speed_col, media)
+  yield "%s#" % HOSTNAME
+
+
+def gen_show_interfaces(n, seed=0):
+  """show interfacesの出力をyieldします。nは物理ポート数で、Port-channelとSVIをその1/8ずつ加えます"""
+  rnd = random.Random(seed)
+  for line in header("show interfaces "):
+    yield line
+
+  def block(name, hardware, status, protocol, description, bw, media):
+    mac = "d072.dc%02x.%04x" % (rnd.randint(0, 255), rnd.randint(0, 0xffff))
+    yield "%s is %s, line protocol is %s" % (name, status, protocol)
+    yield "  Hardware is %s, address is %s (bia %s)" % (hardware, mac, mac)
+    if description:
+      yield "  Description: %s" % description
+    yield "  MTU 1500 bytes, BW %d Kbit, DLY 10 usec, " % bw
+    yield "     reliability 255/255, txload %d/255, rxload %d/255" % (rnd.randint(1, 30), rnd.randint(1, 30))
+    yield "  Encapsulation ARPA, loopback not set"
+    yield "  Keepalive set (10 sec)"
+    if media:
+      yield "  Full-duplex, %s, media type is %s" % ("10Gb/s" if bw >= 10000000 else "1000Mb/s", media)
+      yield "  input flow-control is off, output flow-control is off"
+      yield "  Clock mode is auto"
+    yield "  ARP type: ARPA, ARP Timeout 04:00:00"
+    yield "  Last input never, output 00:00:%02d, output hang never" % rnd.randint(0, 59)
+    yield '  Last clearing of "show interface" counters 39w2d'
+    yield "  Input queue: 0/2000/0/0 (size/max/drops/flushes); Total output drops: %d" % rnd.choice([0, 0, 0, rnd.randint(1, 100000)])
+    yield "  Queueing strategy: fifo"
+    yield "  Output queue: 0/40 (size/max)"
+    rate_in, rate_out = rnd.randint(0, 10 ** 9), rnd.randint(0, 10 ** 9)
+    yield "  5 minute input rate %d bits/sec, %d packets/sec" % (rate_in, rate_in // 8000)
+    yield "  5 minute output rate %d bits/sec, %d packets/sec" % (rate_out, rate_out // 8000)
+    pkts_in, pkts_out = rnd.randint(0, 10 ** 11), rnd.randint(0, 10 ** 11)
+    yield "     %d packets input, %d bytes, 0 no buffer" % (pkts_in, pkts_in * 250)
+    yield "     Received %d broadcasts (%d multicasts)" % (pkts_in // 10000, pkts_in // 10000)
+    yield "     0 runts, 0 giants, 0 throttles"
+    yield "     %d input errors, %d CRC, 0 frame, 0 overrun, 0 ignored" % ((rnd.randint(0, 50),) * 2)
+    yield "     0 watchdog, 0 multicast, 0 pause input"
+    yield "     0 input packets with dribble condition detected"
+    yield "     %d packets output, %d bytes, 0 underruns" % (pkts_out, pkts_out * 400)
+    yield "     0 output errors, 0 collisions, %d interface resets" % rnd.randint(0, 5)
+    yield "     0 babbles, 0 late collision, 0 deferred"
+    yield "     0 lost carrier, 0 no carrier, 0 PAUSE output"
+    yield "     0 output buffer failures, 0 output buffers swapped out"
+
+  for name, _, speed, status, description, _ in port_states(n, seed):
+    if status == "connected":
+      state, protocol = "up", "up (connected)"
+    elif status == "disabled":
+      state, protocol = "administratively down", "down (disabled)"
+    else:
+      state, protocol = "down", "down (%s)" % status
+    if speed == "10G":
+      lines = block(name, "C6k 10000Mb 802.3", state, protocol, description, 10000000, "10GBase-SR")
+    else:
+      lines = block(name, "C6k 1000Mb 802.3", state, protocol, description, 1000000, "1000BaseT")
+    for line in lines:
+      yield line
+
+  for i in range(max(n // 8, 1)):
+    for line in block("Port-channel%d" % (i + 1), "EtherChannel", "up", "up (connected)", "po to core-sw%02d" % (i % 40 + 1), 20000000, ""):
+      yield line
+  for i in range(max(n // 8, 1)):
+    for line in block("Vlan%d" % (i + 100), "EtherSVI", "up", "up", "", 1000000, ""):
+      yield line
+  yield "%s#" % HOSTNAME
+
+
+LOG_TEMPLATES = [
+  (30, "%LINK-SW1-3-UPDOWN: Interface {long}, changed state to {state}"),
+  (30, "%LINEPROTO-SW1-5-UPDOWN: Line protocol on Interface {long}, changed state to {state}"),
+  (10, "%EC-SW1-5-UNBUNDLE: Interface {long} left the port-channel Port-channel{po}"),
+  (10, "%EC-SW1-5-BUNDLE: Interface {long} joined port-channel Port-channel{po}"),
+  (10, "%EC-SW2_STBY-5-BUNDLE: Interface {long} joined port-channel Port-channel{po}"),
+  (8, "%SPANTREE-SW1-6-PORT_STATE: Port Po{po} instance {vlan} moving from forwarding to disabled"),
+  (4, "%OSPF-SW1-5-ADJCHG: Process 1, Nbr 10.245.{a}.{b} on Vlan{vlan} from FULL to DOWN, Neighbor Down: Dead timer expired"),
+  (3, "%LINK-SW1-5-CHANGED: Interface {long}, changed state to administratively down"),
+  (2, "%SYS-SW1-5-CONFIG_I: Configured from console by admin on vty0 (10.245.{a}.{b})"),
+  (1, "%EARL_CM-SW1_DFC1-5-CL_TCAM1_ERROR: Cl TCAM1 parity error detected and corrected"),
+]
+
+
+def gen_show_logging(n, seed=0, start=datetime.datetime(2016, 9, 5, 0, 0, 0)):
+  """show loggingの出力をyieldします。nはメッセージ数です"""
+  rnd = random.Random(seed)
+  weights = [w for w, _ in LOG_TEMPLATES]
+  templates = [t for _, t in LOG_TEMPLATES]
+  ports = [name for name, _, _ in interface_names(96)]
+
+  for line in header("show logging ", "21:43:54.916 JST Sun Jan 10 2016"):
+    yield line
+  yield "Syslog logging: enabled (0 messages dropped, 103 messages rate-limited, 0 flushes, 0 overruns, xml disabled, filtering disabled)"
+  yield ""
+  yield "    Trap logging: level informational, %d message lines logged" % n
+  yield ""
+  yield "Log Buffer (%d bytes):" % (n * 100)
+  yield ""
+
+  t = start
+  for template in rnd.choices(templates, weights, k=n):
+    t += datetime.timedelta(milliseconds=rnd.randint(1, 60000))
+    stamp = "%s %2d %s.%03d" % (t.strftime("%b"), t.day, t.strftime("%H:%M:%S"), t.microsecond // 1000)
+    message = template.format(long=rnd.choice(ports), state=rnd.choice(["up", "down"]), po=rnd.randint(1, 128),
+                              vlan=rnd.randint(1, 999), a=rnd.randint(0, 255), b=rnd.randint(1, 254))
+    yield "%s: %s" % (stamp, message)
+  yield "%s#" % HOSTNAME
+
+
+def gen_show_cdp_neighbors(n, seed=0):
+  """show cdp neighborsの出力をyieldします。nはネイバー数で、デバイスIDが17文字を超えるものは2行に折り返します"""
+  rnd = random.Random(seed)
+  for line in header("show cdp ne"):
+    yield line
+  yield "Capability Codes: R - Router, T - Trans Bridge, B - Source Route Bridge"
+  yield "                  S - Switch, H - Host, I - IGMP, r - Repeater, P - Phone, "
+  yield "                  D - Remote, C - CVTA, M - Two-port Mac Relay "
+  yield ""
+  yield "Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID"
+
+  models = [("S-Cat3750X-%02dStack", "WS-C3750X", "R T S I"), ("S-Cat4500X-%02dVSS", "WS-C4500X", "R S I"),
+            ("S-Cat3850-%02dStack", "WS-C3850-", "R S I"), ("AP%02d", "AIR-AP280", "T B I")]
+  for i, (_, short, _) in enumerate(interface_names(n)):
+    name_format, platform, capability = rnd.choice(models)
+    device_id = name_format % rnd.randint(1, 99)
+    local = "Ten " + short[2:] if short.startswith("Te") else "Gig " + short[2:]
+    remote = "Ten %d/1/%d" % (rnd.randint(1, 2), rnd.randint(1, 8))
+    body = "%-18s%-11s%11s %-10s%s" % (local, rnd.randint(120, 180), capability, platform, remote)
+    if len(device_id) > 16:
+      yield device_id
+      yield " " * 17 + body
+    else:
+      yield "%-17s%s" % (device_id, body)
+  yield ""
+  yield "Total cdp entries displayed : %d" % n
+  yield "%s#" % HOSTNAME
+
+
+def gen_show_ip_route(n, seed=0, ecmp=0.1):
+  """show ip routeの出力をyieldします。nは経路数で、ecmpの割合の経路には継続行で別の経路を加えます
+
+  経路は/8ごとにまとめ、/24だけのものは"is subnetted"、マスク長が混在するものは"is variably subnetted"の見出しを付けます。
+  """
+  rnd = random.Random(seed)
+  for line in header("show ip route"):
+    yield line
+  yield "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP"
+  yield "       D - EIGRP, EX - EIGRP external, O - OSPF, IA - OSPF inter area "
+  yield ""
+  yield "Gateway of last resort is 10.245.2.2 to network 0.0.0.0"
+  yield ""
+  yield "S*    0.0.0.0/0 [252/0] via 10.245.2.2, Vlan102"
+
+  protos = ["O E1", "O E2", "O IA", "O", "D EX", "D", "S"]
+  gateways = ["10.245.%d.%d" % (i, i + 1) for i in range(2, 10)]
+  remaining = n
+  major = 0
+  while remaining > 0:
+    first = 11 + major // 256
+    second = major % 256
+    major += 1
+    # /24だけなら1つの/16に256経路まで、マスク長が混在するなら/28単位で4096経路まで
+    variable = rnd.random() < 0.5
+    size = min(remaining, rnd.randint(50, 2000) if variable else rnd.randint(50, 256))
+    remaining -= size
+    prefixes = sorted(rnd.sample(range(4096 if variable else 256), size))
+
+    if variable:
+      yield "      %d.%d.0.0/16 is variably subnetted, %d subnets, 4 masks" % (first, second, len(prefixes))
+    else:
+      yield "      %d.%d.0.0/24 is subnetted, %d subnets" % (first, second, len(prefixes))
+
+    for p in prefixes:
+      if variable:
+        third, fourth = p >> 4, (p & 0xf) << 4
+      else:
+        third, fourth = p, 0
+      addr = "%d.%d.%d.%d" % (first, second, third, fourth)
+      proto = rnd.choice(protos)
+      gw = rnd.choice(gateways)
+      vlan = 100 + gateways.index(gw)
+      age = "%dw%dd" % (rnd.randint(0, 9), rnd.randint(0, 6))
+      metric = "[110/%d]" % rnd.randint(2, 200)
+      if variable:
+        mask = rnd.choice([24, 25, 28] if fourth == 0 else [28, 30])
+        yield "%-9s%s/%d %s via %s, %s, Vlan%d" % (proto, addr, mask, metric, gw, age, vlan)
+      else:
+        yield "%-9s%s %s via %s, %s, Vlan%d" % (proto, addr, metric, gw, age, vlan)
+      if rnd.random() < ecmp:
+        # 同じネクストホップが2回出ることはないので、最初の経路以外から選ぶ
+        for other in rnd.sample([g for g in gateways if g != gw], rnd.randint(1, 3)):
+          yield "%s%s via %s, %s, Vlan%d" % (" " * 24, metric, other, age, 100 + gateways.index(other))
+
+  for i, gw in enumerate(gateways):
+    yield "C        10.245.%d.0/24 is directly connected, Vlan%d" % (i + 2, 100 + i)
+    yield "L        %s/32 is directly connected, Vlan%d" % (gw, 100 + i)
+  yield "%s#" % HOSTNAME
+
+
+GENERATORS = OrderedDict([
+  ("show ip route", gen_show_ip_route),
+  ("show interfaces", gen_show_interfaces),
+  ("show interfaces status", gen_show_interfaces_status),
+  ("show logging", gen_show_logging),
+  ("show cdp neighbors", gen_show_cdp_neighbors),
+])
+"""コマンドと出力を合成する関数の対応"""
+
+
+def generate(command, n, seed=0):
+  """commandの出力をn件分yieldします"""
+  return GENERATORS[command](n, seed=seed)
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import sys
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='synthesize show command output for benchmarks.')
+    parser.add_argument('command', choices=list(GENERATORS), help='Command to synthesize')
+    parser.add_argument('-n', type=int, default=10000, help='Number of records (default: 10000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename (default: stdout)')
+    args = parser.parse_args()
+
+    f = open(args.output_filename, mode="w", encoding="utf-8") if args.output_filename else sys.stdout
+    try:
+      for line in generate(args.command, args.n, args.seed):
+        f.write(line)
+        f.write("\n")
+    except BrokenPipeError:
+      sys.stderr.close()
+    finally:
+      if args.output_filename:
+        f.close()
+    return 0
+
+
+  # 実行
+  sys.exit(main())
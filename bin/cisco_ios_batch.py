@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""大量のキャプチャファイルをプロセスプールでまとめてパースします。
+
+bin/のスクリプトは1回の起動で1ファイルを処理するので、ファイルの数だけインタプリタの起動とログの設定を繰り返します。
+ここではディレクトリやglobで指定したファイルをプロセスプールに配り、結果を1つの出力にまとめて書き出します。
+
+- ファイルはimap_unordered(chunksize=1)で1つずつ配るので、空いたワーカーから次のファイルを取りに行きます
+- パーサーはワーカーごとに1回だけ生成し、以降のファイルで使い回します
+- JSONへの変換はワーカー側で済ませ、1レコードずつ一時ファイルに書き出します。メインプロセスはそれを出力にコピーするだけにします
+- 失敗したファイルはログに残して処理を続けます
+
+Examples:
+  $ python -m doctest bin/cisco_ios_batch.py
+  $ python bin/cisco_ios_batch.py -c "show logging" -j 8 -o logging.jsonl captures/
+  $ python bin/cisco_ios_batch.py -c session "captures/**/*.log.gz"
+
+Note:
+  出力はJSON Lines形式です。各レコードにはfile、host、commandのキーが追加されます。
+  -cにsessionを指定すると、ファイルの中のプロンプトからコマンドを判別します。
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+from cisco_ios_cache import ParseCache
+from cisco_ios_input import read_lines
+from cisco_ios_session import CiscoIosSessionSplitter, to_dict
+
+#
+# 関数定義
+#
+
+def find_files(patterns):
+  """ディレクトリやglobのパターンに一致するファイル名を重複なくソートして返却します。
+
+  ディレクトリは配下のファイルをすべて対象にします。globは**で再帰的に検索します。
+
+  Arguments:
+    patterns {list} -- ファイル名、ディレクトリ名、globのパターンのリスト
+
+  Returns:
+    list -- ファイル名のリスト
+
+  >>> find_files(["testdata/no_such_dir/*.log"])
+  []
+  """
+  found = set()
+  for pattern in patterns:
+    if os.path.isdir(pattern):
+      for root, _, files in os.walk(pattern):
+        found.update(os.path.join(root, f) for f in files)
+    elif os.path.isfile(pattern):
+      found.add(pattern)
+    else:
+      found.update(f for f in glob.glob(pattern, recursive=True) if os.path.isfile(f))
+  return sorted(found)
+
+
+# ワーカープロセスごとに1つだけ持つ分割器とコマンド
+_splitter = None
+_command = None
+_cache = None
+_spool_dir = None
+
+
+def init_worker(command, cache_dir=None, cache_bytes=None, spool_dir=None):
+  """ワーカープロセスの初期化でパーサーを生成します。
+
+  Arguments:
+    command {str} -- "show logging"などのコマンド。"session"ならファイルの中のプロンプトから判別する
+
+  Keyword Arguments:
+    cache_dir {str} -- パース結果のキャッシュを置くディレクトリ。Noneならキャッシュしない (default: {None})
+    cache_bytes {int} -- キャッシュの合計サイズの上限 (default: {None})
+    spool_dir {str} -- spool_file()が一時ファイルを作るディレクトリ (default: {None})
+  """
+  global _splitter, _command, _cache, _spool_dir
+  _splitter = CiscoIosSessionSplitter()
+  _command = command
+  _cache = ParseCache(cache_dir, cache_bytes) if cache_dir else None
+  _spool_dir = spool_dir
+
+
+def parse_file(filename, f=None):
+  """1つのファイルをパースし、JSON Lines形式で1レコードずつfに書き出して、メトリクスを辞書型で返却します。
+
+  ファイル全体の出力を1つの文字列にまとめることはしませんので、大きなファイルでもメモリは増えません。
+  例外は呼び出し元に投げずにerrorに格納します。それまでに書き出したレコードはそのまま残ります。
+
+  Arguments:
+    filename {str} -- 入力ファイル名
+
+  Keyword Arguments:
+    f {file} -- 書き出し先のテキストファイル。Noneなら数えるだけで書き出さない (default: {None})
+
+  Returns:
+    dict -- file, lines, records, cached, elapsed, errorをキーとする辞書型
+
+  >>> import io
+  >>> init_worker("show interfaces status")
+  >>> f = io.StringIO()
+  >>> result = parse_file("testdata/show_int_status.log", f)
+  >>> result["records"], result["error"]
+  (177, None)
+  >>> json.loads(f.getvalue().splitlines()[0])["Port"]
+  'Te1/1/1'
+  >>> parse_file("testdata/no_such_file.log")["error"].startswith("FileNotFoundError")
+  True
+
+  キャッシュにあればパースせず、linesは0になります。
+
+  >>> import tempfile
+  >>> init_worker("show interfaces status", tempfile.mkdtemp())
+  >>> [parse_file("testdata/show_int_status.log")["cached"] for _ in range(2)]
+  [False, True]
+
+  show ip routeの(IPv4RouteEntry, 行)もキャッシュから同じ内容で読み戻します。
+
+  >>> init_worker("show ip route", tempfile.mkdtemp())
+  >>> outputs = [io.StringIO(), io.StringIO()]
+  >>> [parse_file("testdata/show_ip_route.log", f)["cached"] for f in outputs]
+  [False, True]
+  >>> outputs[0].getvalue() == outputs[1].getvalue() != ""
+  True
+  """
+  start = time.perf_counter()
+  result = {"file": filename, "lines": 0, "records": 0, "cached": False, "elapsed": 0.0, "error": None}
+  lines = None
+  try:
+    if _command == "session":
+      name, func = None, _splitter.parse
+    else:
+      name, func = _splitter.find_command(_command)
+
+    key = _cache.key(func, filename) if _cache else None
+    records = _cache.get(key) if _cache else None
+    if records is not None:
+      result["cached"] = True
+    else:
+      lines = read_lines(filename, errors="replace")
+      records = func(lines)
+      if _cache:
+        records = list(records)
+        _cache.put(key, records)
+    if name:
+      records = (("", name, record) for record in records)
+
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    write = f.write if f is not None else None
+    for host, command, record in records:
+      result["records"] += 1
+      if write is None:
+        continue
+      d = OrderedDict([("file", filename), ("host", host), ("command", command)])
+      d.update(to_dict(record))
+      write(dumps(d))
+      write("\n")
+  except Exception as e:
+    result["error"] = "%s: %s" % (type(e).__name__, e)
+  finally:
+    if lines is not None:
+      result["lines"] = lines.count
+      lines.close()
+  result["elapsed"] = time.perf_counter() - start
+  return result
+
+
+def spool_file(filename):
+  """プロセスプールのワーカーで使います。一時ファイルに書き出し、そのファイル名をspoolに入れて返却します"""
+  with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", dir=_spool_dir, suffix=".jsonl", delete=False) as f:
+    result = parse_file(filename, f)
+  result["spool"] = f.name
+  return result
+
+
+def run(filenames, command, jobs=1, cache_dir=None, cache_bytes=None, f=None):
+  """ファイルをプロセスプールに配ってパースし、レコードをfに書き出して、parse_file()の結果を終わった順にyieldします。
+
+  ワーカーは一時ディレクトリのファイルに書き出し、このプロセスはそれをfにコピーしてから削除します。
+
+  Arguments:
+    filenames {list} -- 入力ファイル名のリスト
+    command {str} -- コマンド。"session"ならプロンプトから判別する
+
+  Keyword Arguments:
+    jobs {int} -- ワーカープロセスの数。1ならこのプロセスで処理する (default: {1})
+    cache_dir {str} -- パース結果のキャッシュを置くディレクトリ (default: {None})
+    cache_bytes {int} -- キャッシュの合計サイズの上限 (default: {None})
+    f {file} -- 書き出し先のテキストファイル。Noneなら書き出さない (default: {None})
+
+  >>> [r["records"] for r in run(["testdata/show_cdp_neighbor.log"], "show cdp neighbors")]
+  [51]
+  """
+  if jobs <= 1:
+    init_worker(command, cache_dir, cache_bytes)
+    for filename in filenames:
+      yield parse_file(filename, f)
+    return
+
+  import multiprocessing
+  # 途中でやめても取り出されなかった一時ファイルが残らないように、ディレクトリごと削除する
+  spool_dir = tempfile.mkdtemp(prefix="cisco_ios_batch_")
+  try:
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(command, cache_dir, cache_bytes, spool_dir)) as pool:
+      # chunksize=1で1ファイルずつ配るので、大きなファイルに当たったワーカーを他のワーカーが待つことはない
+      for result in pool.imap_unordered(spool_file, filenames, chunksize=1):
+        spool = result.pop("spool")
+        if f is not None:
+          with open(spool, encoding="utf-8") as src:
+            shutil.copyfileobj(src, f)
+        os.remove(spool)
+        yield result
+  finally:
+    shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+#
+# クラス定義
+#
+
+class BatchMetrics(object):
+  """バッチ処理のスループットを集計するクラスです。
+
+  >>> metrics = BatchMetrics()
+  >>> metrics.add({"file": "a", "lines": 100, "records": 10, "elapsed": 0.5, "error": None})
+  >>> metrics.add({"file": "b", "lines": 0, "records": 0, "elapsed": 0.1, "error": "IOError"})
+  >>> d = metrics.report()
+  >>> d["files"], d["failed"], d["lines"], d["records"], d["busy_sec"]
+  (2, 1, 100, 10, 0.6)
+  """
+
+  def __init__(self):
+    self.start = time.perf_counter()
+    self.files = 0
+    self.failed = 0
+    self.lines = 0
+    self.records = 0
+    self.busy = 0.0
+    self.cached = 0
+
+
+  def add(self, result):
+    """parse_file()の結果を集計に加えます"""
+    self.files += 1
+    if result["error"]:
+      self.failed += 1
+    self.lines += result["lines"]
+    self.records += result["records"]
+    self.cached += result.get("cached", False)
+    self.busy += result["elapsed"]
+
+
+  def report(self):
+    """ここまでの集計を辞書型で返却します。
+
+    busy_secはワーカーがパースに使った時間の合計です。wall_secで割るとワーカーの平均稼働数になります。
+    """
+    wall = max(time.perf_counter() - self.start, 1e-9)
+    d = OrderedDict()
+    d["files"] = self.files
+    d["failed"] = self.failed
+    d["lines"] = self.lines
+    d["records"] = self.records
+    d["cached"] = self.cached
+    d["wall_sec"] = round(wall, 3)
+    d["busy_sec"] = round(self.busy, 3)
+    d["files_per_sec"] = round(self.files / wall, 1)
+    d["lines_per_sec"] = round(self.lines / wall, 1)
+    d["records_per_sec"] = round(self.records / wall, 1)
+    return d
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import logging
+  import sys
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準エラー出力へのハンドラ
+  # -oを省略すると結果のJSON Linesを標準出力に出すので、混ざらないようにログは標準エラー出力に出す
+  stderr_handler = logging.StreamHandler(sys.stderr)
+  stderr_handler.setFormatter(formatter)
+  stderr_handler.setLevel(logging.INFO)
+  logger.addHandler(stderr_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、一部のファイルが失敗したら2、入力がなければ1を返却
+    """
+
+    commands = [c[0] for c in CiscoIosSessionSplitter.commands] + ["session"]
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='parse many capture files with a process pool.')
+    parser.add_argument('-c', '--command', required=True, choices=commands, help='Command captured in the files, or "session" to detect it from prompts')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output JSON Lines filename (default: stdout)')
+    parser.add_argument('--cache', dest='cache_dir', metavar='cache_dir', help='Reuse parse results of unchanged files from this directory')
+    parser.add_argument('--cache-size', dest='cache_size', type=int, default=1024, help='Cache size limit in MB (default: 1024)')
+    parser.add_argument('--metrics', dest='metrics_filename', metavar='metrics_file', help='Save throughput metrics as JSON')
+    parser.add_argument('--interval', type=float, default=10.0, help='Seconds between progress reports (default: 10)')
+    parser.add_argument('inputs', nargs='+', help='Files, directories or glob patterns')
+    args = parser.parse_args()
+
+    filenames = find_files(args.inputs)
+    if not filenames:
+      logger.error("input data not found.")
+      return 1
+    logger.info("%s files, %s workers", len(filenames), args.jobs)
+
+    metrics = BatchMetrics()
+    next_report = time.perf_counter() + args.interval
+
+    f = open(args.output_filename, mode='w', encoding='utf-8') if args.output_filename else sys.stdout
+    try:
+      for result in run(filenames, args.command, args.jobs, args.cache_dir, args.cache_size * 1024 * 1024, f):
+        metrics.add(result)
+        if result["error"]:
+          logger.warning("%s: %s", result["file"], result["error"])
+        if time.perf_counter() >= next_report:
+          next_report += args.interval
+          logger.info("progress %s/%s files, %s", metrics.files, len(filenames), dict(metrics.report()))
+    except BrokenPipeError:
+      sys.stderr.close()
+      return 0
+    finally:
+      if args.output_filename:
+        f.close()
+
+    report = metrics.report()
+    logger.info("done %s", json.dumps(report))
+    if args.metrics_filename:
+      with open(args.metrics_filename, mode='w') as mf:
+        json.dump(report, mf, indent=2)
+    return 2 if metrics.failed else 0
+
+
+  # 実行
+  sys.exit(main())
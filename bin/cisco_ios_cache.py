@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パース結果をファイルの内容のハッシュで引けるようにキャッシュするモジュールです。
+
+スタティックルートやCDPネイバーのように、実行のたびにほとんど変わらないキャプチャを毎回パースし直さないようにします。
+
+キーは次の3つから作るSHA-256です。ファイル名や更新時刻は使いませんので、同じ内容なら別のファイルでもヒットします。
+- 入力ファイルのバイト列(圧縮ファイルは圧縮されたまま)
+- パースするクラスとメソッドの名前
+- そのクラスがあるモジュールと、結果を左右する共通のモジュール(COMMON_MODULES)のソースファイルのSHA-256。
+  パーサーを直せば__version__を変えなくてもキーが変わります
+
+パース結果はレコードのキーの並びをスキーマとして一度だけ記録し、各レコードは値の配列だけを持つ形にして、
+JSONにしたものをzlibで圧縮して保存します。ディレクトリを共有しても、読み込みで任意のコードが実行されることはありません。
+
+保存先のディレクトリの合計サイズが上限を超えたら、最後に使った時刻が古いものから削除します(LRU)。
+ヒットしたときはファイルの更新時刻を現在時刻に変えて、最後に使った時刻とします。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_cache.py
+  $ python bin/cisco_ios_cache.py --stats cache_dir
+  $ python bin/cisco_ios_cache.py --clear cache_dir
+
+  >>> import tempfile
+  >>> class Parser(object):
+  ...   def parse(self, lines):
+  ...     for line in lines:
+  ...       yield OrderedDict([("line", line)])
+  >>> cache = ParseCache(tempfile.mkdtemp())
+  >>> func = Parser().parse
+  >>> records = cache.parse(func, "testdata/show_int_status.log")
+  >>> len(records), cache.hits, cache.misses
+  (186, 0, 1)
+  >>> cache.parse(func, "testdata/show_int_status.log") == records
+  True
+  >>> cache.hits, cache.misses
+  (1, 1)
+
+  上限を超えると古いものから削除します。
+
+  >>> cache = ParseCache(tempfile.mkdtemp(), max_bytes=1)
+  >>> cache.put("0" * 64, records)
+  >>> list(cache.entries()), cache.get("0" * 64)
+  ([], None)
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import zlib
+from collections import OrderedDict
+
+# キーに含めるソースのモジュール。ハッシュを取るためにsys.modulesにあればよい
+import cisco_ios_interface_name  # pylint: disable=unused-import
+import cisco_ios_pattern  # pylint: disable=unused-import
+from cisco_ios_input import read_lines
+
+logger = logging.getLogger(__name__)
+
+#
+# 関数定義
+#
+
+# パーサーのモジュールのほかに、パース結果を左右するモジュール。このモジュールは保存形式を決める
+COMMON_MODULES = ["cisco_ios_input", "cisco_ios_pattern", "cisco_ios_interface_name", __name__]
+
+# 辞書型でないレコードに含まれていて、保存と復元ができるクラス。これ以外のクラスは復元しない
+RECORD_CLASSES = ["cisco_ios_show_ip_route.IPv4RouteEntry"]
+
+# ソースファイル名とそのSHA-256。1つのプロセスでファイルごとに1回だけ計算する
+_source_digests = {}
+
+
+def source_digest(module):
+  """モジュールのソースファイルのSHA-256を返却します。ファイルがなければ__version__を返却します"""
+  filename = getattr(module, "__file__", None)
+  if not filename:
+    return getattr(module, "__version__", "")
+  digest = _source_digests.get(filename)
+  if digest is None:
+    try:
+      digest = file_digest(filename)
+    except OSError:
+      digest = getattr(module, "__version__", "")
+    _source_digests[filename] = digest
+  return digest
+
+
+def parser_version(func):
+  """パースするメソッドからクラス、メソッド、モジュールのソースのハッシュを表す文字列を作ります。
+
+  registryを持つクラス(CiscoIosSessionSplitter)は、振り分け先のパーサーのモジュールも含めます。
+  最後にCOMMON_MODULESのソースのハッシュを加えます。
+
+  パーサーのソースを変えると、別の文字列になります。
+
+  >>> import importlib.util
+  >>> def load(source):
+  ...   filename = os.path.join(tempfile.mkdtemp(), "my_parser.py")
+  ...   with open(filename, "w") as f:
+  ...     _ = f.write(source)
+  ...   spec = importlib.util.spec_from_file_location("my_parser", filename)
+  ...   sys.modules["my_parser"] = module = importlib.util.module_from_spec(spec)
+  ...   spec.loader.exec_module(module)
+  ...   return module.Parser().parse
+  >>> v1 = parser_version(load("class Parser(object):\\n  def parse(self, lines):\\n    return lines\\n"))
+  >>> v2 = parser_version(load("class Parser(object):\\n  def parse(self, lines):\\n    return lines[1:]\\n"))
+  >>> v1.split()[0], v1 == v2
+  ('my_parser.Parser.parse', False)
+  >>> del sys.modules["my_parser"]
+  """
+  owner = getattr(func, "__self__", None)
+  target = type(owner) if owner is not None else func
+  names = [target]
+  for entry in getattr(owner, "registry", ()):
+    names.append(type(entry[-1].__self__))
+
+  parts = []
+  for i, t in enumerate(names):
+    module = sys.modules.get(t.__module__)
+    name = "%s.%s" % (t.__module__, t.__qualname__)
+    if i == 0 and owner is not None:
+      name += "." + func.__name__
+    parts.append("%s %s" % (name, source_digest(module)))
+  for name in COMMON_MODULES:
+    parts.append("%s %s" % (name, source_digest(sys.modules[name])))
+  return ";".join(parts)
+
+
+def encode_item(item):
+  """辞書型でないレコードの要素をJSONにできる形にします。RECORD_CLASSESのオブジェクトはクラス名と属性の辞書型にします"""
+  name = "%s.%s" % (type(item).__module__, type(item).__qualname__)
+  if name in RECORD_CLASSES:
+    return {"__class__": name, "attrs": vars(item)}
+  return item
+
+
+def decode_item(item):
+  """encode_item()の逆です。RECORD_CLASSESにないクラスはValueErrorにします"""
+  if not isinstance(item, dict) or "__class__" not in item:
+    return item
+  name = item["__class__"]
+  if name not in RECORD_CLASSES:
+    raise ValueError("unknown record class: %s" % name)
+  module_name, class_name = name.rsplit(".", 1)
+  # 経路を読み戻すときはパーサーのモジュールを読み込み済みなので、まずはそれを使う
+  module = sys.modules.get(module_name) or importlib.import_module(module_name)
+  cls = getattr(module, class_name)
+  obj = cls.__new__(cls)
+  obj.__dict__.update(item["attrs"])
+  return obj
+
+
+def pack(records):
+  """レコードのリストをキーの並びと値の配列に分けてからJSONにし、zlibで圧縮したバイト列を返却します。
+
+  辞書型でないレコード(show ip routeの(IPv4RouteEntry, 行))は、要素をencode_item()した配列にします。
+
+  >>> records = [OrderedDict([("a", "1"), ("b", 2)]), OrderedDict([("a", "3"), ("b", None)])]
+  >>> unpack(pack(records)) == records
+  True
+
+  RECORD_CLASSES以外のクラスは復元しません。
+
+  >>> unpack(zlib.compress(b'[[], [[-1, [{"__class__": "os.system", "attrs": {}}]]]]'))
+  Traceback (most recent call last):
+    ...
+  ValueError: unknown record class: os.system
+  """
+  schemas = OrderedDict()
+  rows = []
+  for record in records:
+    if isinstance(record, dict):
+      keys = tuple(record)
+      schema = schemas.setdefault(keys, len(schemas))
+      rows.append((schema, list(record.values())))
+    else:
+      rows.append((-1, [encode_item(item) for item in record]))
+  data = json.dumps((list(schemas), rows), ensure_ascii=False, separators=(",", ":"))
+  return zlib.compress(data.encode("utf-8"), 1)
+
+
+def unpack(data):
+  """pack()で作ったバイト列からレコードのリストを復元します"""
+  schemas, rows = json.loads(zlib.decompress(data).decode("utf-8"))
+  return [OrderedDict(zip(schemas[schema], values)) if schema >= 0 else tuple(decode_item(item) for item in values) for schema, values in rows]
+
+
+def file_digest(filename, chunk_size=1024 * 1024):
+  """ファイルのバイト列のSHA-256を16進数の文字列で返却します"""
+  h = hashlib.sha256()
+  with open(filename, mode="rb") as f:
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+      h.update(chunk)
+  return h.hexdigest()
+
+#
+# クラス定義
+#
+
+class ParseCache(object):
+  """ファイルの内容をキーにしてパース結果をディレクトリに保存するキャッシュです。
+
+  複数のプロセスから同じディレクトリを使っても構いません。書き込みは一時ファイルからos.replace()で置き換えます。
+  合計サイズはプロセスごとに数えるので、上限は目安です。
+  """
+
+  # 保存先のディレクトリの合計サイズの上限(バイト)
+  max_bytes = 1024 * 1024 * 1024
+
+  # 上限を超えたときに、ここまで減らす割合
+  low_water = 0.9
+
+  suffix = ".pz"
+
+  def __init__(self, directory, max_bytes=None):
+    """コンストラクタ
+
+    Arguments:
+      directory {str} -- 保存先のディレクトリ。なければ作成する
+
+    Keyword Arguments:
+      max_bytes {int} -- 合計サイズの上限。省略時はクラス変数のmax_bytes (default: {None})
+    """
+    self.directory = directory
+    if max_bytes is not None:
+      self.max_bytes = max_bytes
+    os.makedirs(directory, exist_ok=True)
+    self.hits = 0
+    self.misses = 0
+    self.total_bytes = sum(size for _, _, size in self.entries())
+
+
+  def entries(self):
+    """保存されている(パス, 最後に使った時刻, サイズ)をyieldします"""
+    for root, _, files in os.walk(self.directory):
+      for name in files:
+        if not name.endswith(self.suffix):
+          continue
+        path = os.path.join(root, name)
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        yield path, st.st_mtime, st.st_size
+
+
+  def key(self, func, filename):
+    """filenameの内容とfuncからキャッシュのキーを作ります"""
+    h = hashlib.sha256(file_digest(filename).encode())
+    h.update(parser_version(func).encode())
+    return h.hexdigest()
+
+
+  def path(self, key):
+    """キーに対応する保存先のパス。1つのディレクトリにファイルが集中しないように先頭2文字で分ける"""
+    return os.path.join(self.directory, key[:2], key + self.suffix)
+
+
+  def get(self, key):
+    """キーに対応するレコードのリストを返却します。なければNoneを返却します"""
+    path = self.path(key)
+    try:
+      with open(path, mode="rb") as f:
+        data = f.read()
+      os.utime(path)
+    except OSError:
+      return None
+    try:
+      return unpack(data)
+    except Exception as e:
+      # 壊れたキャッシュは使わずにパースし直させる
+      logger.warning("broken cache %s: %s", path, e)
+      return None
+
+
+  def put(self, key, records):
+    """キーに対応するレコードのリストを保存し、合計サイズが上限を超えたら古いものを削除します"""
+    data = pack(records)
+    path = self.path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, mode="wb") as f:
+      f.write(data)
+    os.replace(tmp, path)
+    self.total_bytes += len(data)
+    if self.total_bytes > self.max_bytes:
+      self.evict()
+
+
+  def evict(self):
+    """最後に使った時刻が古いものから削除して、合計サイズを上限のlow_water倍まで減らします"""
+    entries = sorted(self.entries(), key=lambda e: e[1])
+    total = sum(size for _, _, size in entries)
+    limit = self.max_bytes * self.low_water
+    removed = 0
+    for path, _, size in entries:
+      if total <= limit:
+        break
+      try:
+        os.remove(path)
+        removed += 1
+      except OSError:
+        pass
+      total -= size
+    self.total_bytes = total
+    logger.info("evicted %s cache files", removed)
+
+
+  def parse(self, func, filename):
+    """filenameをfuncでパースした結果をリストで返却します。キャッシュにあればパースしません。
+
+    Arguments:
+      func {callable} -- 行のイテレータを受け取ってレコードをyieldするメソッド。CiscoIosShowLoggingParser().parseなど
+      filename {str} -- 入力ファイル名
+
+    Returns:
+      list -- レコードのリスト
+    """
+    key = self.key(func, filename)
+    records = self.get(key)
+    if records is not None:
+      self.hits += 1
+      return records
+
+    self.misses += 1
+    lines = read_lines(filename, errors="replace")
+    try:
+      records = list(func(lines))
+    finally:
+      lines.close()
+    self.put(key, records)
+    return records
+
+
+  def clear(self):
+    """保存されているものをすべて削除します"""
+    for path, _, _ in list(self.entries()):
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+    self.total_bytes = 0
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='manage the parse result cache.')
+    parser.add_argument('--stats', action='store_true', help='Show number of entries and total size')
+    parser.add_argument('--clear', action='store_true', help='Remove all entries')
+    parser.add_argument('directory', help='Cache directory')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+      logger.error("%s not found.", args.directory)
+      return 1
+
+    cache = ParseCache(args.directory)
+    if args.clear:
+      cache.clear()
+      logger.info("cleared %s", args.directory)
+    if args.stats or not args.clear:
+      entries = list(cache.entries())
+      print("entries: {0}".format(len(entries)))
+      print("bytes: {0}".format(sum(size for _, _, size in entries)))
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""リンクのup/downのログと、その前後のshow interfacesのカウンタを突き合わせます。
+
+%LINK-3-UPDOWNや%LINEPROTO-5-UPDOWNが多発したときに、そのインタフェースのCRCやドロップが
+直前と直後のshow interfacesでどう変わったかを一覧にします。
+
+show interfacesの出力には時刻がありませんので、コマンド出力の先頭にある次の行を取得した時刻とみなします。
+この行がないshow interfacesは時刻が分からないので使いません。
+
+  Time source is NTP, 20:17:47.804 JST Thu Jan 7 2016
+
+カウンタは(装置, インタフェースの番号)ごとに時刻順の配列に入れ、
+ログ1件ごとに二分探索で直前と直後のものを探します。ログは全装置分を1回走査するだけです。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_correlate.py
+  $ python bin/cisco_ios_correlate.py --year 2016 --utc-offset 9 capture.log
+  $ python bin/cisco_ios_correlate.py -o link_events.csv --year 2016 before.log logging.log after.log
+
+  >>> lines = []
+  >>> lines.append("sw1#show interfaces")
+  >>> lines.append("Time source is NTP, 22:50:00.000 UTC Mon Sep 5 2016")
+  >>> lines.append("TenGigabitEthernet1/3/11 is up, line protocol is up (connected)")
+  >>> lines.append("     0 input errors, 10 CRC, 0 frame, 0 overrun, 0 ignored")
+  >>> lines.append("sw1#show logging")
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("sw1#show interfaces")
+  >>> lines.append("Time source is NTP, 23:00:00.000 UTC Mon Sep 5 2016")
+  >>> lines.append("TenGigabitEthernet1/3/11 is up, line protocol is up (connected)")
+  >>> lines.append("     0 input errors, 25 CRC, 0 frame, 0 overrun, 0 ignored")
+  >>> lines.append("sw1#exit")
+  >>> correlator = LinkEventCorrelator(CiscoIosLogTimestampParser(year=2016))
+  >>> correlator.load_session(lines)
+  >>> d = next(correlator.correlate())
+  >>> d["interface"], d["state"], d["before"], d["crc_before"], d["crc_after"], d["crc_delta"]
+  ('TenGigabitEthernet1/3/11', 'down', '22:50:00.000 UTC Mon Sep 5 2016', 10, 25, 15)
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import bisect
+import itertools
+import re
+from collections import OrderedDict
+
+from cisco_ios_interface_name import interface_ids
+from cisco_ios_session import CiscoIosSessionSplitter
+from cisco_ios_show_logging import CiscoIosLogTimestampParser, LogEventAggregator
+
+#
+# クラス変数
+#
+
+# Time source is NTP, 20:17:47.804 JST Thu Jan 7 2016
+# Time source is hardware calendar, *20:17:47.804 UTC Thu Jan 7 2016
+rex_time_source = re.compile(
+  r"^Time source is [^,]*, [*.]?(?P<time>\d{1,2}:\d{2}:\d{2}(?:\.\d+)?)"
+  r"(?: (?P<tz>[A-Za-z][\w+-]*))? [A-Z][a-z]{2} (?P<mon>[A-Z][a-z]{2}) (?P<mday>\d{1,2}) (?P<year>\d{4})")
+
+#
+# 関数定義
+#
+
+def time_source_epoch(line, timestamp_parser):
+  """Time source is ...の行をエポックからのミリ秒に変換して返却します。その行でなければNoneを返却します
+
+  >>> time_source_epoch("Time source is NTP, 07:56:48.497 JST Tue Sep 6 2016", CiscoIosLogTimestampParser())
+  1473116208497
+  >>> time_source_epoch("Load for five secs: 7%/0%", CiscoIosLogTimestampParser()) is None
+  True
+  """
+  m = rex_time_source.match(line)
+  if not m:
+    return None
+  date = "%s %s %s %s" % (m.group("mon"), m.group("mday"), m.group("year"), m.group("time"))
+  if m.group("tz"):
+    date += " " + m.group("tz")
+  return timestamp_parser.to_epoch(date)
+
+
+def to_int(value):
+  """カウンタの文字列をintにして返却します。空ならNoneを返却します"""
+  return int(value) if value else None
+
+#
+# クラス定義
+#
+
+class InterfaceSnapshotIndex(object):
+  """show interfacesの辞書型を、(装置, インタフェースの番号)ごとに時刻順の配列で持つクラスです。
+
+  LogTimeIndexと同じく、追加時には並べ替えず、最初に探すときに一度だけ並べ替えます。
+
+  >>> index = InterfaceSnapshotIndex()
+  >>> for epoch in (300, 100, 200):
+  ...   index.add("sw1", 0, epoch, {"crc": str(epoch)})
+  >>> [(e, d["crc"]) for e, d in index.bracket("sw1", 0, 150)]
+  [(100, '100'), (200, '200')]
+  >>> index.bracket("sw1", 0, 50)[0], index.bracket("sw1", 1, 50)
+  (None, (None, None))
+  """
+
+  def __init__(self):
+    # (装置, 番号)をキーに、[エポックの配列, 辞書型の配列, 並んでいるか]を値にした辞書型
+    self.series = {}
+
+
+  def __len__(self):
+    return sum(len(s[0]) for s in self.series.values())
+
+
+  def add(self, device, interface_id, epoch, d):
+    """show interfacesの辞書型を1件追加します"""
+    s = self.series.get((device, interface_id))
+    if s is None:
+      s = self.series[(device, interface_id)] = [[], [], True]
+    epochs = s[0]
+    if epochs and epoch < epochs[-1]:
+      s[2] = False
+    epochs.append(epoch)
+    s[1].append(d)
+
+
+  def sort(self, s):
+    """1つの系列を時刻順に並べ替えます"""
+    order = sorted(range(len(s[0])), key=s[0].__getitem__)
+    s[0] = [s[0][i] for i in order]
+    s[1] = [s[1][i] for i in order]
+    s[2] = True
+
+
+  def bracket(self, device, interface_id, epoch):
+    """epoch以前で一番新しいものと、epochより後で一番古いものを、(エポック, 辞書型)のタプルで返却します
+
+    見つからない方はNoneです。
+    """
+    s = self.series.get((device, interface_id))
+    if s is None:
+      return None, None
+    if not s[2]:
+      self.sort(s)
+    epochs, records = s[0], s[1]
+    i = bisect.bisect_right(epochs, epoch)
+    before = (epochs[i - 1], records[i - 1]) if i > 0 else None
+    after = (epochs[i], records[i]) if i < len(epochs) else None
+    return before, after
+
+
+class LinkEventCorrelator(object):
+  """ターミナルのログからリンクのup/downのログとshow interfacesを集め、突き合わせるクラスです。"""
+
+  # 突き合わせるログのニモニック
+  mnemonics = {"UPDOWN", "CHANGED"}
+
+  # 直前と直後の値を出すカウンタ。(出力するときの名前, show interfacesのキー)
+  counters = [("crc", "crc"), ("input_errors", "input errors"), ("output_errors", "output errors"), ("drops", "output drops")]
+
+  # ログのメッセージから状態を取り出す正規表現
+  rex_state = re.compile(r"changed state to (\S+)")
+
+  def __init__(self, timestamp_parser=None, table=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      timestamp_parser {CiscoIosLogTimestampParser} -- 日付の変換に使うオブジェクト (default: {None})
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+    """
+    self.timestamp_parser = timestamp_parser if timestamp_parser else CiscoIosLogTimestampParser()
+    self.table = table or interface_ids
+    self.splitter = CiscoIosSessionSplitter()
+    self.snapshots = InterfaceSnapshotIndex()
+
+    # (エポック, 装置, インタフェースの番号, ログの辞書型)のリスト
+    self.events = []
+
+    # 時刻が分からずに使えなかったshow interfacesとログの件数
+    self.untimed = 0
+
+    self.fieldnames = ["device", "date", "facility", "mnemonic", "interface", "state", "before", "after"]
+    for name, _ in self.counters:
+      self.fieldnames.extend([name + "_before", name + "_after", name + "_delta"])
+
+
+  def load_session(self, lines):
+    """ターミナルのログを読み、show interfacesとリンクのログを溜めます"""
+    for host, command, section in self.splitter.split(lines):
+      found = self.splitter.find_command(command)
+      if found is None:
+        continue
+      name, func = found
+      section = itertools.chain(section, (host + "#",))
+      if name == "show interfaces":
+        self.add_snapshots(host, func, section)
+      elif name == "show logging":
+        self.add_events(host, func(section))
+
+
+  def add_snapshots(self, host, func, section):
+    """show interfacesの出力をパースし、Time source is ...の時刻で索引に加えます"""
+    parser = self.timestamp_parser
+    state = {"epoch": None, "text": ""}
+
+    # パーサーに渡す行を横から覗いて時刻の行を拾う。時刻の行はインタフェースの情報より前にある
+    def tap(lines):
+      for line in lines:
+        if state["epoch"] is None and line.startswith("Time source is "):
+          state["epoch"] = time_source_epoch(line, parser)
+          state["text"] = line.split(", ", 1)[-1].lstrip("*.")
+        yield line
+
+    id_of = self.table.id_of
+    for d in func(tap(section)):
+      if state["epoch"] is None:
+        self.untimed += 1
+        continue
+      d["time"] = state["text"]
+      self.snapshots.add(host, id_of(d["name"]), state["epoch"], d)
+
+
+  def add_events(self, host, records):
+    """ログの辞書型のうち、インタフェースのup/downに関するものを溜めます"""
+    search = LogEventAggregator.rex_interface.search
+    to_epoch = self.timestamp_parser.to_epoch
+    id_of = self.table.id_of
+    mnemonics = self.mnemonics
+    for d in records:
+      if d["mnemonic"] not in mnemonics:
+        continue
+      m = search(d["description"])
+      if not m:
+        continue
+      epoch = to_epoch(d["date"])
+      if epoch is None:
+        self.untimed += 1
+        continue
+      d["interface"] = m.group(1)
+      self.events.append((epoch, host, id_of(m.group(1)), d))
+
+
+  def correlate(self):
+    """溜めたログを時刻順に走査し、直前と直後のshow interfacesのカウンタを加えた辞書型をyieldします
+
+    直前、直後のshow interfacesがなければ、その時刻とカウンタは空になります。
+    """
+    bracket = self.snapshots.bracket
+    name_of = self.table.name_of
+    empty = (None, {})
+    self.events.sort(key=lambda e: e[0])
+    for epoch, host, interface_id, log in self.events:
+      before, after = bracket(host, interface_id, epoch)
+      before, after = before or empty, after or empty
+      m = self.rex_state.search(log["description"])
+
+      d = OrderedDict()
+      d["device"] = host
+      d["date"] = log["date"]
+      d["facility"] = log["facility"]
+      d["mnemonic"] = log["mnemonic"]
+      d["interface"] = name_of(interface_id)
+      d["state"] = m.group(1) if m else ""
+      d["before"] = before[1].get("time", "")
+      d["after"] = after[1].get("time", "")
+      for name, key in self.counters:
+        a = to_int(before[1].get(key))
+        b = to_int(after[1].get(key))
+        d[name + "_before"] = a
+        d[name + "_after"] = b
+        d[name + "_delta"] = b - a if a is not None and b is not None else None
+      yield d
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import logging
+  import os
+  import sys
+
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import open_sink
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='correlate link up/down logs with the nearest show interfaces counters.')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='file', help='Save the result to a file (.csv, .jsonl, .db, .col)')
+    parser.add_argument('--year', dest='year', type=int, help='Year of logs without year (default: this year)')
+    parser.add_argument('--utc-offset', dest='utc_offset', type=float, default=0, help='UTC offset in hours of logs without timezone (default: 0)')
+    parser.add_argument('input_filename', nargs='+', help='Session logs to be parsed')
+    args = parser.parse_args()
+
+    correlator = LinkEventCorrelator(CiscoIosLogTimestampParser(year=args.year, utc_offset=int(args.utc_offset * 3600)))
+    for filename in args.input_filename:
+      lines = get_lines(filename, logger)
+      if lines is None:
+        continue
+      try:
+        correlator.load_session(lines)
+      finally:
+        lines.close()
+
+    logger.info("%d link events, %d interface snapshots, %d without time", len(correlator.events), len(correlator.snapshots), correlator.untimed)
+
+    rows = correlator.correlate()
+    if args.output_filename:
+      with open_sink(args.output_filename, fieldnames=correlator.fieldnames) as sink:
+        count = sink.consume(rows)
+      logger.info("saved %d rows to %s", count, args.output_filename)
+      return 0
+
+    for d in rows:
+      print("{device:<20}{date:<24}{interface:<28}{state:<6}{before:<34}{after:<34}{crc_delta!s:>8}{drops_delta!s:>8}".format(**d))
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーを常駐させて、HTTPでパースの依頼を受け付けるデーモンです。
+
+bin/のスクリプトを呼ぶたびに、モジュールのインポート、conf/config.iniの読み込み、正規表現のコンパイル、
+ログの設定が繰り返されます。デーモンはこれらを起動時に一度だけ行い、以降の依頼ではパースだけを行います。
+
+待ち受けはlocalhostのTCPかUnixソケットです。どちらもHTTP/1.1のkeep-aliveで、結果はJSONで返します。
+パースした結果は名前を付けてデーモンに残しておき、あとから何度でも問い合わせることができます。
+
+  POST   /parse?command=show+logging          本文をパースして返す。dataset=名前 を付けると結果を残す
+  POST   /load?command=...&path=FILE&dataset=名前   デーモンからファイルを読んでパースし、結果を残す
+                                              FILEは--data-dirからの相対パス。--data-dirがなければ使えない
+  GET    /datasets                            残している結果の名前と件数
+  GET    /datasets/名前?Status=connected&limit=10  残している結果から値が一致するものを返す
+  GET    /datasets/名前?where=Vlan+in+(10,20)      残している結果から条件式に一致するものを返す
+  DELETE /datasets/名前                       残している結果を捨てる
+  GET    /health                              稼働確認
+
+format=columnsを付けると、レコードのリストではなく、キーごとに値を並べた列形式で返します。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_daemon.py
+  $ python bin/cisco_ios_daemon.py --port 8765
+  $ python bin/cisco_ios_daemon.py --unix /tmp/cisco_ios.sock --data-dir captures --cache cache_dir
+  $ curl --data-binary @testdata/show_int_status.log "http://127.0.0.1:8765/parse?command=show+int+status"
+  $ curl --unix-socket /tmp/cisco_ios.sock "http://localhost/datasets/core1?Status=connected"
+
+  >>> service = ParserService()
+  >>> text = "Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Te1/3/11, changed state to down\\n"
+  >>> status, body = service.handle("POST", "/parse?command=show+logg&dataset=log", text.encode())
+  >>> status, body["count"], body["records"][0]["mnemonic"]
+  (200, 1, 'UPDOWN')
+  >>> service.handle("GET", "/datasets/log?mnemonic=UPDOWN&format=columns", b"")[1]["columns"]["facility"]
+  ['LINK-SW1']
+  >>> service.handle("GET", "/datasets", b"")
+  (200, {'log': 1})
+  >>> service.handle("POST", "/parse?command=show+version", b"")
+  (400, {'error': 'unknown command: show version'})
+
+  /loadはdata_dirの中のファイルしか読みません。
+
+  >>> service.handle("POST", "/load?command=show+int+status&path=show_int_status.log&dataset=s", b"")
+  (403, {'error': 'load is disabled, start the daemon with --data-dir'})
+  >>> service = ParserService(data_dir="testdata")
+  >>> service.handle("POST", "/load?command=show+int+status&path=show_int_status.log&dataset=s", b"")
+  (200, {'dataset': 's', 'count': 177})
+  >>> service.handle("POST", "/load?command=show+int+status&path=../conf/config.ini&dataset=s", b"")
+  (403, {'error': 'path is outside the data directory: ../conf/config.ini'})
+
+  想定していない例外も接続を切らずに500で返します。
+
+  >>> service.find_func = None
+  >>> logger.disabled = True
+  >>> service.handle("POST", "/parse?command=show+logg", b"")
+  (500, {'error': "TypeError: 'NoneType' object is not callable"})
+  >>> logger.disabled = False
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import json
+import logging
+import os
+import socketserver
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from cisco_ios_cache import ParseCache
+from cisco_ios_filter import compile_filter
+from cisco_ios_input import read_lines
+from cisco_ios_session import CiscoIosSessionSplitter, to_dict
+
+logger = logging.getLogger(__name__)
+
+#
+# クラス定義
+#
+
+class ParserService(object):
+  """パーサーとパースした結果を保持して、HTTPの依頼に応えるクラスです。
+
+  HTTPサーバーとは切り離してあるので、handle()を直接呼んでも使えます。
+  """
+
+  # 問い合わせのパラメータのうち、値の一致条件として扱わないもの
+  reserved = ("command", "dataset", "format", "limit", "path", "where")
+
+  def __init__(self, cache_dir=None, data_dir=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      cache_dir {str} -- /loadでパース結果のキャッシュを置くディレクトリ (default: {None})
+      data_dir {str} -- /loadで読めるファイルを置くディレクトリ。Noneなら/loadは使えない (default: {None})
+    """
+    # パーサーはここで一度だけインスタンス化し、正規表現もここでコンパイルされる
+    self.splitter = CiscoIosSessionSplitter()
+    self.cache = ParseCache(cache_dir) if cache_dir else None
+    self.data_dir = os.path.realpath(data_dir) if data_dir else None
+    self.datasets = {}
+    self.lock = threading.Lock()
+
+
+  def find_func(self, command):
+    """コマンドに対応する(コマンド, パースする関数, sessionかどうか)を返却します。なければValueError"""
+    if command == "session":
+      return command, self.splitter.parse, True
+    found = self.splitter.find_command(command or "")
+    if found is None:
+      raise ValueError("unknown command: %s" % command)
+    return found[0], found[1], False
+
+
+  def parse_lines(self, command, lines):
+    """linesをパースして辞書型のリストを返却します。sessionはhostとcommandのキーを加えます"""
+    _, func, session = self.find_func(command)
+    return self.to_records(func(lines), session)
+
+
+  @staticmethod
+  def to_records(results, session):
+    """パーサーがyieldしたものを辞書型のリストに変換します"""
+    if not session:
+      return [to_dict(r) for r in results]
+    records = []
+    for host, command, r in results:
+      d = OrderedDict([("host", host), ("command", command)])
+      d.update(to_dict(r))
+      records.append(d)
+    return records
+
+
+  def resolve(self, path):
+    """/loadのpathをdata_dirの中の絶対パスにします。data_dirの外を指していればNoneを返却します
+
+    シンボリックリンクもたどってから確かめますので、data_dirの中のリンクで外のファイルを読むこともできません。
+    """
+    filename = os.path.realpath(os.path.join(self.data_dir, path))
+    if os.path.commonpath([self.data_dir, filename]) != self.data_dir:
+      return None
+    return filename
+
+
+  def load(self, command, path):
+    """デーモンからファイルを読んでパースします。キャッシュがあれば使います"""
+    _, func, session = self.find_func(command)
+    if self.cache:
+      return self.to_records(self.cache.parse(func, path), session)
+    lines = read_lines(path, errors="replace")
+    try:
+      return self.to_records(func(lines), session)
+    finally:
+      lines.close()
+
+
+  @staticmethod
+  def select(records, conditions, limit=None, where=None):
+    """値が一致するレコードを返却します。conditionsは(キー, 値)のリスト、whereは条件式です
+
+    >>> ParserService.select([{"Vlan": "10"}, {"Vlan": "30"}], [], where="Vlan < 20")
+    [{'Vlan': '10'}]
+    """
+    if where:
+      records = compile_filter(where).select(records)
+    if conditions:
+      records = [d for d in records if all(str(d.get(k, "")) == v for k, v in conditions)]
+    if limit is not None:
+      records = records[:limit]
+    return records
+
+
+  @staticmethod
+  def columns(records):
+    """レコードのリストをキーごとに値を並べた列形式に変換します。ないキーは空文字列で埋めます
+
+    >>> ParserService.columns([{"a": 1}, {"a": 2, "b": 3}])
+    OrderedDict([('a', [1, 2]), ('b', ['', 3])])
+    """
+    keys = OrderedDict()
+    for d in records:
+      for k in d:
+        keys[k] = None
+    return OrderedDict((k, [d.get(k, "") for d in records]) for k in keys)
+
+
+  def respond(self, records, params):
+    """レコードのリストを依頼された形式の辞書型にします"""
+    if params.get("format") == "columns":
+      return OrderedDict([("count", len(records)), ("columns", self.columns(records))])
+    return OrderedDict([("count", len(records)), ("records", records)])
+
+
+  def handle(self, method, target, body):
+    """HTTPのメソッド、パスとクエリ、本文から(ステータスコード, 返却する辞書型)を作ります
+
+    Arguments:
+      method {str} -- GET、POST、DELETE
+      target {str} -- /parse?command=... のようなパスとクエリ
+      body {bytes} -- 本文
+
+    Returns:
+      tuple -- (ステータスコード, JSONにする辞書型)
+    """
+    url = urlsplit(target)
+    path = url.path.rstrip("/")
+    params = dict(parse_qsl(url.query))
+    try:
+      limit = int(params["limit"]) if "limit" in params else None
+
+      if method == "GET" and path == "/health":
+        return 200, {"status": "ok", "datasets": len(self.datasets)}
+
+      if method == "POST" and path == "/parse":
+        lines = [line.rstrip() for line in body.decode("utf-8", "replace").splitlines()]
+        records = self.parse_lines(params.get("command"), lines)
+        if params.get("dataset"):
+          with self.lock:
+            self.datasets[params["dataset"]] = records
+        return 200, self.respond(self.select(records, [], limit, params.get("where")), params)
+
+      if method == "POST" and path == "/load":
+        # どのクライアントからでもデーモンが読めるファイルを読ませられないように、data_dirの中に限る
+        if self.data_dir is None:
+          return 403, {"error": "load is disabled, start the daemon with --data-dir"}
+        if not params.get("path") or not params.get("dataset"):
+          return 400, {"error": "path and dataset are required"}
+        filename = self.resolve(params["path"])
+        if filename is None:
+          return 403, {"error": "path is outside the data directory: %s" % params["path"]}
+        records = self.load(params.get("command"), filename)
+        with self.lock:
+          self.datasets[params["dataset"]] = records
+        return 200, {"dataset": params["dataset"], "count": len(records)}
+
+      if method == "GET" and path == "/datasets":
+        with self.lock:
+          return 200, {name: len(records) for name, records in self.datasets.items()}
+
+      if path.startswith("/datasets/"):
+        name = unquote(path[len("/datasets/"):])
+        with self.lock:
+          records = self.datasets.get(name)
+          if records is not None and method == "DELETE":
+            del self.datasets[name]
+        if records is None:
+          return 404, {"error": "dataset not found: %s" % name}
+        if method == "DELETE":
+          return 200, {"deleted": name}
+        if method == "GET":
+          conditions = [(k, v) for k, v in params.items() if k not in self.reserved]
+          return 200, self.respond(self.select(records, conditions, limit, params.get("where")), params)
+
+      return 404, {"error": "not found: %s %s" % (method, path)}
+    except ValueError as e:
+      return 400, {"error": str(e)}
+    except IOError as e:
+      return 404, {"error": str(e)}
+    except Exception as e:  # pylint: disable=broad-except
+      # 応答を返さずに接続が切れることがないように、想定していない例外も500で返す
+      logger.exception("%s %s", method, target)
+      return 500, {"error": "%s: %s" % (type(e).__name__, e)}
+
+
+class ParserRequestHandler(BaseHTTPRequestHandler):
+  """HTTPの依頼をParserServiceに渡すハンドラです。keep-aliveで接続を使い回します"""
+
+  protocol_version = "HTTP/1.1"
+
+  # ヘッダと本文を別々に書くので、Nagleを止めないと遅延ACKと重なって1回に数十ミリ秒待たされる
+  disable_nagle_algorithm = True
+
+  def dispatch(self):
+    length = int(self.headers.get("Content-Length") or 0)
+    body = self.rfile.read(length) if length else b""
+    status, obj = self.server.service.handle(self.command, self.path, body)
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json; charset=utf-8")
+    self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  do_GET = dispatch
+  do_POST = dispatch
+  do_DELETE = dispatch
+
+  def address_string(self):
+    # Unixソケットではclient_addressが空文字列になる
+    return self.client_address[0] if self.client_address else "unix"
+
+  def log_message(self, format, *args):
+    logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  """Unixソケットで待ち受けるHTTPサーバーです"""
+
+  daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8765, unix=None):
+  """serviceを載せたHTTPサーバーを作ります。unixを指定するとUnixソケットで待ち受けます"""
+  if unix:
+    if os.path.exists(unix):
+      os.remove(unix)
+    server = UnixHTTPServer(unix, ParserRequestHandler)
+  else:
+    server = ThreadingHTTPServer((host, port), ParserRequestHandler)
+    server.daemon_threads = True
+  server.service = service
+  return server
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import sys
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='keep parsers resident and serve parse requests over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--unix', metavar='socket_path', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--data-dir', dest='data_dir', metavar='data_dir', help='Directory /load may read from; /load is disabled without it')
+    parser.add_argument('--cache', dest='cache_dir', metavar='cache_dir', help='Parse result cache for /load')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if args.verbose:
+      logger.setLevel(logging.DEBUG)
+      for handler in logger.handlers:
+        handler.setLevel(logging.DEBUG)
+
+    server = make_server(ParserService(args.cache_dir, args.data_dir), args.host, args.port, args.unix)
+    logger.info("listening on %s", args.unix or "%s:%s" % (args.host, args.port))
+    try:
+      server.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      server.server_close()
+      if args.unix and os.path.exists(args.unix):
+        os.remove(args.unix)
+    return 0
+
+
+  # 実行
+  sys.exit(main())
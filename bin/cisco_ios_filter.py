@@ -0,0 +1,503 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パース結果を絞り込む条件式を、一度だけコンパイルして使い回すためのモジュールです。
+
+各パーサーのget_filter_result()はフィルタ関数を1つずつ呼び出すので、レコードごと、条件ごとに関数呼び出しが発生します。
+ここでは条件式をPythonの式のソースコードに変換してからコンパイルします。
+
+  Status == "connected" and Speed == "10G" and Vlan in (10, 20)
+  ->  d.get('Status', '') == _c0 and d.get('Speed', '') == _c1 and _num(d.get('Vlan', '')) in _c2
+
+こうしておくと、andやorの短絡評価はPythonがそのまま行います。
+select()はリスト内包表記としてコンパイルしてあるので、レコードごとに関数を呼ぶこともありません。
+
+書式
+
+  比較      フィールド 演算子 値        演算子は == != < <= > >= ~(正規表現で検索) !~(検索して一致しない)
+  集合      フィールド in (値, 値, ...)   not inも使えます
+  論理      and or not と括弧
+  フィールド 英数字の名前。空白を含む名前は"output drops"のように引用符で囲みます
+  値        数値、引用符で囲んだ文字列、空白を含まない文字列(10Gなど)
+
+値が数値のときはレコードの値も数値に変換して比較します。変換できない値はどの比較にも一致しません。
+~の正規表現は既存のfilter_*()と同じく大文字小文字を区別しません。コンパイルした正規表現はキャッシュします。
+
+andで並んだ条件は、既定では安い比較(==)から順に評価するように並べ替えます。
+sampleにレコードを渡すと、実際に一致する割合を数えて、よく落とす条件から順に評価するように並べ替えます。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_filter.py
+
+  >>> records = [{"Port": "Te1/1/1", "Status": "connected", "Vlan": "10", "Speed": "10G"},
+  ...            {"Port": "Te1/1/2", "Status": "notconnect", "Vlan": "20", "Speed": "10G"},
+  ...            {"Port": "Gi1/1/1", "Status": "connected", "Vlan": "trunk", "Speed": "a-1000"}]
+  >>> f = compile_filter('Status == "connected" and Speed == 10G and Vlan in (10, 20)')
+  >>> [d["Port"] for d in f.select(records)]
+  ['Te1/1/1']
+  >>> f.predicate(records[1])
+  False
+  >>> [d["Port"] for d in compile_filter('not Port ~ "^te" or Vlan == trunk').select(records)]
+  ['Gi1/1/1']
+
+  数値に変換できない値は!=やnot inにも一致しません。~は文字列でない値にも使えます。
+
+  >>> [d["Port"] for d in compile_filter('Vlan != 10').select(records)]
+  ['Te1/1/2']
+  >>> [d["Port"] for d in compile_filter('Vlan not in (10, 30)').select(records)]
+  ['Te1/1/2']
+  >>> compile_filter('mask ~ 2').predicate({"mask": 24})
+  True
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import ast
+import functools
+import re
+
+#
+# 関数定義
+#
+
+@functools.lru_cache(maxsize=256)
+def compile_regex(pattern, flags=re.IGNORECASE):
+  """正規表現をコンパイルします。同じパターンは2回目からキャッシュを返します"""
+  return re.compile(pattern, flags)
+
+
+def to_number(v):
+  """値を数値に変換します。変換できなければNaNを返却します。NaNはどの比較にも一致しません
+
+  >>> to_number("10"), to_number(24), to_number("1.5"), to_number("trunk") == to_number("trunk")
+  (10, 24, 1.5, False)
+  """
+  if type(v) is int or type(v) is float:
+    return v
+  try:
+    return int(v)
+  except (TypeError, ValueError):
+    pass
+  try:
+    return float(v)
+  except (TypeError, ValueError):
+    return NAN
+
+
+NAN = float("nan")
+
+
+def not_equal(n, value):
+  """数値に変換した値の!=です。NaNはFalseにします。NaN != 値はTrueになってしまうので、この関数で比べます
+
+  >>> not_equal(to_number("20"), 10), not_equal(to_number("trunk"), 10)
+  (True, False)
+  """
+  return n == n and n != value
+
+
+def not_in(n, values):
+  """数値に変換した値のnot inです。NaNはFalseにします
+
+  >>> not_in(to_number("30"), {10, 20}), not_in(to_number("routed"), {10, 20})
+  (True, False)
+  """
+  return n == n and n not in values
+
+# 字句
+TOKEN = re.compile(r"""\s*(?:
+  (?P<number>-?\d+(?:\.\d+)?)(?![\w./\-])
+  |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  |(?P<op>==|!=|<=|>=|!~|<|>|~|\(|\)|,)
+  |(?P<word>[\w][\w./\-:]*)
+)""", re.VERBOSE)
+
+# 比較演算子ごとの評価の重さの目安。並べ替えで軽いものを先にする
+COST = {"==": 1, "!=": 1, "in": 2, "not in": 2, "<": 3, "<=": 3, ">": 3, ">=": 3, "~": 5, "!~": 5}
+
+
+def tokenize(expr):
+  """条件式を(種類, 値)のリストに分割します
+
+  >>> tokenize('"output drops" > 0 and Speed == 10G')
+  [('string', 'output drops'), ('op', '>'), ('number', 0), ('word', 'and'), ('word', 'Speed'), ('op', '=='), ('word', '10G')]
+  """
+  tokens = []
+  pos = 0
+  expr = expr.rstrip()
+  while pos < len(expr):
+    m = TOKEN.match(expr, pos)
+    if not m or m.end() == pos:
+      raise ValueError("invalid filter expression at %s: %s" % (pos, expr[pos:]))
+    pos = m.end()
+    kind = m.lastgroup
+    value = m.group(kind)
+    if kind == "number":
+      value = ast.literal_eval(value)
+    elif kind == "string":
+      value = ast.literal_eval(value)
+    tokens.append((kind, value))
+  return tokens
+
+
+class ExpressionParser(object):
+  """字句のリストを構文木にする再帰下降パーサーです。
+
+  構文木は次のタプルです。
+    ("and", [子, ...]) ("or", [子, ...]) ("not", 子) ("cmp", フィールド, 演算子, 値)
+  """
+
+  def __init__(self, tokens):
+    self.tokens = tokens
+    self.pos = 0
+
+
+  def peek(self):
+    return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+
+  def keyword(self, word):
+    kind, value = self.peek()
+    if kind == "word" and value.lower() == word:
+      self.pos += 1
+      return True
+    return False
+
+
+  def expect(self, op):
+    kind, value = self.peek()
+    if kind != "op" or value != op:
+      raise ValueError("'%s' expected but got %s" % (op, value))
+    self.pos += 1
+
+
+  def parse(self):
+    node = self.parse_or()
+    if self.pos != len(self.tokens):
+      raise ValueError("unexpected token: %s" % (self.peek()[1],))
+    return node
+
+
+  def parse_or(self):
+    nodes = [self.parse_and()]
+    while self.keyword("or"):
+      nodes.append(self.parse_and())
+    return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+
+  def parse_and(self):
+    nodes = [self.parse_not()]
+    while self.keyword("and"):
+      nodes.append(self.parse_not())
+    return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+
+  def parse_not(self):
+    if self.keyword("not"):
+      return ("not", self.parse_not())
+    kind, value = self.peek()
+    if kind == "op" and value == "(":
+      self.pos += 1
+      node = self.parse_or()
+      self.expect(")")
+      return node
+    return self.parse_comparison()
+
+
+  def parse_comparison(self):
+    kind, field = self.peek()
+    if kind not in ("word", "string"):
+      raise ValueError("field name expected but got %s" % (field,))
+    self.pos += 1
+
+    if self.keyword("in"):
+      return ("cmp", field, "in", self.parse_values())
+    if self.keyword("not"):
+      if not self.keyword("in"):
+        raise ValueError("'in' expected after 'not'")
+      return ("cmp", field, "not in", self.parse_values())
+
+    kind, op = self.peek()
+    if kind != "op" or op not in COST:
+      raise ValueError("operator expected after %s" % field)
+    self.pos += 1
+    return ("cmp", field, op, self.parse_value())
+
+
+  def parse_value(self):
+    kind, value = self.peek()
+    if kind not in ("number", "string", "word"):
+      raise ValueError("value expected but got %s" % (value,))
+    self.pos += 1
+    return value
+
+
+  def parse_values(self):
+    self.expect("(")
+    values = [self.parse_value()]
+    while self.peek() == ("op", ","):
+      self.pos += 1
+      values.append(self.parse_value())
+    self.expect(")")
+    return tuple(values)
+
+
+def parse_expression(expr):
+  """条件式を構文木にします
+
+  >>> parse_expression('a == 1 and (b ~ x or not c in (1, 2))')
+  ('and', [('cmp', 'a', '==', 1), ('or', [('cmp', 'b', '~', 'x'), ('not', ('cmp', 'c', 'in', (1, 2)))])])
+  """
+  return ExpressionParser(tokenize(expr)).parse()
+
+
+def cost(node):
+  """構文木の評価の重さの目安を返却します"""
+  if node[0] == "cmp":
+    return COST[node[2]]
+  if node[0] == "not":
+    return cost(node[1])
+  return sum(cost(n) for n in node[1])
+
+
+#
+# クラス定義
+#
+
+class FilterCompiler(object):
+  """構文木をPythonの式のソースコードに変換してコンパイルするクラスです。
+
+  値はソースコードに埋め込まず、名前空間の定数として渡します。フィールド名はrepr()で埋め込みます。
+
+  modeはレコードの値の取り出し方です。
+    item    辞書型 d.get(フィールド, "")
+    attr    オブジェクトの属性 getattr(d, フィールド, "")  IPv4RouteEntry向け
+    column  列形式 {フィールド: [値, ...]} の各列をzip()して取り出した変数
+  """
+
+  def __init__(self, mode="item", sample=None):
+    if mode not in ("item", "attr", "column"):
+      raise ValueError("unknown mode: %s" % mode)
+    self.mode = mode
+    self.sample = sample
+    self.namespace = {"_num": to_number, "_ne": not_equal, "_not_in": not_in}
+    self.columns = []
+
+
+  def constant(self, value):
+    """値を名前空間に登録して、その名前を返却します"""
+    name = "_c%d" % len(self.namespace)
+    self.namespace[name] = value
+    return name
+
+
+  def field(self, name):
+    """フィールドの値を取り出す式を返却します"""
+    if self.mode == "item":
+      return "d.get(%r, '')" % name
+    if self.mode == "attr":
+      return "getattr(d, %r, '')" % name
+    if name not in self.columns:
+      self.columns.append(name)
+    return "_v%d" % self.columns.index(name)
+
+
+  def source(self, node):
+    """構文木から式のソースコードを作ります"""
+    kind = node[0]
+    if kind == "not":
+      return "not (%s)" % self.source(node[1])
+    if kind in ("and", "or"):
+      children = self.reorder(kind, node[1])
+      return (" %s " % kind).join("(%s)" % self.source(n) for n in children)
+
+    _, name, op, value = node
+    v = self.field(name)
+    if self.mode == "attr":
+      v_str = "str(%s)" % v
+    else:
+      v_str = v
+
+    if op in ("~", "!~"):
+      # 正規表現は文字列にしか使えないので、数値の値(show ip routeのmaskなど)もstr()する
+      search = self.constant(compile_regex(str(value)).search)
+      expr = "%s(str(%s)) is not None" % (search, v)
+      return expr if op == "~" else "not (%s)" % expr
+
+    if op in ("in", "not in"):
+      if all(isinstance(x, (int, float)) for x in value):
+        values = self.constant(frozenset(value))
+        if op == "not in":
+          return "_not_in(_num(%s), %s)" % (v, values)
+        return "_num(%s) in %s" % (v, values)
+      return "%s %s %s" % (v_str, op, self.constant(frozenset(str(x) for x in value)))
+
+    if isinstance(value, (int, float)):
+      # 数値に変換できない値はどの比較にも一致させない。!=だけはNaNでTrueになるので関数で比べる
+      if op == "!=":
+        return "_ne(_num(%s), %s)" % (v, self.constant(value))
+      return "_num(%s) %s %s" % (v, op, self.constant(value))
+    return "%s %s %s" % (v_str, op, self.constant(value))
+
+
+  def reorder(self, kind, children):
+    """andやorで並んだ条件を、短絡評価が早く効く順に並べ替えます
+
+    sampleがあれば一致する割合を数え、andは一致しにくいものから、orは一致しやすいものから評価します。
+    同じ割合なら評価の軽いものを先にします。sampleがなければ評価の軽さだけで並べます。
+    """
+    if not self.sample:
+      return sorted(children, key=cost)
+
+    def rate(node):
+      predicate = FilterCompiler(self.mode).compile(node).predicate
+      if self.mode == "column":
+        return 0.0
+      hits = sum(1 for d in self.sample if predicate(d))
+      return hits / len(self.sample)
+
+    rates = {id(n): rate(n) for n in children}
+    if kind == "and":
+      return sorted(children, key=lambda n: (rates[id(n)], cost(n)))
+    return sorted(children, key=lambda n: (-rates[id(n)], cost(n)))
+
+
+  def compile(self, node, expr=""):
+    """構文木をコンパイルしてCompiledFilterを返却します"""
+    body = self.source(node)
+    namespace = dict(self.namespace)
+
+    if self.mode == "column":
+      names = ", ".join("_v%d" % i for i in range(len(self.columns))) + ","
+      cols = ", ".join("_col(cols, %r)" % c for c in self.columns)
+      namespace["_col"] = column_of
+      mask_source = "lambda cols: [(%s) for %s in zip(%s)]" % (body, names, cols)
+      return CompiledFilter(expr, body, mask=eval(mask_source, namespace))
+
+    predicate = eval("lambda d: bool(%s)" % body, namespace)
+    select = eval("lambda records: [d for d in records if %s]" % body, namespace)
+    return CompiledFilter(expr, body, predicate=predicate, select=select)
+
+
+def column_of(cols, name):
+  """列形式から列を取り出します。ない列は空文字列の列にします"""
+  col = cols.get(name)
+  if col is None:
+    n = len(next(iter(cols.values()))) if cols else 0
+    col = [""] * n
+  return col
+
+
+class CompiledFilter(object):
+  """コンパイル済みの条件式です。
+
+  Attributes:
+    expr {str} -- 元の条件式
+    source {str} -- 生成したPythonの式
+    predicate {function} -- レコードを1つ受け取り、一致すればTrueを返す関数
+    select {function} -- レコードのリストを受け取り、一致したもののリストを返す関数
+    mask {function} -- 列形式を受け取り、各行が一致するかどうかのリストを返す関数(mode="column")
+  """
+
+  def __init__(self, expr, source, predicate=None, select=None, mask=None):
+    self.expr = expr
+    self.source = source
+    self.predicate = predicate
+    self.select = select
+    self.mask = mask
+
+
+  def __call__(self, d):
+    """get_filter_result()に渡すフィルタ関数と同じく、一致すればdを、しなければNoneを返却します"""
+    return d if self.predicate(d) else None
+
+
+  def __repr__(self):
+    return "CompiledFilter(%r)" % self.expr
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_cached(expr, mode):
+  return FilterCompiler(mode).compile(parse_expression(expr), expr)
+
+
+def compile_filter(expr, mode="item", sample=None):
+  """条件式をコンパイルしてCompiledFilterを返却します。
+
+  sampleを渡さなければ、同じ条件式は2回目からキャッシュを返します。
+
+  Arguments:
+    expr {str} -- 条件式
+
+  Keyword Arguments:
+    mode {str} -- item(辞書型)、attr(IPv4RouteEntryなどのオブジェクト)、column(列形式) (default: {"item"})
+    sample {list} -- 条件の並べ替えに使うレコードのサンプル (default: {None})
+
+  Returns:
+    CompiledFilter -- コンパイル済みの条件式
+
+  >>> from collections import namedtuple
+  >>> Route = namedtuple("Route", "proto addr mask")
+  >>> routes = [Route("O E1", "10.1.22.0", 24), Route("C", "10.1.0.0", 16), Route("L", "192.168.0.1", 32)]
+  >>> compile_filter('addr ~ "^10\\\\." and mask >= 24', mode="attr").select(routes)
+  [Route(proto='O E1', addr='10.1.22.0', mask=24)]
+  >>> compile_filter('Vlan in (10, 20) or Status == err-disabled', mode="column").mask({"Vlan": ["10", "30"], "Status": ["", ""]})
+  [True, False]
+  >>> f = compile_filter('b == 1 and a ~ x', sample=[{"a": "x", "b": "1"}, {"a": "x", "b": "2"}])
+  >>> f.source
+  "(_num(d.get('b', '')) == _c3) and (_c4(str(d.get('a', ''))) is not None)"
+  >>> compile_filter('a ==')
+  Traceback (most recent call last):
+    ...
+  ValueError: value expected but got None
+  """
+  if sample is None:
+    return _compile_cached(expr, mode)
+  return FilterCompiler(mode, sample=sample).compile(parse_expression(expr), expr)
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import sys
+  import time
+
+  def main():
+    """メイン関数。合成したレコードで条件式の評価速度を測ります
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='benchmark a compiled filter expression.')
+    parser.add_argument('-n', type=int, default=1000000, help='Number of records (default: 1000000)')
+    parser.add_argument('expr', nargs='?', default='Status == "connected" and Speed == "10G" and Vlan in (10, 20)')
+    args = parser.parse_args()
+
+    statuses = ["connected", "notconnect", "disabled", "err-disabled"]
+    speeds = ["10G", "a-1000", "auto"]
+    records = [{"Port": "Te1/1/%d" % i, "Status": statuses[i % 4], "Speed": speeds[i % 3], "Vlan": str(i % 40)} for i in range(args.n)]
+
+    start = time.perf_counter()
+    f = compile_filter(args.expr, sample=records[:1000])
+    compiled = time.perf_counter() - start
+    print("source: {0}".format(f.source))
+
+    start = time.perf_counter()
+    selected = f.select(records)
+    elapsed = time.perf_counter() - start
+    print("compile {0:.3f} ms, select {1} of {2} records in {3:.3f} sec ({4:.0f} records/sec)".format(
+      compiled * 1000, len(selected), len(records), elapsed, len(records) / elapsed))
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーに渡す入力ファイルを開くためのモジュールです。
+
+bin/にある各スクリプトのget_lines()はここにあります。
+行は1行ずつ取り出してその場でrstrip()しますので、入力がどれだけ大きくてもメモリの使用量は増えません。
+
+gzip、bzip2、xz、zstdで圧縮されたファイルは、拡張子ではなくファイル先頭のマジックバイトで判別し、
+展開しながら1行ずつ読み出します。展開したファイルを作ったり、ファイル全体をメモリに載せることはありません。
+
+圧縮ファイルの展開は別スレッドで行いますので、展開とパースが並行して進みます。
+zlib、bz2、lzmaは展開中にGILを解放するため、スレッドでも効果があります。
+
+zstdを読むにはzstandardモジュールが必要です。インストールされていなければIOErrorになります。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_input.py
+
+  >>> import gzip, os, tempfile
+  >>> filename = os.path.join(tempfile.mkdtemp(), "show_logging.log.gz")
+  >>> with gzip.open(filename, "wt", encoding="utf-8") as f:
+  ...   _ = f.write("line1  \\nline2\\n")
+  >>> detect_compression(filename)
+  'gzip'
+  >>> lines = read_lines(filename)
+  >>> list(lines)
+  ['line1', 'line2']
+  >>> lines.count
+  2
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import io
+import itertools
+import logging
+import mmap
+import queue
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+#
+# クラス変数
+#
+
+# 先頭のバイト列と圧縮形式の対応
+MAGIC_NUMBERS = [
+  (b"\x1f\x8b", "gzip"),
+  (b"BZh", "bz2"),
+  (b"\xfd7zXZ\x00", "xz"),
+  (b"\x28\xb5\x2f\xfd", "zstd"),
+]
+
+# マジックバイトの判別に必要なバイト数
+MAGIC_LENGTH = max(len(magic) for magic, _ in MAGIC_NUMBERS)
+
+# 圧縮されていないファイルを読むときのバッファサイズ
+BUFFER_SIZE = 1024 * 1024
+
+# bytesのままでは結果がstrと変わりうるASCII文字。strのrstrip()と\sでだけ空白として扱われる
+ASCII_UNSAFE = (b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+
+
+def detect_compression(filename):
+  """filenameの先頭のバイト列から圧縮形式を判別します。
+
+  Returns:
+    str -- 'gzip', 'bz2', 'xz', 'zstd'のいずれか。圧縮されていなければNone
+  """
+  with open(filename, mode="rb") as f:
+    head = f.read(MAGIC_LENGTH)
+  for magic, compression in MAGIC_NUMBERS:
+    if head.startswith(magic):
+      return compression
+  return None
+
+
+def open_binary(filename, compression=None):
+  """filenameを開いて、展開済みのバイト列を読めるファイルオブジェクトを返却します"""
+  f = open(filename, mode="rb", buffering=BUFFER_SIZE)
+  if compression == "gzip":
+    import gzip
+    return gzip.GzipFile(fileobj=f, mode="rb")
+  if compression == "bz2":
+    import bz2
+    return bz2.BZ2File(f, mode="rb")
+  if compression == "xz":
+    import lzma
+    return lzma.LZMAFile(f, mode="rb")
+  if compression == "zstd":
+    try:
+      import zstandard
+    except ImportError:
+      f.close()
+      raise IOError("zstandard module is required to read %s" % filename)
+    return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+  return f
+
+
+def open_input(filename, encoding="utf-8", errors="strict", compression="auto"):
+  """filenameを圧縮形式に応じて開き、テキストとして読めるファイルオブジェクトを返却します"""
+  if compression == "auto":
+    compression = detect_compression(filename)
+  f = open_binary(filename, compression)
+  if not isinstance(f, io.BufferedIOBase):
+    f = io.BufferedReader(f)
+  return io.TextIOWrapper(f, encoding=encoding, errors=errors)
+
+
+class LineReader(object):
+  """ファイルオブジェクトから右端の空白を削除した行を1行ずつ取り出すイテレータです。
+
+  threaded=Trueにすると、別スレッドでbatch_sizeバイト程度ずつ行を読み、キューを介して受け渡します。
+  キューの長さはqueue_sizeで制限しますので、パースが遅くても読み込みだけが先に進みすぎることはありません。
+
+  Attributes:
+    count (int): これまでに取り出した行数
+
+  >>> import io
+  >>> LineReader(io.StringIO("")).is_empty()
+  True
+  >>> f = io.StringIO("line1  \\nline2\\n")
+  >>> lines = LineReader(f, close_file=False)
+  >>> lines.is_empty(), list(lines), f.closed
+  (False, ['line1', 'line2'], False)
+  """
+
+  # スレッドで一度に読むバイト数の目安
+  batch_size = 256 * 1024
+
+  # キューに溜めるまとまりの数
+  queue_size = 16
+
+  def __init__(self, f, threaded=False, close_file=True):
+    """コンストラクタ
+
+    Arguments:
+      f {file} -- テキストモードで開いたファイルオブジェクト
+
+    Keyword Arguments:
+      threaded {bool} -- 別スレッドで読み込む場合はTrue (default: {False})
+      close_file {bool} -- 読み終えたらfを閉じる場合はTrue。標準入力のように自分で開いていないものはFalse (default: {True})
+    """
+    self.f = f
+    self.threaded = threaded
+    self.close_file = close_file
+    self.count = 0
+    self.stopped = threading.Event()
+    self.reader = None
+    self.head = None
+
+
+  def batches(self):
+    """行のまとまりをyieldするジェネレータを返却します。何度呼んでも同じものを返します"""
+    if self.reader is None:
+      self.reader = self.read_batches_threaded() if self.threaded else self.read_batches()
+    return self.reader
+
+
+  def is_empty(self):
+    """1行もなければTrueを返却します。取り出し始める前に使います
+
+    先頭のまとまりを読んで確かめます。読んだ行は捨てずに、取り出すときに最初に返します。
+    """
+    if self.head is None:
+      self.head = next(self.batches(), [])
+    return not self.head
+
+
+  def __iter__(self):
+    batches = self.batches()
+    try:
+      if self.head:
+        batches = itertools.chain([self.head], batches)
+        self.head = []
+      for batch in batches:
+        self.count += len(batch)
+        for line in batch:
+          yield line.rstrip()
+    finally:
+      self.close()
+
+
+  def read_batches(self):
+    """同じスレッドで行のまとまりをyieldします"""
+    readlines = self.f.readlines
+    batch_size = self.batch_size
+    while True:
+      batch = readlines(batch_size)
+      if not batch:
+        return
+      yield batch
+
+
+  def read_batches_threaded(self):
+    """別スレッドで読んだ行のまとまりをキューから取り出してyieldします"""
+    q = queue.Queue(self.queue_size)
+    thread = threading.Thread(target=self.produce, args=(q,), daemon=True)
+    thread.start()
+    while True:
+      batch = q.get()
+      if batch is None:
+        return
+      if isinstance(batch, BaseException):
+        raise batch
+      yield batch
+
+
+  def produce(self, q):
+    """スレッドの本体。読んだ行のまとまりをキューに入れ、最後にNoneを入れます。"""
+    try:
+      for batch in self.read_batches():
+        if not self.put(q, batch):
+          return
+      self.put(q, None)
+    except Exception as e:  # pylint: disable=broad-except
+      self.put(q, e)
+    finally:
+      if self.close_file:
+        self.f.close()
+
+
+  def put(self, q, item):
+    """itemをキューに入れます。利用側が途中でやめた場合は待つのをやめてFalseを返却します。"""
+    while not self.stopped.is_set():
+      try:
+        q.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+
+  def close(self):
+    """読み込みを止めてファイルを閉じます。close_fileがFalseなら閉じません"""
+    self.stopped.set()
+    if not self.threaded and self.close_file:
+      self.f.close()
+
+
+class ByteLineReader(LineReader):
+  """read_byte_lines()の行をLineReaderと同じように取り出すイテレータです。
+
+  ASCIIだけの行はbytesのまま取り出しますので、パーサーのparse_bytes()に渡してください。
+
+  >>> import os, tempfile
+  >>> filename = os.path.join(tempfile.mkdtemp(), "show_int_status.log")
+  >>> with open(filename, "wb") as f:
+  ...   _ = f.write(b"Te1/1/1  connected  \\r\\n")
+  >>> lines = ByteLineReader(filename)
+  >>> lines.is_empty(), list(lines), lines.count
+  (False, [b'Te1/1/1  connected'], 1)
+  """
+
+  # is_empty()で先読みする行数
+  lines_per_batch = 1
+
+  def __init__(self, filename, encoding="utf-8", errors="strict"):
+    """コンストラクタ
+
+    Arguments:
+      filename {str} -- ファイル名
+
+    Keyword Arguments:
+      encoding {str} -- ASCII以外を含む行のエンコーディング (default: {"utf-8"})
+      errors {str} -- デコードできなかったときの扱い (default: {"strict"})
+    """
+    super(ByteLineReader, self).__init__(None, close_file=False)
+    self.lines = read_byte_lines(filename, encoding, errors)
+
+
+  def read_batches(self):
+    """read_byte_lines()の行をlines_per_batch行ずつyieldします"""
+    lines = self.lines
+    n = self.lines_per_batch
+    while True:
+      batch = list(itertools.islice(lines, n))
+      if not batch:
+        return
+      yield batch
+
+
+  def __iter__(self):
+    # read_byte_lines()が右端の空白を削除済みなので、まとめ直さずにそのまま渡す
+    count = self.count
+    try:
+      if self.head:
+        self.count += len(self.head)
+        yield from self.head
+        self.head = []
+      count = self.count
+      for count, line in enumerate(self.lines, count + 1):
+        yield line
+    finally:
+      self.count = max(self.count, count)
+      self.close()
+
+
+  def close(self):
+    """読み込みを止めてファイルを閉じます"""
+    self.stopped.set()
+    self.lines.close()
+
+
+def read_lines(filename, encoding="utf-8", errors="strict"):
+  """filenameを開いて、右端の空白を削除した行を順に取り出すLineReaderを返却します。
+
+  圧縮ファイルは別スレッドで展開します。ファイルはこの時点で開きますので、開けなければIOErrorになります。
+  """
+  compression = detect_compression(filename)
+  f = open_input(filename, encoding, errors, compression)
+  return LineReader(f, threaded=compression is not None)
+
+
+def read_byte_lines(filename, encoding="utf-8", errors="strict"):
+  """filenameをmmapで開いて、右端の空白を削除した行を順にyieldします。
+
+  ASCIIだけの行はデコードせずにbytesのままyieldします。パーサーのparse_bytes()に渡してください。
+  それ以外の行はstrにデコードしてyieldしますので、パーサーはparse()と同じように処理できます。
+
+  strの\sにだけマッチする\x1c-\x1fがファイルに含まれている場合と、mmapできない圧縮ファイルの場合は、
+  すべての行をstrにデコードしてyieldします。どの場合もパースした結果はparse()と同じになります。
+
+  >>> import os, tempfile
+  >>> filename = os.path.join(tempfile.mkdtemp(), "show_logging.log")
+  >>> with open(filename, "wb") as f:
+  ...   _ = f.write("line1  \\r\\nDescription: \u30c6\u30b9\u30c8\\n".encode("utf-8"))
+  >>> list(read_byte_lines(filename))
+  [b'line1', 'Description: \u30c6\u30b9\u30c8']
+  """
+  if detect_compression(filename) is not None:
+    yield from read_lines(filename, encoding, errors)
+    return
+
+  with open(filename, mode="rb") as f:
+    try:
+      data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+      # 空のファイルはmmapできない
+      return
+
+  with data:
+    if any(data.find(c) >= 0 for c in ASCII_UNSAFE):
+      for line in iter(data.readline, b""):
+        yield line.decode(encoding, errors).rstrip()
+      return
+
+    # 1行ずつreadline()するより、改行で区切ったまとまりをsplit()するほうが速い
+    pos, size = 0, len(data)
+    while pos < size:
+      end = data.find(b"\n", pos + BUFFER_SIZE)
+      end = size if end < 0 else end + 1
+      chunk = data[pos:end]
+      pos = end
+      lines = chunk.split(b"\n")
+      if chunk.endswith(b"\n"):
+        lines.pop()
+      if chunk.isascii():
+        yield from map(bytes.rstrip, lines)
+        continue
+      for line in lines:
+        line = line.rstrip()
+        if line.isascii():
+          yield line
+        else:
+          yield line.decode(encoding, errors).rstrip()
+
+
+def get_lines(filename, log=None, binary=False):
+  """filenameのファイルを開いて、各行を順に取り出すイテレータを返却します。
+
+  ファイル名が-の場合は標準入力から読み込みます。
+  gzip、bzip2、xz、zstdで圧縮されたファイルは展開しながら読み込みます。
+
+  binaryがTrueなら、ファイルはByteLineReaderで読み、ASCIIだけの行をbytesのまま返します。
+  パーサーのparse_bytes()に渡してください。標準入力は常にstrの行を返しますが、parse_bytes()はstrの行も扱えます。
+
+  Arguments:
+    filename {string} -- ファイル名
+
+  Keyword Arguments:
+    log {logging.Logger} -- 開いたこと、開けなかったことを記録するロガー (default: {None})
+    binary {bool} -- ASCIIだけの行をbytesのまま返す場合はTrue (default: {False})
+
+  Returns:
+    [LineReader] -- 行のイテレータ。右端の改行コードと空白文字列は削除済み。読んだ行数はcountで分かる。
+                    ファイルを開けなかった場合はNone。空のファイルかどうかはis_empty()で分かる
+  """
+  log = log if log else logger
+
+  # ファイル名が-だった場合は標準入力から読み込む
+  if not filename or filename == "-":
+    return LineReader(sys.stdin, close_file=False)
+
+  # ファイルを開く。圧縮されていれば展開しながら読む
+  try:
+    if binary:
+      # 開けるかどうかをここで確かめる。ByteLineReaderは読み始めるまで開かない
+      detect_compression(filename)
+      lines = ByteLineReader(filename)
+    else:
+      lines = read_lines(filename)
+  except IOError:
+    log.warning("failed to open %s", filename)
+    return None
+  log.info("open file %s", filename)
+  return lines
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""コマンドごとに表記が異なるインタフェース名を、正式な名前と整数の番号にそろえます。
+
+同じポートでも、コマンドによって次のように表記が変わります。
+
+  show interfaces         TenGigabitEthernet1/1/1
+  show interfaces status  Te1/1/1
+  show cdp neighbors      Ten 1/1/1
+  show ip route           Vlan102
+  show logging            Po111
+
+canonical_name()は、どの表記からも正式な名前(TenGigabitEthernet1/1/1)を返します。
+同じ名前は何度も出てくるので、結果をLRUキャッシュに残して正規表現を使うのは初回だけにします。
+
+InterfaceIdTableは正式な名前に0から順に番号を振ります。
+コマンドをまたいで突き合わせるときは、文字列ではなくこの番号を比べます。
+番号はプロセスの中でだけ意味を持ちますので、ファイルやデータベースには正式な名前を保存してください。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_interface_name.py
+
+  >>> canonical_name("Te1/1/1"), canonical_name("Ten 1/1/1"), canonical_name("TenGigabitEthernet1/1/1")
+  ('TenGigabitEthernet1/1/1', 'TenGigabitEthernet1/1/1', 'TenGigabitEthernet1/1/1')
+  >>> canonical_name("Po111"), canonical_name(" Vlan102"), canonical_name("Gig 2/1/1")
+  ('Port-channel111', 'Vlan102', 'GigabitEthernet2/1/1')
+  >>> table = InterfaceIdTable()
+  >>> table.id_of("Te1/1/1") == table.id_of("Ten 1/1/1"), table.id_of("Te1/1/2")
+  (True, 1)
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import functools
+
+from cisco_ios_pattern import LazyPattern
+
+#
+# クラス変数
+#
+
+# 正式なインタフェースの種類の名前
+INTERFACE_TYPES = [
+  "Ethernet",
+  "FastEthernet",
+  "GigabitEthernet",
+  "TwoGigabitEthernet",
+  "FiveGigabitEthernet",
+  "TenGigabitEthernet",
+  "TwentyFiveGigE",
+  "FortyGigabitEthernet",
+  "HundredGigE",
+  "AppGigabitEthernet",
+  "Port-channel",
+  "Vlan",
+  "Loopback",
+  "Tunnel",
+  "Serial",
+  "Null",
+  "BDI",
+  "mgmt",
+]
+
+# 先頭からの一致だけでは決まらない、または慣例で決まっている省略形
+ABBREVIATIONS = {
+  "et": "Ethernet",
+  "eth": "Ethernet",
+  "fa": "FastEthernet",
+  "gi": "GigabitEthernet",
+  "gige": "GigabitEthernet",
+  "tw": "TwoGigabitEthernet",
+  "fi": "FiveGigabitEthernet",
+  "te": "TenGigabitEthernet",
+  "tengige": "TenGigabitEthernet",
+  "twe": "TwentyFiveGigE",
+  "fo": "FortyGigabitEthernet",
+  "hu": "HundredGigE",
+  "ap": "AppGigabitEthernet",
+  "po": "Port-channel",
+  "vl": "Vlan",
+  "lo": "Loopback",
+  "tu": "Tunnel",
+  "se": "Serial",
+  "nu": "Null",
+}
+
+# 種類と番号に分ける。番号は数字で始まり、/、.、:を含むことがある
+rex_interface_name = LazyPattern(r"^\s*([A-Za-z][A-Za-z\-]*?)\s*(\d[\d/.:]*)\s*$")
+
+#
+# 関数定義
+#
+
+def interface_type(name):
+  """種類の部分の表記から正式な種類の名前を返却します。決まらなければNoneを返却します
+
+  >>> interface_type("TenGig"), interface_type("te"), interface_type("port"), interface_type("X")
+  ('TenGigabitEthernet', 'TenGigabitEthernet', 'Port-channel', None)
+  """
+  key = name.lower()
+  found = ABBREVIATIONS.get(key)
+  if found:
+    return found
+  candidates = [t for t in INTERFACE_TYPES if t.lower().startswith(key)]
+  return candidates[0] if len(candidates) == 1 else None
+
+
+@functools.lru_cache(maxsize=8192)
+def canonical_name(name):
+  """インタフェース名を正式な名前にして返却します。分からないものは前後の空白を除いてそのまま返却します
+
+  >>> canonical_name("Gi1/0/1.100"), canonical_name("unknown"), canonical_name("")
+  ('GigabitEthernet1/0/1.100', 'unknown', '')
+  """
+  m = rex_interface_name.match(name)
+  if not m:
+    return name.strip()
+  t = interface_type(m.group(1))
+  if t is None:
+    return name.strip()
+  return t + m.group(2)
+
+#
+# クラス定義
+#
+
+class InterfaceIdTable(object):
+  """正式なインタフェース名に番号を振って保持するクラスです。
+
+  番号は装置をまたいで共通です。装置ごとに区別したい場合は(装置, 番号)の組を使ってください。
+  """
+
+  def __init__(self):
+    # 正式な名前をキーに番号を値にした辞書型と、番号の順の正式な名前
+    self.ids = {}
+    self.names = []
+
+
+  def __len__(self):
+    return len(self.names)
+
+
+  def id_of(self, name):
+    """インタフェース名の番号を返却します。初めての名前なら新しい番号を振ります"""
+    canonical = canonical_name(name)
+    i = self.ids.get(canonical)
+    if i is None:
+      i = self.ids[canonical] = len(self.names)
+      self.names.append(canonical)
+    return i
+
+
+  def name_of(self, i):
+    """番号に対応する正式な名前を返却します"""
+    return self.names[i]
+
+
+# プロセスで共通の番号表。パーサーのparse_ids()は既定でこれを使う
+interface_ids = InterfaceIdTable()
+
+
+def add_interface_ids(records, keys, table=None):
+  """レコードのインタフェース名の番号を加えてyieldします
+
+  show ip routeの(IPv4RouteEntry, 行)は、IPv4RouteEntryに番号の属性を加えます。
+  値が空のキーには番号を加えません。
+
+  Arguments:
+    records {iterable} -- パーサーがyieldしたもの
+    keys {tuple} -- (インタフェース名が入っているキー, 番号を入れるキー)のタプル
+
+  Keyword Arguments:
+    table {InterfaceIdTable} -- 番号表。省略時はinterface_ids (default: {None})
+
+  >>> list(add_interface_ids([{"Port": "Te1/1/1"}, {"Port": ""}], (("Port", "Port_id"),), InterfaceIdTable()))
+  [{'Port': 'Te1/1/1', 'Port_id': 0}, {'Port': ''}]
+  """
+  id_of = (table or interface_ids).id_of
+  for record in records:
+    if isinstance(record, tuple):
+      entry = record[0]
+      for key, id_key in keys:
+        value = getattr(entry, key, "")
+        if value:
+          setattr(entry, id_key, id_of(value))
+    else:
+      for key, id_key in keys:
+        value = record.get(key)
+        if value:
+          record[id_key] = id_of(value)
+    yield record
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""装置ごとに、4つのコマンドの結果をインタフェースで突き合わせて1つの表にします。
+
+  show interfaces         状態、ラインプロトコル、説明、エラーのカウンタ
+  show interfaces status  VLAN、デュプレックス、速度、種類
+  show cdp neighbors      つながっているネイバー装置とそのポート
+  show ip route           そのインタフェースから出ていく経路
+
+コマンドごとに表記の違うインタフェース名はcisco_ios_interface_nameで番号にそろえ、
+コマンドごとにその番号をキーにした辞書型(ハッシュの索引)を作ります。
+表にするときはインタフェースの一覧を1回走査して、各索引を引くだけです。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_join.py
+  $ python bin/cisco_ios_join.py capture.log
+  $ python bin/cisco_ios_join.py -o ports.csv capture1.log capture2.log
+
+  >>> lines = []
+  >>> lines.append("sw1#show int status")
+  >>> lines.append("Port          Name               Status       Vlan       Duplex  Speed Type")
+  >>> lines.append("Te1/1/1                          connected    trunk        full    10G 10GBase-SR")
+  >>> lines.append("sw1#show cdp neighbors")
+  >>> lines.append("Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID")
+  >>> lines.append("sw2              Ten 1/1/1         169        R S I       WS-C3750X Ten 2/1/2")
+  >>> lines.append("sw1#show ip route")
+  >>> lines.append("O        10.244.1.0/24 [110/2] via 10.245.11.2, 7w0d, TenGigabitEthernet1/1/1")
+  >>> lines.append("sw1#exit")
+  >>> row = next(join_session(CiscoIosSessionSplitter().parse(lines)))
+  >>> row["device"], row["interface"], row["vlan"], row["neighbors"], row["routes"], row["prefixes"]
+  ('sw1', 'TenGigabitEthernet1/1/1', 'trunk', 'sw2 (Ten 2/1/2)', 1, '10.244.1.0/24')
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+from collections import OrderedDict
+
+from cisco_ios_interface_name import interface_ids
+from cisco_ios_session import CiscoIosSessionSplitter
+
+#
+# クラス定義
+#
+
+class DeviceInterfaceJoin(object):
+  """1台の装置のコマンドの結果を、インタフェースの番号をキーにした辞書型に振り分けて持つクラスです。
+
+  show interfacesとshow interfaces statusはインタフェースごとに1件、
+  show cdp neighborsとshow ip routeはインタフェースごとに複数件になるので、さらに辞書型で持ちます。
+  同じコマンドの出力が何度あっても、同じインタフェース、同じネイバー、同じ経路は後から来たもので上書きします。
+  """
+
+  # 表のキーの一覧。CSV形式で保存する際のヘッダにもなる
+  fieldnames = [
+    "device", "interface", "status", "line protocol", "description",
+    "vlan", "duplex", "speed", "type",
+    "input errors", "crc", "output errors", "output drops",
+    "neighbors", "routes", "prefixes",
+  ]
+
+  def __init__(self, device="", table=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      device {str} -- 装置のホスト名 (default: {""})
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+    """
+    self.device = device
+    self.table = table or interface_ids
+
+    # 番号を、どれかのコマンドで最初に出てきた順に並べたもの。表の行の順番になる
+    self.order = OrderedDict()
+
+    # コマンドごとの索引
+    self.interfaces = {}
+    self.status = {}
+    self.neighbors = {}
+    self.routes = {}
+
+    # コマンド名と振り分けるメソッドの対応
+    self.handlers = {
+      "show interfaces": self.add_interface,
+      "show interfaces status": self.add_status,
+      "show cdp neighbors": self.add_neighbor,
+      "show ip route": self.add_route,
+    }
+
+
+  def key(self, name):
+    """インタフェース名の番号を返却し、表の行の順番に加えます"""
+    i = self.table.id_of(name)
+    self.order[i] = None
+    return i
+
+
+  def add(self, command, record):
+    """CiscoIosSessionSplitterのコマンド名とパース結果を受け取り、索引に振り分けます。対象外のコマンドは無視します"""
+    handler = self.handlers.get(command)
+    if handler is not None:
+      handler(record)
+
+
+  def add_interface(self, d):
+    """show interfacesの辞書型を索引に加えます"""
+    self.interfaces[self.key(d["name"])] = d
+
+
+  def add_status(self, d):
+    """show interfaces statusの辞書型を索引に加えます"""
+    self.status[self.key(d["Port"])] = d
+
+
+  def add_neighbor(self, d):
+    """show cdp neighborsの辞書型を索引に加えます"""
+    self.neighbors.setdefault(self.key(d["local_interface"]), OrderedDict())[(d["device_id"], d["port_id"])] = d
+
+
+  def add_route(self, record):
+    """show ip routeの(IPv4RouteEntry, 行)を索引に加えます。出ていくインタフェースのない経路は無視します"""
+    entry = record[0]
+    if not entry.interface.strip():
+      return
+    self.routes.setdefault(self.key(entry.interface), OrderedDict())[(entry.addr, getattr(entry, "mask", ""), entry.gw)] = entry
+
+
+  def rows(self):
+    """インタフェースごとに各コマンドの情報をまとめた辞書型をyieldします
+
+    どれかのコマンドに出てきたインタフェースはすべて行になります。情報のないところは空文字列です。
+    """
+    empty = {}
+    name_of = self.table.name_of
+    for i in self.order:
+      intf = self.interfaces.get(i, empty)
+      status = self.status.get(i, empty)
+      neighbors = self.neighbors.get(i, empty)
+      routes = self.routes.get(i, empty)
+
+      d = OrderedDict()
+      d["device"] = self.device
+      d["interface"] = name_of(i)
+      d["status"] = intf.get("status", status.get("Status", ""))
+      d["line protocol"] = intf.get("line protocol", "")
+      d["description"] = intf.get("Description", status.get("Name", ""))
+      d["vlan"] = status.get("Vlan", "")
+      d["duplex"] = status.get("Duplex", intf.get("duplex", ""))
+      d["speed"] = status.get("Speed", intf.get("speed", ""))
+      d["type"] = status.get("Type", intf.get("media", ""))
+      d["input errors"] = intf.get("input errors", "")
+      d["crc"] = intf.get("crc", "")
+      d["output errors"] = intf.get("output errors", "")
+      d["output drops"] = intf.get("output drops", "")
+      d["neighbors"] = "; ".join("%s (%s)" % (n["device_id"], n["port_id"]) for n in neighbors.values())
+      d["routes"] = len(routes)
+      d["prefixes"] = " ".join("%s/%s" % (e.addr, getattr(e, "mask", "")) for e in routes.values())
+      yield d
+
+#
+# 関数定義
+#
+
+def join_session(records, table=None):
+  """CiscoIosSessionSplitter.parse()の(ホスト名, コマンド, パース結果)を受け取り、装置ごとに突き合わせた行をyieldします
+
+  装置は最初に出てきた順、行は装置ごとにインタフェースが最初に出てきた順になります。
+  同じ装置のコマンドが複数のファイルに分かれていても1つにまとめます。
+  すべての装置のコマンドの結果を読み終えてから行をyieldします。
+
+  Arguments:
+    records {iterable} -- (ホスト名, コマンド, パース結果)
+
+  Keyword Arguments:
+    table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+  """
+  devices = OrderedDict()
+  for host, command, record in records:
+    device = devices.get(host)
+    if device is None:
+      device = devices[host] = DeviceInterfaceJoin(host, table)
+    device.add(command, record)
+
+  for device in devices.values():
+    yield from device.rows()
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import itertools
+  import logging
+  import os
+  import sys
+
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import open_sink
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='join show interfaces, status, cdp neighbors and ip route per device and interface.')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='file', help='Save the table to a file (.csv, .jsonl, .db, .col)')
+    parser.add_argument('input_filename', nargs='+', help='Session logs to be parsed')
+    args = parser.parse_args()
+
+    splitter = CiscoIosSessionSplitter()
+
+    # ファイルは1つずつ開き、前のファイルを読み終えてから次を開く
+    def records():
+      for filename in args.input_filename:
+        lines = get_lines(filename, logger)
+        if lines is None:
+          continue
+        try:
+          yield from splitter.parse(lines)
+        finally:
+          lines.close()
+
+    rows = join_session(records())
+
+    if args.output_filename:
+      with open_sink(args.output_filename, fieldnames=DeviceInterfaceJoin.fieldnames) as sink:
+        count = sink.consume(rows)
+      logger.info("saved %d rows to %s", count, args.output_filename)
+      return 0
+
+    fields = ["device", "interface", "status", "vlan", "speed", "crc", "neighbors", "routes"]
+    for d in itertools.chain([OrderedDict(zip(fields, fields))], rows):
+      print("{device:<20}{interface:<28}{status:<24}{vlan:<8}{speed:<8}{crc:>8}  {routes:>6}  {neighbors}".format(**d))
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""show loggingやsyslogのファイルに対して、メッセージ(description)の全文検索用の転置インデックスを作ります。
+
+インタフェース名、IPアドレス、単語をトークンにして、トークンごとにそのログが書かれている行の
+バイト位置(オフセット)の一覧を保存します。検索するときはインデックスだけを引き、該当する行だけを読みます。
+
+インデックスはディレクトリで、次のファイルからなります。
+
+  index.json   元のログファイルとセグメントの一覧
+  seg-NNNNN.idx  セグメント。作成時にメモリの上限に達するごとに1つ書き出す
+
+ログファイルに追記されたら、前回の続きから新しいセグメントを追加します。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_logging_index.py
+  $ python bin/cisco_ios_logging_index.py build testdata/show_logging.log
+  $ python bin/cisco_ios_logging_index.py search testdata/show_logging.log "vlan102 AND NOT lineproto"
+
+Note:
+  インデックスは省略時は元のログファイルと同じ場所に、拡張子を.idxにしたディレクトリで作成します。
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+
+from cisco_ios_show_logging import CiscoIosShowLoggingParser
+
+#
+# クラス定義
+#
+
+class LogTokenizer(object):
+  """ログの辞書型から検索用のトークンを取り出すクラスです。
+
+  descriptionはインタフェース名、IPアドレス、単語に分けて小文字にします。
+  facility, mnemonic, severityは"mnemonic:updown"のようにキー名を付けたトークンにします。
+  """
+
+  # 英数字で始まり、インタフェース名やIPアドレスに含まれる記号までを1つのトークンにする
+  rex_token = re.compile(r"[A-Za-z0-9][A-Za-z0-9_\-./:]*")
+
+  # トークンの末尾に付いた句読点
+  trailing = ".,:;-/"
+
+  # キー名を付けてトークンにする項目
+  field_keys = ["facility", "mnemonic", "severity"]
+
+  def tokenize_text(self, text):
+    """文字列からトークンの集合を返却します
+
+    >>> sorted(LogTokenizer().tokenize_text("Process 1, Nbr 1.1.1.3 on Vlan104 from FULL to DOWN"))
+    ['1', '1.1.1.3', 'down', 'from', 'full', 'nbr', 'on', 'process', 'to', 'vlan104']
+    >>> sorted(LogTokenizer().tokenize_text("Interface TenGigabitEthernet1/3/11, changed state to down"))
+    ['changed', 'down', 'interface', 'state', 'tengigabitethernet1/3/11', 'to']
+    """
+    tokens = set()
+    trailing = self.trailing
+    for token in self.rex_token.findall(text):
+      token = token.rstrip(trailing)
+      if token:
+        tokens.add(token.lower())
+    return tokens
+
+
+  def tokenize(self, d):
+    """ログの辞書型からトークンの集合を返却します"""
+    tokens = self.tokenize_text(d.get("description", ""))
+    for key in self.field_keys:
+      value = d.get(key)
+      if value:
+        tokens.add(key + ":" + value.lower())
+    return tokens
+
+
+def encode_postings(offsets):
+  """昇順のオフセットの配列を、差分をvarintで符号化したbytesにして返却します
+
+  >>> encode_postings([0, 1, 300])
+  b'\\x00\\x01\\xab\\x02'
+  >>> decode_postings(encode_postings([0, 1, 300, 70000]))
+  [0, 1, 300, 70000]
+  """
+  buf = bytearray()
+  prev = 0
+  for offset in offsets:
+    delta = offset - prev
+    prev = offset
+    while delta >= 0x80:
+      buf.append((delta & 0x7f) | 0x80)
+      delta >>= 7
+    buf.append(delta)
+  return bytes(buf)
+
+
+def decode_postings(data):
+  """encode_postings()で符号化したbytesをオフセットの配列に戻して返却します"""
+  offsets = []
+  value = 0
+  shift = 0
+  prev = 0
+  for b in data:
+    value |= (b & 0x7f) << shift
+    if b & 0x80:
+      shift += 7
+      continue
+    prev += value
+    offsets.append(prev)
+    value = 0
+    shift = 0
+  return offsets
+
+
+class IndexSegment(object):
+  """転置インデックスのセグメントファイルを読み書きするクラスです。
+
+  ファイルの構造は次の通りです。数値はすべてリトルエンディアンです。
+
+    ポスティングリスト  トークンごとのオフセットの一覧(encode_postings()で符号化)を並べたもの
+    辞書              トークンの昇順に、トークン長(H)、トークン、位置(Q)、長さ(I)、件数(I)を並べたもの
+    疎な索引           辞書のsparse_interval個ごとのエントリの位置(Q)の配列
+    フッタ             辞書の位置(Q)、疎な索引の位置(Q)、トークン数(Q)、マジック(4s)
+
+  開くときは疎な索引のトークンだけをメモリに読み込み、二分探索で辞書の位置を絞ってから線形に探します。
+  """
+
+  magic = b"CIX1"
+  footer_format = "<QQQ4s"
+  entry_format = "<QII"
+  sparse_interval = 128
+
+  def __init__(self, filename):
+    """セグメントファイルを開きます"""
+    self.filename = filename
+    self.f = open(filename, mode="rb")
+    self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    footer_size = struct.calcsize(self.footer_format)
+    (self.dict_pos, self.sparse_pos, self.num_terms, magic) = struct.unpack_from(self.footer_format, self.mm, len(self.mm) - footer_size)
+    if magic != self.magic:
+      raise ValueError("not an index segment: %s" % filename)
+
+    num_sparse = (len(self.mm) - footer_size - self.sparse_pos) // 8
+    self.sparse_positions = list(struct.unpack_from("<%dQ" % num_sparse, self.mm, self.sparse_pos))
+    self.sparse_terms = [self.read_entry(pos)[0] for pos in self.sparse_positions]
+
+
+  def close(self):
+    self.mm.close()
+    self.f.close()
+
+
+  def read_entry(self, pos):
+    """辞書のposの位置にあるエントリを(トークン, ポスティングの位置, 長さ, 件数, 次のエントリの位置)で返却します"""
+    (term_len,) = struct.unpack_from("<H", self.mm, pos)
+    pos += 2
+    term = self.mm[pos:pos + term_len].decode("utf-8")
+    pos += term_len
+    postings_pos, postings_len, count = struct.unpack_from(self.entry_format, self.mm, pos)
+    return term, postings_pos, postings_len, count, pos + struct.calcsize(self.entry_format)
+
+
+  def lookup(self, term):
+    """termのオフセットの配列を返却します。無ければ空の配列を返します。"""
+    i = bisect.bisect_right(self.sparse_terms, term) - 1
+    if i < 0:
+      return []
+    pos = self.sparse_positions[i]
+    for _ in range(self.sparse_interval):
+      if pos >= self.sparse_pos:
+        break
+      entry_term, postings_pos, postings_len, _count, pos = self.read_entry(pos)
+      if entry_term == term:
+        return decode_postings(self.mm[postings_pos:postings_pos + postings_len])
+      if entry_term > term:
+        break
+    return []
+
+
+  @classmethod
+  def write(cls, filename, postings):
+    """トークンをキーに、昇順のオフセットの配列を値にした辞書型をセグメントファイルとして書き出します"""
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, mode="wb") as f:
+      entries = []
+      pos = 0
+      for term in sorted(postings):
+        data = encode_postings(postings[term])
+        f.write(data)
+        entries.append((term, pos, len(data), len(postings[term])))
+        pos += len(data)
+
+      dict_pos = pos
+      sparse = []
+      for i, (term, postings_pos, postings_len, count) in enumerate(entries):
+        if i % cls.sparse_interval == 0:
+          sparse.append(pos)
+        term_bytes = term.encode("utf-8")
+        entry = struct.pack("<H", len(term_bytes)) + term_bytes + struct.pack(cls.entry_format, postings_pos, postings_len, count)
+        f.write(entry)
+        pos += len(entry)
+
+      sparse_pos = pos
+      f.write(struct.pack("<%dQ" % len(sparse), *sparse))
+      f.write(struct.pack(cls.footer_format, dict_pos, sparse_pos, len(entries), cls.magic))
+    os.replace(tmp_filename, filename)
+
+
+class LogInvertedIndex(object):
+  """ログファイルの転置インデックスを作成、検索するクラスです。
+
+  >>> import tempfile
+  >>> tmpdir = tempfile.mkdtemp()
+  >>> log_filename = os.path.join(tmpdir, "show_logging.log")
+  >>> with open(log_filename, "w") as f:
+  ...   _ = f.write("S-Cat6880X-01#show logging\\n")
+  ...   _ = f.write("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down\\n")
+  ...   _ = f.write("Sep  5 22:57:15.467: %OSPF-SW1-5-ADJCHG: Process 1, Nbr 1.1.1.3 on Vlan104 from FULL to DOWN\\n")
+  >>> index = LogInvertedIndex(log_filename)
+  >>> index.build()
+  2
+  >>> [d["facility"] for d in index.search("down")]
+  ['LINK-SW1', 'OSPF-SW1']
+  >>> [d["facility"] for d in index.search("down AND NOT 1.1.1.3")]
+  ['LINK-SW1']
+  >>> [d["facility"] for d in index.search("tengigabitethernet1/3/11 OR vlan104")]
+  ['LINK-SW1', 'OSPF-SW1']
+  >>> with open(log_filename, "a") as f:
+  ...   _ = f.write("Sep  5 22:58:00.000: %LINK-SW1-3-UPDOWN: Interface Vlan104, changed state to down\\n")
+  >>> index.build()
+  1
+  >>> [d["date"] for d in index.search("vlan104 mnemonic:updown")]
+  ['Sep  5 22:58:00.000']
+  """
+
+  meta_filename = "index.json"
+
+  def __init__(self, log_filename, index_dir=None, max_postings=5000000):
+    """コンストラクタ
+
+    Arguments:
+      log_filename {str} -- インデックスを作るログファイル
+
+    Keyword Arguments:
+      index_dir {str} -- インデックスを置くディレクトリ。省略時はログファイルの拡張子を.idxにしたもの (default: {None})
+      max_postings {int} -- この件数のオフセットをメモリに溜めたらセグメントを書き出す (default: {5000000})
+    """
+    self.log_filename = os.path.abspath(log_filename)
+    if not index_dir:
+      index_dir = os.path.splitext(self.log_filename)[0] + ".idx"
+    self.index_dir = index_dir
+    self.max_postings = max_postings
+    self.parser = CiscoIosShowLoggingParser()
+    self.tokenizer = LogTokenizer()
+    self.meta = self.load_meta()
+    self.segments = []
+
+
+  def load_meta(self):
+    """インデックスのメタ情報を読み込みます"""
+    filename = os.path.join(self.index_dir, self.meta_filename)
+    if os.path.exists(filename):
+      with open(filename, mode="r", encoding="utf-8") as f:
+        return json.load(f)
+    return {"source": self.log_filename, "indexed_bytes": 0, "inode": None, "segments": []}
+
+
+  def save_meta(self):
+    """インデックスのメタ情報を保存します"""
+    filename = os.path.join(self.index_dir, self.meta_filename)
+    with open(filename + ".tmp", mode="w", encoding="utf-8") as f:
+      json.dump(self.meta, f, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+  def build(self):
+    """前回の続きからログファイルを読み、インデックスを追加します。追加したログの件数を返却します。
+
+    ログファイルのinodeが変わっていたり、前回より小さくなっていたら、インデックスを作り直します。
+    """
+    if not os.path.isdir(self.index_dir):
+      os.makedirs(self.index_dir)
+
+    st = os.stat(self.log_filename)
+    if self.meta["inode"] != st.st_ino or st.st_size < self.meta["indexed_bytes"]:
+      self.clear()
+      self.meta["inode"] = st.st_ino
+
+    match = self.parser.rex_log.match
+    fieldnames = self.parser.fieldnames
+    tokenize = self.tokenizer.tokenize
+
+    postings = {}
+    num_postings = 0
+    num_records = 0
+    offset = self.meta["indexed_bytes"]
+
+    with open(self.log_filename, mode="rb") as f:
+      f.seek(offset)
+      for raw in f:
+        if not raw.endswith(b"\n"):
+          # 書きかけの行は次回
+          break
+        line_offset = offset
+        offset += len(raw)
+        m = match(raw.decode("utf-8", errors="replace").rstrip())
+        if not m:
+          continue
+        num_records += 1
+        for token in tokenize(dict(zip(fieldnames, m.groups()))):
+          offsets = postings.get(token)
+          if offsets is None:
+            postings[token] = [line_offset]
+          else:
+            offsets.append(line_offset)
+          num_postings += 1
+        if num_postings >= self.max_postings:
+          self.flush(postings, offset)
+          postings = {}
+          num_postings = 0
+
+    self.flush(postings, offset)
+    return num_records
+
+
+  def flush(self, postings, indexed_bytes):
+    """メモリに溜めたオフセットをセグメントとして書き出し、メタ情報を更新します"""
+    if postings:
+      name = "seg-%05d.idx" % len(self.meta["segments"])
+      IndexSegment.write(os.path.join(self.index_dir, name), postings)
+      self.meta["segments"].append(name)
+    self.meta["indexed_bytes"] = indexed_bytes
+    self.save_meta()
+
+
+  def clear(self):
+    """セグメントを削除してインデックスを空にします"""
+    for name in self.meta["segments"]:
+      filename = os.path.join(self.index_dir, name)
+      if os.path.exists(filename):
+        os.remove(filename)
+    self.meta["segments"] = []
+    self.meta["indexed_bytes"] = 0
+
+
+  def lookup(self, term):
+    """termを含むログのオフセットの集合を返却します"""
+    term = term.lower()
+    offsets = set()
+    for segment in self.open_segments():
+      offsets.update(segment.lookup(term))
+    return offsets
+
+
+  def open_segments(self):
+    """セグメントを開いて返却します。開いたセグメントは使い回します。"""
+    names = self.meta["segments"]
+    if [segment.filename for segment in self.segments] != [os.path.join(self.index_dir, name) for name in names]:
+      for segment in self.segments:
+        segment.close()
+      self.segments = [IndexSegment(os.path.join(self.index_dir, name)) for name in names]
+    return self.segments
+
+
+  def query(self, expression):
+    """検索式に一致するログのオフセットを昇順の配列で返却します。
+
+    検索式は空白区切りのトークンで、AND, OR, NOTと括弧が使えます。
+    演算子を省略して並べたトークンはANDとみなします。NOTはAND NOTの形でのみ使えます。
+    """
+    tokens = re.findall(r"\(|\)|[^\s()]+", expression)
+    result, pos = self.parse_or(tokens, 0)
+    if pos != len(tokens):
+      raise ValueError("unexpected token: %s" % tokens[pos])
+    return sorted(result)
+
+
+  def parse_or(self, tokens, pos):
+    result, pos = self.parse_and(tokens, pos)
+    while pos < len(tokens) and tokens[pos].upper() == "OR":
+      right, pos = self.parse_and(tokens, pos + 1)
+      result = result | right
+    return result, pos
+
+
+  def parse_and(self, tokens, pos):
+    result = None
+    while pos < len(tokens) and tokens[pos] != ")" and tokens[pos].upper() != "OR":
+      if tokens[pos].upper() == "AND":
+        pos += 1
+        continue
+      negate = tokens[pos].upper() == "NOT"
+      if negate:
+        pos += 1
+      operand, pos = self.parse_term(tokens, pos)
+      if negate:
+        if result is None:
+          raise ValueError("NOT must follow another term")
+        result = result - operand
+      else:
+        result = operand if result is None else result & operand
+    if result is None:
+      raise ValueError("empty expression")
+    return result, pos
+
+
+  def parse_term(self, tokens, pos):
+    if pos >= len(tokens):
+      raise ValueError("unexpected end of expression")
+    if tokens[pos] == "(":
+      result, pos = self.parse_or(tokens, pos + 1)
+      if pos >= len(tokens) or tokens[pos] != ")":
+        raise ValueError("missing )")
+      return result, pos + 1
+    return self.lookup(tokens[pos].rstrip(self.tokenizer.trailing)), pos + 1
+
+
+  def search(self, expression):
+    """検索式に一致するログを読み出して、ログの辞書型をファイル中の順番でyieldします"""
+    return self.read(self.query(expression))
+
+
+  def read(self, offsets):
+    """オフセットの位置にあるログを読み出して、ログの辞書型をyieldします"""
+    with open(self.log_filename, mode="rb") as f:
+      for offset in offsets:
+        f.seek(offset)
+        line = f.readline().decode("utf-8", errors="replace")
+        d = self.parser.make_dict_by_line(line.rstrip())
+        if d:
+          yield d
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import logging
+  import sys
+  import time
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+    # 辞書型のキーを表示するときの右寄せ幅
+    RIGHT_JUST = config.getint('RIGHT_JUST', 20)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def dump(dicts, right_just=20):
+    """OrderedDictの配列を受け取って、内容を表示します。"""
+    try:
+      for d in dicts:
+        for k,v in d.items():
+          print(k.rjust(right_just) + " : " + v)
+        print("")
+    except (BrokenPipeError, IOError):
+      sys.stderr.close()
+
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='full-text index for show logging.')
+    parser.add_argument('command', choices=['build', 'search'], help='build or search the index')
+    parser.add_argument('input_filename', help='Log file to be indexed')
+    parser.add_argument('query', nargs='?', help='Search expression, e.g. "vlan102 AND NOT lineproto"')
+    parser.add_argument('-i', '--index', dest='index_dir', metavar='index_dir', help='Index directory')
+    args = parser.parse_args()
+
+    index = LogInvertedIndex(args.input_filename, args.index_dir)
+
+    if args.command == 'build':
+      start = time.perf_counter()
+      count = index.build()
+      logger.info("%s records indexed in %.2f sec (%s)", count, time.perf_counter() - start, index.index_dir)
+      return 0
+
+    if not args.query:
+      logger.error("search needs a query.")
+      return 1
+
+    if not index.meta["segments"]:
+      logger.error("index not found. run build first.")
+      return 1
+
+    start = time.perf_counter()
+    try:
+      offsets = index.query(args.query)
+    except ValueError as e:
+      logger.error("invalid query: %s", e)
+      return 1
+    logger.info("%s records matched in %.3f msec", len(offsets), (time.perf_counter() - start) * 1000)
+
+    dump(index.read(offsets), right_just=RIGHT_JUST)
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パースしたログを装置、時間帯、severity、facilityごとに数えたヒストグラムを作ります。
+
+ログの辞書型を1件ずつ数えるのではなく、いったん整数の列(エポック、severity、facilityの番号)に変換してから、
+列をまとめて数えます。数えるのはcollections.Counterにzipした列を渡すだけなので、C言語の速度で1回で終わります。
+
+1時間単位などの粗いヒストグラムは、1分単位のヒストグラムをまとめ直して作ります。ログを読み直すことはありません。
+
+複数のプロセスで別々のファイルを集計した結果は、merge()で足し合わせることができます。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_logging_rollup.py
+  $ python bin/cisco_ios_logging_rollup.py --year 2016 testdata/show_logging.log
+  $ python bin/cisco_ios_logging_rollup.py -j 4 -o rollup.csv captures/*.log
+
+Note:
+  結果は省略時は標準出力にCSV形式で出力します。
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+from array import array
+from collections import Counter, OrderedDict
+
+from cisco_ios_input import read_lines
+from cisco_ios_show_logging import CiscoIosShowLoggingParser, CiscoIosLogTimestampParser
+
+#
+# クラス定義
+#
+
+class LogRollup(object):
+  """ログを整数の列に変換して溜め、時間帯ごとのヒストグラムを作るクラスです。
+
+  Attributes:
+    epochs (array): エポック秒の列
+    severities (array): severityの列
+    facilities (array): facilityの番号の列
+    devices (array): 装置の番号の列
+    histograms (dict): 解像度(秒)をキーに、(装置, 時間帯の先頭のエポック秒, severity, facility)をキーにしたCounterを値にした辞書型。
+                       装置とfacilityは名前に戻してあります。
+    merged (dict): clear()で捨てた列とmerge()で受け取ったヒストグラムを足し合わせたもの。histogramsと同じ形です。
+
+  >>> lines = []
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("Sep  5 22:56:49.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to up")
+  >>> lines.append("Sep  5 23:01:15.455: %SPANTREE-SW1-6-PORT_STATE: Port Po111 instance 104 moving from forwarding to disabled")
+  >>> rollup = LogRollup(timestamp_parser=CiscoIosLogTimestampParser(year=2016))
+  >>> rollup.add_all(CiscoIosShowLoggingParser().parse(lines), device="sw1")
+  3
+  >>> histograms = rollup.rollup()
+  >>> sorted(histograms[60].values())
+  [1, 2]
+  >>> list(histograms[3600].values())
+  [2, 1]
+  >>> other = LogRollup(timestamp_parser=CiscoIosLogTimestampParser(year=2016))
+  >>> other.add_all(CiscoIosShowLoggingParser().parse(lines[:1]), device="sw1")
+  1
+  >>> rollup.merge(other.rollup())
+  >>> rollup.rollup()[3600][("sw1", 1473112800, 3, "LINK-SW1")]
+  3
+
+  clear()で列を捨てても、それまでの回数はヒストグラムに残り、次のrollup()で足し合わされます。
+
+  >>> rollup.clear()
+  >>> rollup.add_all(CiscoIosShowLoggingParser().parse(lines[:1]), device="sw1")
+  1
+  >>> rollup.rollup()[3600][("sw1", 1473112800, 3, "LINK-SW1")]
+  4
+  """
+
+  # 既定の解像度(秒)。1分と1時間
+  resolutions = (60, 3600)
+
+  def __init__(self, resolutions=None, timestamp_parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      resolutions {tuple} -- ヒストグラムの解像度(秒)。最初のものの倍数であること (default: {(60, 3600)})
+      timestamp_parser {CiscoIosLogTimestampParser} -- 日付の変換に使うオブジェクト (default: {None})
+    """
+    if resolutions:
+      self.resolutions = tuple(sorted(resolutions))
+    for resolution in self.resolutions:
+      if resolution % self.resolutions[0]:
+        raise ValueError("resolution %s is not a multiple of %s" % (resolution, self.resolutions[0]))
+    self.timestamp_parser = timestamp_parser if timestamp_parser else CiscoIosLogTimestampParser()
+
+    self.epochs = array("q")
+    self.severities = array("b")
+    self.facilities = array("l")
+    self.devices = array("l")
+
+    # 文字列を番号に置き換えるための表
+    self.facility_ids = {}
+    self.facility_names = []
+    self.device_ids = {}
+    self.device_names = []
+
+    # 日付を変換できなかったログの数
+    self.skipped = 0
+
+    self.merged = {}
+    self.histograms = {}
+
+
+  def intern(self, ids, names, name):
+    """nameの番号を返却します。初めて見る名前なら番号を振ります。"""
+    i = ids.get(name)
+    if i is None:
+      i = ids[name] = len(names)
+      names.append(name)
+    return i
+
+
+  def add_all(self, dicts, device=""):
+    """ログの辞書型を整数の列に変換して追加し、追加した件数を返します。
+
+    Arguments:
+      dicts {iterable} -- ログの辞書型
+
+    Keyword Arguments:
+      device {str} -- 装置名。辞書型にhostがあればそちらを使います (default: {""})
+    """
+    to_epoch = self.timestamp_parser.to_epoch
+    epochs_append = self.epochs.append
+    severities_append = self.severities.append
+    facilities_append = self.facilities.append
+    devices_append = self.devices.append
+    facility_ids = self.facility_ids
+    device_ids = self.device_ids
+
+    count = 0
+    for d in dicts:
+      epoch = to_epoch(d.get("date", ""))
+      if epoch is None:
+        self.skipped += 1
+        continue
+      facility = d.get("facility", "")
+      facility_id = facility_ids.get(facility)
+      if facility_id is None:
+        facility_id = self.intern(facility_ids, self.facility_names, facility)
+      host = d.get("host", device)
+      device_id = device_ids.get(host)
+      if device_id is None:
+        device_id = self.intern(device_ids, self.device_names, host)
+      epochs_append(epoch // 1000)
+      severities_append(int(d.get("severity", 0)))
+      facilities_append(facility_id)
+      devices_append(device_id)
+      count += 1
+    return count
+
+
+  def rollup(self):
+    """溜めた列から各解像度のヒストグラムを作り、mergedと足し合わせて返却します。
+
+    何度呼んでも、溜めた列とmergedが同じなら結果は同じです。
+    """
+    histograms = self.count_columns()
+    for resolution, counts in self.merged.items():
+      histograms.setdefault(resolution, Counter()).update(counts)
+    self.histograms = histograms
+    return histograms
+
+
+  def count_columns(self):
+    """溜めた列だけから各解像度のヒストグラムを作って返却します。
+
+    最も細かい解像度だけ列を1回なめて数え、それより粗い解像度はそのヒストグラムをまとめ直します。
+    """
+    finest = self.resolutions[0]
+    buckets = [epoch - epoch % finest for epoch in self.epochs]
+    counts = Counter(zip(self.devices, buckets, self.severities, self.facilities))
+
+    device_names = self.device_names
+    facility_names = self.facility_names
+    histograms = {}
+    histograms[finest] = Counter({(device_names[d], b, s, facility_names[f]): c for (d, b, s, f), c in counts.items()})
+    for resolution in self.resolutions[1:]:
+      coarse = Counter()
+      for (d, b, s, f), c in histograms[finest].items():
+        coarse[(d, b - b % resolution, s, f)] += c
+      histograms[resolution] = coarse
+    return histograms
+
+
+  def merge(self, histograms):
+    """他で作ったヒストグラムをmergedに足し合わせます。結果はrollup()で得ます"""
+    for resolution, counts in histograms.items():
+      self.merged.setdefault(resolution, Counter()).update(counts)
+
+
+  def clear(self):
+    """溜めた列をmergedに足し合わせてから捨てます。メモリを空けても回数は失われません。"""
+    for resolution, counts in self.count_columns().items():
+      self.merged.setdefault(resolution, Counter()).update(counts)
+    for column in (self.epochs, self.severities, self.facilities, self.devices):
+      del column[:]
+
+
+def rows(histograms):
+  """ヒストグラムを解像度、装置、時間帯、severity、facilityの順に並べた辞書型でyieldします"""
+  for resolution in sorted(histograms):
+    for (device, bucket, severity, facility), count in sorted(histograms[resolution].items()):
+      d = OrderedDict()
+      d["resolution"] = str(resolution)
+      d["device"] = device
+      d["bucket"] = str(bucket)
+      d["severity"] = str(severity)
+      d["facility"] = facility
+      d["count"] = str(count)
+      yield d
+
+
+def rollup_file(filename, year=None, resolutions=None):
+  """ファイルを1つパースしてヒストグラムを返却します。ワーカープロセスで使います。
+
+  装置名はプロンプト(ホスト名#)から取り出し、見つからなければファイル名を使います。
+  """
+  import itertools
+  import os
+  import re
+
+  rex_prompt = re.compile(r"^([\w.\-]+)[#>]")
+  device = os.path.basename(filename)
+  rollup = LogRollup(resolutions, CiscoIosLogTimestampParser(year=year))
+
+  # プロンプトはファイルの先頭付近にあるはずなので、そこだけ探します
+  for line in itertools.islice(read_lines(filename, errors="replace"), 100):
+    m = rex_prompt.match(line)
+    if m:
+      device = m.group(1)
+      break
+
+  rollup.add_all(CiscoIosShowLoggingParser().parse(read_lines(filename, errors="replace")), device)
+  return rollup.rollup()
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import csv
+  import logging
+  import multiprocessing
+  import os
+  import sys
+  import time
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準エラー出力へのハンドラ
+  # 結果のCSVは標準出力に出すので、混ざらないようにログは標準エラー出力に出す
+  stderr_handler = logging.StreamHandler(sys.stderr)
+  stderr_handler.setFormatter(formatter)
+  stderr_handler.setLevel(logging.INFO)
+  logger.addHandler(stderr_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='severity/facility histograms of show logging.')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output CSV filename (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('-r', '--resolution', dest='resolutions', type=int, action='append', help='Bucket size in seconds (default: 60 and 3600)')
+    parser.add_argument('--year', dest='year', type=int, help='Year of logs without year (default: this year)')
+    parser.add_argument('input_filenames', nargs='+', help='Files to be parsed')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged = LogRollup(args.resolutions)
+    if args.jobs > 1:
+      with multiprocessing.Pool(args.jobs) as pool:
+        for histograms in pool.starmap(rollup_file, [(f, args.year, args.resolutions) for f in args.input_filenames]):
+          merged.merge(histograms)
+    else:
+      for filename in args.input_filenames:
+        merged.merge(rollup_file(filename, args.year, args.resolutions))
+    logger.info("%s files rolled up in %.2f sec", len(args.input_filenames), time.perf_counter() - start)
+
+    fieldnames = ["resolution", "device", "bucket", "severity", "facility", "count"]
+    try:
+      if args.output_filename:
+        f = open(args.output_filename, mode='w', newline='')
+      else:
+        f = sys.stdout
+      writer = csv.DictWriter(f, fieldnames)
+      writer.writeheader()
+      writer.writerows(rows(merged.rollup()))
+      if args.output_filename:
+        f.close()
+        logger.info("saved to %s", args.output_filename)
+    except (BrokenPipeError, IOError):
+      sys.stderr.close()
+    return 0
+
+
+  # 実行
+  sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーの正規表現を、使うときに一度だけコンパイルするための部品です。
+
+クラス変数にre.compile()を書くと、モジュールをインポートしただけで全部の正規表現をコンパイルします。
+スクリプトを装置ごとに何度も起動したり、一部のパーサーだけを使う場合は、その時間が無駄になります。
+
+LazyPatternをクラス変数に置くと、最初に使われたときにコンパイルし、クラス変数をコンパイル済みの正規表現で置き換えます。
+2回目からはふつうのクラス変数と同じで、すべてのインスタンスで同じ正規表現を共有します。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_pattern.py
+
+  >>> class Parser(object):
+  ...   rex_digit = LazyPattern(r"\\d+")
+  >>> isinstance(vars(Parser)["rex_digit"], LazyPattern)
+  True
+  >>> Parser().rex_digit.match("12").group()
+  '12'
+  >>> vars(Parser)["rex_digit"] is Parser().rex_digit
+  True
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import functools
+import re
+
+#
+# 関数定義
+#
+
+@functools.lru_cache(maxsize=None)
+def compile_once(pattern, flags=0):
+  """正規表現をコンパイルして返却します。同じ正規表現は2回目から同じオブジェクトを返却します
+
+  reモジュールのキャッシュは上限を超えると捨てられますが、こちらは捨てません。
+
+  >>> compile_once(r"\\d+") is compile_once(r"\\d+")
+  True
+  """
+  return re.compile(pattern, flags)
+
+#
+# クラス定義
+#
+
+class LazyPattern(object):
+  """クラス変数に置き、最初に使われたときにコンパイルして自分をコンパイル済みの正規表現に置き換えるデスクリプタです。
+
+  >>> class Parser(object):
+  ...   rex_word = LazyPattern(r"\\w+")
+  ...   rex_word_bytes = rex_word.encode()
+  >>> Parser.rex_word_bytes.match(b"abc").group()
+  b'abc'
+
+  モジュール変数に置いた場合は、match()などを最初に使ったときにコンパイルします。
+
+  >>> rex_number = LazyPattern(r"\\d+")
+  >>> rex_number.match("42").group()
+  '42'
+  """
+
+  def __init__(self, pattern, flags=0):
+    """コンストラクタ
+
+    Arguments:
+      pattern {str} -- 正規表現の文字列。bytesも可
+
+    Keyword Arguments:
+      flags {int} -- re.compile()のフラグ (default: {0})
+    """
+    self.pattern = pattern
+    self.flags = flags
+    self.owner = None
+    self.name = None
+
+
+  def __set_name__(self, owner, name):
+    self.owner = owner
+    self.name = name
+
+
+  def __get__(self, obj, owner=None):
+    rex = compile_once(self.pattern, self.flags)
+    # クラス変数を置き換えるので、このメソッドが呼ばれるのはクラスごとに最初の1回だけ
+    if self.owner is not None:
+      setattr(self.owner, self.name, rex)
+    return rex
+
+
+  def __getattr__(self, name):
+    # クラス変数でないので置き換えられない。正規表現の属性(match()など)を使われたらコンパイル済みのものに任せる
+    return getattr(compile_once(self.pattern, self.flags), name)
+
+
+  def __repr__(self):
+    return "LazyPattern(%r)" % self.pattern
+
+
+  def encode(self):
+    """bytesの行に適用するための、同じ正規表現のbytes版を返却します"""
+    return LazyPattern(self.pattern.encode(), self.flags)
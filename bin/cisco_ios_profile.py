@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーの正規表現ごとに、試した回数、一致した回数、かかった時間を数えます。
+
+instrument()でパーサーのインスタンスを計測用に差し替えます。
+パーサーのクラス変数やインスタンス変数にあるコンパイル済みの正規表現(token_dictのような辞書型の値も含む)を、
+match()、search()、fullmatch()を呼ぶたびに数えるProfiledPatternに置き換えます。
+パースするメソッドも、入力の行数、出力のレコード数、パーサーの中で過ごした時間を数えるものに置き換えます。
+
+差し替えるのは渡したインスタンスだけです。クラスは変えませんので、instrument()しないパーサーの速度は変わりません。
+
+計測結果は表かJSONで出力します。
+
+  attempts   試した回数。パースするメソッドの行では入力の行数
+  hits       一致した回数。パースするメソッドの行では出力したレコード数
+  total_ms   かかった時間の合計
+  miss_ms    そのうち一致しなかったときの時間。大きいものはバックトラックが多い
+  avg_us     1回あたりの時間
+  share      パースするメソッドで過ごした時間に占める割合
+
+attemptsがあるのにhitsが0の正規表現は、その入力では役に立っていません。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_profile.py
+  $ python bin/cisco_ios_profile.py -c "show ip route" testdata/show_ip_route.log
+  $ python bin/cisco_ios_profile.py -c session --json profile.json capture.log
+
+  >>> class Parser(object):
+  ...   rex_digit = re.compile(r"\\d+")
+  ...   def parse(self, lines):
+  ...     for line in lines:
+  ...       if self.rex_digit.match(line):
+  ...         yield line
+  >>> profiler = PatternProfiler()
+  >>> parser = instrument(Parser(), profiler)
+  >>> list(parser.parse(["1", "a", "2"]))
+  ['1', '2']
+  >>> [(d["parser"], d["pattern"], d["attempts"], d["hits"]) for d in profiler.records()]
+  [('Parser', 'parse()', 3, 2), ('Parser', 'rex_digit', 3, 2)]
+  >>> Parser.rex_digit is Parser().rex_digit
+  True
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import re
+import time
+from collections import OrderedDict
+
+from cisco_ios_pattern import LazyPattern
+
+# コンパイル済みの正規表現の型
+Pattern = type(re.compile(""))
+
+#
+# クラス定義
+#
+
+class PatternStats(object):
+  """1つの正規表現、またはパースするメソッドの計測値です"""
+
+  def __init__(self, parser, pattern):
+    self.parser = parser
+    self.pattern = pattern
+    self.attempts = 0
+    self.hits = 0
+    self.seconds = 0.0
+    self.miss_seconds = 0.0
+
+
+  def reset(self):
+    """計測値を0に戻します"""
+    self.attempts = 0
+    self.hits = 0
+    self.seconds = 0.0
+    self.miss_seconds = 0.0
+
+
+class ProfiledPattern(object):
+  """コンパイル済みの正規表現の代わりに置いて、match()、search()、fullmatch()を数えるクラスです。
+
+  それ以外の属性(pattern、groupindex、findall()など)は元の正規表現のものをそのまま返します。
+
+  >>> stats = PatternStats("p", "r")
+  >>> rex = ProfiledPattern(re.compile(r"a(b)"), stats)
+  >>> rex.search("xab").group(1), rex.match("xab"), rex.pattern
+  ('b', None, 'a(b)')
+  >>> stats.attempts, stats.hits
+  (2, 1)
+  """
+
+  def __init__(self, rex, stats):
+    self.rex = rex
+    self.stats = stats
+
+
+  def __getattr__(self, name):
+    return getattr(self.rex, name)
+
+
+  def __repr__(self):
+    return "ProfiledPattern(%r)" % self.rex
+
+
+  def timed(self, func, string, args):
+    """funcを呼んで計測します"""
+    start = time.perf_counter()
+    m = func(string, *args)
+    elapsed = time.perf_counter() - start
+    stats = self.stats
+    stats.attempts += 1
+    stats.seconds += elapsed
+    if m is None:
+      stats.miss_seconds += elapsed
+    else:
+      stats.hits += 1
+    return m
+
+
+  def match(self, string, *args):
+    return self.timed(self.rex.match, string, args)
+
+
+  def search(self, string, *args):
+    return self.timed(self.rex.search, string, args)
+
+
+  def fullmatch(self, string, *args):
+    return self.timed(self.rex.fullmatch, string, args)
+
+
+class PatternProfiler(object):
+  """計測値をまとめて持ち、表やJSONにするクラスです"""
+
+  def __init__(self):
+    # (パーサー, 正規表現の名前)をキーにしたPatternStats
+    self.stats = OrderedDict()
+
+
+  def get(self, parser, pattern):
+    """(パーサー, 正規表現の名前)のPatternStatsを返却します。なければ作ります"""
+    key = (parser, pattern)
+    stats = self.stats.get(key)
+    if stats is None:
+      stats = self.stats[key] = PatternStats(parser, pattern)
+    return stats
+
+
+  def wrap(self, func, parser=None):
+    """パースするメソッドfuncを、入力の行数、出力のレコード数、中で過ごした時間を数えるものにして返却します"""
+    owner = getattr(func, "__self__", None)
+    parser = parser or type(owner).__name__
+    stats = self.get(parser, func.__name__ + "()")
+    perf_counter = time.perf_counter
+
+    def count(lines):
+      for line in lines:
+        stats.attempts += 1
+        yield line
+
+    def wrapper(lines):
+      it = func(count(lines))
+      while True:
+        start = perf_counter()
+        try:
+          record = next(it)
+        except StopIteration:
+          stats.seconds += perf_counter() - start
+          return
+        stats.seconds += perf_counter() - start
+        stats.hits += 1
+        yield record
+
+    wrapper.__name__ = func.__name__
+    wrapper.__self__ = owner
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+  def reset(self):
+    """計測値をすべて0に戻します。差し替えた正規表現はそのまま使えます"""
+    for stats in self.stats.values():
+      stats.reset()
+
+
+  def records(self, all_patterns=True):
+    """計測値を辞書型のリストで返却します
+
+    Keyword Arguments:
+      all_patterns {bool} -- Falseなら一度も試していない正規表現を除く (default: {True})
+    """
+    # パーサーごとに、パースするメソッドで過ごした時間を割合の分母にする
+    totals = {}
+    for stats in self.stats.values():
+      if stats.pattern.endswith("()"):
+        totals[stats.parser] = totals.get(stats.parser, 0.0) + stats.seconds
+
+    records = []
+    for stats in sorted(self.stats.values(), key=lambda s: (s.parser, not s.pattern.endswith("()"))):
+      if not all_patterns and not stats.attempts:
+        continue
+      d = OrderedDict()
+      d["parser"] = stats.parser
+      d["pattern"] = stats.pattern
+      d["attempts"] = stats.attempts
+      d["hits"] = stats.hits
+      d["total_ms"] = round(stats.seconds * 1000, 3)
+      d["miss_ms"] = round(stats.miss_seconds * 1000, 3)
+      d["avg_us"] = round(stats.seconds * 1000000 / stats.attempts, 3) if stats.attempts else 0.0
+      total = totals.get(stats.parser)
+      d["share"] = round(stats.seconds / total, 4) if total else 0.0
+      records.append(d)
+    return records
+
+
+  def merge(self, records):
+    """records()で作った辞書型のリストの計測値を足し込みます。別のプロセスの計測をまとめるときに使います
+
+    >>> a, b = PatternProfiler(), PatternProfiler()
+    >>> a.get("p", "r").attempts = 2
+    >>> b.merge(a.records()); b.merge(a.records())
+    >>> b.get("p", "r").attempts
+    4
+    """
+    for d in records:
+      stats = self.get(d["parser"], d["pattern"])
+      stats.attempts += d["attempts"]
+      stats.hits += d["hits"]
+      stats.seconds += d["total_ms"] / 1000
+      stats.miss_seconds += d["miss_ms"] / 1000
+
+
+  def table(self, all_patterns=False):
+    """計測値を表にした文字列を返却します"""
+    rows = ["{0:<36}{1:<32}{2:>12}{3:>12}{4:>12}{5:>12}{6:>10}{7:>8}".format(
+      "parser", "pattern", "attempts", "hits", "total_ms", "miss_ms", "avg_us", "share")]
+    for d in self.records(all_patterns):
+      rows.append("{parser:<36}{pattern:<32}{attempts:>12,}{hits:>12,}{total_ms:>12,.1f}{miss_ms:>12,.1f}{avg_us:>10.2f}{share:>8.1%}".format(**d))
+    return "\n".join(rows)
+
+#
+# 関数定義
+#
+
+def find_patterns(obj):
+  """objのクラス変数とインスタンス変数から、正規表現と正規表現を値に持つ辞書型を定義順に返却します
+
+  まだコンパイルしていないLazyPatternは、ここでコンパイルします。
+
+  >>> class Parser(object):
+  ...   rex_a = re.compile("a")
+  ...   rex_c = LazyPattern("c")
+  ...   def __init__(self):
+  ...     self.token_dict = {"b": re.compile("b")}
+  ...     self.fieldnames = ["b"]
+  >>> list(find_patterns(Parser()))
+  ['rex_a', 'rex_c', 'token_dict']
+  """
+  found = OrderedDict()
+  for owner in list(reversed(type(obj).__mro__)) + [obj]:
+    for name, value in list(vars(owner).items()):
+      if name.startswith("_"):
+        continue
+      if isinstance(value, LazyPattern):
+        value = getattr(owner, name)
+      if isinstance(value, Pattern):
+        found[name] = value
+      elif isinstance(value, dict) and value and all(isinstance(v, Pattern) for v in value.values()):
+        found[name] = value
+      else:
+        found.pop(name, None)
+  return found
+
+
+def instrument(obj, profiler, parser=None):
+  """objの正規表現とパースするメソッドを計測するものに差し替えて、objを返却します
+
+  パースするメソッドは、名前がparseで始まるものです。
+  CiscoIosSessionSplitterのようにregistryを持つものは、振り分け先のパーサーも差し替えます。
+
+  Arguments:
+    obj {object} -- パーサーのインスタンス
+    profiler {PatternProfiler} -- 計測値を溜めるところ
+
+  Keyword Arguments:
+    parser {str} -- 表に出すパーサーの名前。省略時はクラス名 (default: {None})
+
+  Returns:
+    object -- obj
+  """
+  parser = parser or type(obj).__name__
+
+  for name, value in find_patterns(obj).items():
+    if isinstance(value, dict):
+      setattr(obj, name, type(value)(
+        (k, ProfiledPattern(v, profiler.get(parser, "%s[%s]" % (name, k)))) for k, v in value.items()))
+    else:
+      setattr(obj, name, ProfiledPattern(value, profiler.get(parser, name)))
+
+  # parse、parse_bytes、parse_linesのように名前がparseで始まるメソッドを差し替える
+  for name in dir(type(obj)):
+    if name.startswith("parse") and name not in vars(obj) and callable(getattr(obj, name)):
+      setattr(obj, name, profiler.wrap(getattr(obj, name), parser))
+
+  registry = getattr(obj, "registry", None)
+  if registry is not None:
+    for i, (name, keywords, func) in enumerate(registry):
+      owner = instrument(func.__self__, profiler)
+      registry[i] = (name, keywords, getattr(owner, func.__name__))
+    obj.command_cache = {}
+
+  return obj
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import json
+  import sys
+
+  from cisco_ios_input import read_lines
+  from cisco_ios_session import CiscoIosSessionSplitter
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='count attempts, hits and time of every regex in a parser.')
+    parser.add_argument('-c', '--command', required=True, help='Command to parse, or "session" to split a terminal log')
+    parser.add_argument('--json', metavar='profile.json', help='Write the report as JSON')
+    parser.add_argument('--all', action='store_true', help='Also show patterns that were never tried')
+    parser.add_argument('filename', nargs='+', help='Files to parse')
+    args = parser.parse_args()
+
+    profiler = PatternProfiler()
+    splitter = instrument(CiscoIosSessionSplitter(), profiler)
+    if args.command == "session":
+      func = splitter.parse
+    else:
+      found = splitter.find_command(args.command)
+      if found is None:
+        print("unknown command: {0}".format(args.command), file=sys.stderr)
+        return 1
+      func = found[1]
+
+    for filename in args.filename:
+      # ファイルの読み込みを計測に含めないように、先に行のリストにしておく
+      reader = read_lines(filename, errors="replace")
+      try:
+        lines = list(reader)
+      finally:
+        reader.close()
+      for _ in func(lines):
+        pass
+
+    print(profiler.table(args.all))
+    if args.json:
+      with open(args.json, mode="w", encoding="utf-8") as f:
+        json.dump(profiler.records(), f, indent=2)
+    return 0
+
+
+  # 実行
+  sys.exit(main())
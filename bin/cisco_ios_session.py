@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""複数のshowコマンドを実行したターミナルのログを、コマンドごとに分割してパースします。
+
+"S-Cat6880X-01#show int status"のようなプロンプトとコマンドの行を見つけたら、
+次のプロンプトまでをそのコマンドの出力とみなし、コマンドに対応したパーサーに渡します。
+コマンドは"show logg"や"sh cdp ne"のような省略形でも構いません。
+
+入力は先頭から1回読むだけです。
+コマンドの出力を溜めることはせず、itertools.groupbyで区切った行をそのままパーサーに流し込みます。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_session.py
+  $ python bin/cisco_ios_session.py testdata/show_logging.log
+  $ python bin/cisco_ios_session.py -o outdir capture.log
+
+Note:
+  -oを指定すると、ホスト名とコマンドごとにCSVファイルを作成します。
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import itertools
+import re
+
+from cisco_ios_show_cdp_neighbors import CiscoIosShowCdpNeghborsParser
+from cisco_ios_show_interfaces import CiscoIosShowInterfacesParser
+from cisco_ios_show_interfaces_status import CiscoIosShowInterfacesStatusParser
+from cisco_ios_show_ip_route import CiscoIosShowIpRouteParser
+from cisco_ios_show_logging import CiscoIosShowLoggingParser
+
+#
+# クラス定義
+#
+
+class CiscoIosSessionSplitter(object):
+  """ターミナルのログをコマンドごとに分割し、対応するパーサーに振り分けるクラスです。
+
+  >>> lines = []
+  >>> lines.append("S-Cat6880X-01#show logg")
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("S-Cat6880X-01#sh int status")
+  >>> lines.append("Port          Name               Status       Vlan       Duplex  Speed Type")
+  >>> lines.append("Te1/1/1                          disabled     1            full   1000 1000BaseLH")
+  >>> lines.append("S-Cat6880X-01#exit")
+  >>> splitter = CiscoIosSessionSplitter()
+  >>> for host, command, record in splitter.parse(lines):
+  ...   print(host, command, list(record.values())[:2])
+  S-Cat6880X-01 show logging ['Sep  5 22:56:48.497', 'LINK-SW1']
+  S-Cat6880X-01 show interfaces status ['Te1/1/1', '']
+  """
+
+  # プロンプトとコマンドの行
+  # S-Cat6880X-01#show int status
+  # S-Cat6880X-01(config)#do show ip route
+  rex_prompt = re.compile(r"^(?P<host>[\w.\-]+)(?:\([\w\-]+\))?[#>](?P<command>.*)$")
+  """プロンプトの行からホスト名とコマンドを取り出す正規表現"""
+
+  # コマンドのキーワードと、その出力をパースするクラス、メソッドの対応
+  # 省略形はキーワードの先頭からの一致で判定します。キーワードの数が多いものを優先します。
+  commands = [
+    ("show interfaces status", CiscoIosShowInterfacesStatusParser, "parse"),
+    ("show interfaces", CiscoIosShowInterfacesParser, "parse"),
+    ("show cdp neighbors", CiscoIosShowCdpNeghborsParser, "parse"),
+    ("show ip route", CiscoIosShowIpRouteParser, "parse_lines"),
+    ("show logging", CiscoIosShowLoggingParser, "parse"),
+  ]
+  """(コマンド, パーサーのクラス, メソッド名)のリスト"""
+
+  def __init__(self, commands=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      commands {list} -- (コマンド, パーサーのクラス, メソッド名)のリスト。省略時はクラス変数のcommands (default: {None})
+    """
+    if commands is not None:
+      self.commands = commands
+
+    # キーワードの多いものから順に試すように並べておく。パーサーはここで一度だけインスタンス化する
+    self.registry = []
+    for command, parser_class, method in sorted(self.commands, key=lambda c: -len(c[0].split())):
+      self.registry.append((command, command.split(), getattr(parser_class(), method)))
+
+    # 入力されたコマンド文字列と判定結果のキャッシュ
+    self.command_cache = {}
+
+
+  def find_command(self, command):
+    """入力されたコマンドに対応する(コマンド, パースする関数)を返却します。対応するものがなければNoneを返却します。
+
+    >>> splitter = CiscoIosSessionSplitter()
+    >>> splitter.find_command("show int status")[0]
+    'show interfaces status'
+    >>> splitter.find_command("sh interfaces Te1/1/1")[0]
+    'show interfaces'
+    >>> splitter.find_command("show cdp ne")[0]
+    'show cdp neighbors'
+    >>> splitter.find_command("show logging | include UPDOWN")[0]
+    'show logging'
+    >>> splitter.find_command("show ip") is None
+    True
+    >>> splitter.find_command("term len 0") is None
+    True
+    """
+    found = self.command_cache.get(command, False)
+    if found is not False:
+      return found
+
+    # パイプ以降は出力の絞り込みなので、コマンドの判定には使わない
+    words = command.split("|")[0].lower().split()
+
+    found = None
+    for name, keywords, func in self.registry:
+      if len(words) < len(keywords):
+        continue
+      if all(keyword.startswith(word) for word, keyword in zip(words, keywords)):
+        found = (name, func)
+        break
+
+    self.command_cache[command] = found
+    return found
+
+
+  def split(self, lines):
+    """linesをプロンプトの行で区切り、(ホスト名, コマンド, 出力の行のイテレータ)をyieldします。
+
+    出力の行のイテレータは次のyieldまでに読まなければ読み飛ばされます。
+    最初のプロンプトより前の行はホスト名とコマンドが空文字列の区間になります。
+
+    >>> splitter = CiscoIosSessionSplitter()
+    >>> [(host, command, list(section)) for host, command, section in splitter.split(["a", "sw1#show ver", "b", "sw1#"])]
+    [('', '', ['a']), ('sw1', 'show ver', ['b']), ('sw1', '', [])]
+    """
+    match = self.rex_prompt.match
+
+    # プロンプトの行を見つけるたびに番号を増やし、その番号でgroupbyする
+    state = {"section": 0}
+
+    def section_key(line):
+      if match(line):
+        state["section"] += 1
+      return state["section"]
+
+    for section, group in itertools.groupby(lines, section_key):
+      if section == 0:
+        yield "", "", group
+        continue
+      m = match(next(group))
+      yield m.group("host"), m.group("command").strip(), group
+
+
+  def parse(self, lines):
+    """linesをコマンドごとに分割してパースし、(ホスト名, コマンド, パース結果)をyieldします。
+
+    パース結果は対応するパーサーがyieldしたものです。show ip routeは(IPv4RouteEntry, 行)のタプルになります。
+    対応するパーサーがないコマンドの出力は読み飛ばします。
+
+    パーサーは次のプロンプトの行でブロックの終わりを検出するので、区間の最後にプロンプトの行を補って渡します。
+    """
+    for host, command, section in self.split(lines):
+      found = self.find_command(command)
+      if found is None:
+        continue
+      name, func = found
+      for record in func(itertools.chain(section, (host + "#",))):
+        yield host, name, record
+
+
+def to_dict(record):
+  """パーサーがyieldしたものを辞書型に変換します。show ip routeの(IPv4RouteEntry, 行)はIPv4RouteEntry.to_dict()にします。
+
+  >>> from cisco_ios_show_ip_route import IPv4RouteEntry
+  >>> to_dict((IPv4RouteEntry("C", "10.0.0.0", "24", "", " Vlan1"), "line"))
+  OrderedDict([('proto', 'C'), ('addr', '10.0.0.0'), ('mask', 24), ('gw', ''), ('interface', 'Vlan1')])
+  >>> to_dict({"Port": "Te1/1/1"})
+  {'Port': 'Te1/1/1'}
+  """
+  if isinstance(record, tuple):
+    return record[0].to_dict()
+  return record
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import csv
+  import logging
+  import os
+  import sys
+  from collections import Counter
+
+  from cisco_ios_input import get_lines
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='split a terminal session into show commands and parse each of them.')
+    parser.add_argument('-o', '--output', dest='output_dir', metavar='output_dir', help='Directory to save <host>_<command>.csv files')
+    parser.add_argument('input_filename', help='Session log to be parsed')
+    args = parser.parse_args()
+
+    lines = get_lines(args.input_filename, logger)
+    if lines is None or lines.is_empty():
+      logger.error("input data not found.")
+      return 1
+
+    if args.output_dir and not os.path.isdir(args.output_dir):
+      os.makedirs(args.output_dir)
+
+    splitter = CiscoIosSessionSplitter()
+
+    # CSVの列はパーサーのfieldnamesを使う。fieldnamesを持たないパーサーは最初のレコードのキーを使う
+    parsers = {name: func.__self__ for name, _, func in splitter.registry}
+
+    counter = Counter()
+    writers = {}
+    files = []
+    try:
+      for host, command, record in splitter.parse(lines):
+        counter[(host, command)] += 1
+        if not args.output_dir:
+          continue
+        writer = writers.get((host, command))
+        if writer is None:
+          filename = os.path.join(args.output_dir, "%s_%s.csv" % (host, command.replace(" ", "_")))
+          f = open(filename, mode="w", newline="")
+          files.append(f)
+          fieldnames = list(getattr(parsers[command], "fieldnames", None) or to_dict(record).keys())
+          writer = writers[(host, command)] = csv.DictWriter(f, fieldnames, extrasaction="ignore")
+          writer.writeheader()
+          logger.info("saving to %s", filename)
+        writer.writerow(to_dict(record))
+    finally:
+      for f in files:
+        f.close()
+
+    logger.info("found %s lines", str(lines.count))
+    for (host, command), count in sorted(counter.items()):
+      print("{0} {1} : {2}".format(host, command, count))
+    return 0
+
+
+  # 実行
+  sys.exit(main())
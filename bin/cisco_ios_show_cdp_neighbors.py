@@ -24,6 +24,7 @@ __date__ = "2018/02/25"  # classを使うように改造
 #
 import re
 from collections import OrderedDict
+from cisco_ios_interface_name import add_interface_ids
 
 #
 # クラス定義
@@ -38,6 +39,10 @@ class CiscoIosShowCdpNeghborsParser(object):
   # CSV形式で保存する際のヘッダにもなる
   fieldnames = ["device_id", "local_interface", "holdtime", "capability", "platform", "port_id"]
 
+  # (インタフェース名が入っているキー, parse_ids()が番号を入れるキー)
+  # port_idはネイバー装置側のインタフェース
+  interface_keys = (("local_interface", "local_interface_id"), ("port_id", "port_interface_id"))
+
   #
   # 想定しているコマンド出力
   #
@@ -119,6 +124,87 @@ class CiscoIosShowCdpNeghborsParser(object):
       n = []
 
 
+  def parse_bytes(self, lines):
+    """bytesのままの行を精査してネイバー装置ごとに分類してyieldします。
+
+    cisco_ios_input.read_byte_lines()が返す行を想定しています。
+    セクションの判定はbytesのまま行い、ネイバーの情報を取り出す行だけをデコードします。
+    ASCIIの行ならバイト位置と文字位置は一致しますので、結果はparse()と同じになります。
+
+    Arguments:
+      lines {iterable} -- 右端の余白を削除済みのbytesまたはstrの行
+
+    Yields:
+      {dict} -- ネイバーに関する情報を辞書型に変換したもの
+
+    >>> lines = []
+    >>> lines.append(b"Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID")
+    >>> lines.append(b"E-Cat3750X-41Stack")
+    >>> lines.append(b"                 Ten 2/4/4         147            R T S I WS-C3750X Ten 2/1/2")
+    >>> parser = CiscoIosShowCdpNeghborsParser()
+    >>> list(parser.parse_bytes(lines)) == list(parser.parse([x.decode() for x in lines]))
+    True
+    """
+
+    # ネイバーごとにテキストを格納するリスト型をリスト型に格納します
+    n = []
+
+    # 処理中かどうか
+    is_section = False
+
+    # parse()と同じ文字列を、bytesの行用にも用意する
+    start_str = "Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID"
+    skip_str = "#"
+    start_bytes = start_str.encode()
+    skip_bytes = skip_str.encode()
+
+    # 右端の余白はread_byte_lines()が削除済み
+    for line in lines:
+      if line.__class__ is bytes:
+        start, skip = start_bytes, skip_bytes
+      else:
+        start, skip = start_str, skip_str
+
+      if not line:
+        continue
+
+      # bytesのinは引数を整数として解釈しようとする分だけ遅いので、parse()と同じくfind()を使う
+      if line.find(skip) >= 0:
+        is_section = False
+        continue
+
+      if line.find(start) >= 0:
+        is_section = True
+        continue
+
+      if is_section == False:
+        continue
+
+      # ネイバーの情報を含む行だけをデコードして保管する
+      # 短い行はホスト名だけの1行目なので、2行目か通常の1行表示が来たらまとめて変換する
+      n.append(line.decode() if start is start_bytes else line)
+      if len(line) < 68:
+        continue
+
+      yield self.make_dict_by_neighbor_lists(n)
+      n = []
+
+
+  def parse_ids(self, lines, table=None):
+    """parse()の結果に、インタフェース名の番号をinterface_keysのキーで加えてyieldします
+
+    番号はcisco_ios_interface_nameのInterfaceIdTableで振ります。
+    TenGigabitEthernet1/1/1とTe1/1/1のように表記が違っても、同じポートなら同じ番号になります。
+
+    Arguments:
+      lines {list} -- parse()に渡す行
+
+    Keyword Arguments:
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+    """
+    return add_interface_ids(self.parse(lines), self.interface_keys, table)
+
+
   def make_dict_by_neighbor_lists(self, lines):
     """１行or２行の情報からネイバー情報を辞書型にして返却します
 
@@ -253,26 +339,204 @@ class CiscoIosShowCdpNeghborsParser(object):
     >>> parser.get_filter_result(d, [f1, f2]) is not None
     True
     """
-    func = funcs[0]
-    result = func(d)
-    if result and funcs[1:]:
-      return self.get_filter_result(d, funcs[1:])
+    # 再帰せずに順に適用し、一致しなかった時点でやめる
+    result = None
+    for func in funcs:
+      result = func(d)
+      if not result:
+        break
     return result
 
 
 
+class CdpTopology(object):
+  """show cdp neighborsの結果から装置間の接続関係を保持するクラスです。
+
+  装置ごとにネイバー情報を保持しておき、ある装置のshow cdp neighborsを取り直したときは
+  その装置のリンクだけを差し替えます。全装置をパースし直す必要はありません。
+
+  リンクは(装置名, ローカルインタフェース) -> (ネイバー装置名, ネイバーのポート)の向きを持った辺として保持します。
+  対向装置からも逆向きの辺が見えていれば、そのリンクは双方向で確認できていることになります。
+
+  Attributes:
+    adjacency (dict): 装置名をキーに、{ローカルインタフェース: (ネイバー装置名, ネイバーのポート)}を値にした辞書型
+  """
+
+  # イベントの種類
+  EVENT_ADD = "add"
+  EVENT_DELETE = "delete"
+  EVENT_CHANGE = "change"
+  EVENT_CONFIRM = "confirm"  # 対向側の辺が双方向になった
+  EVENT_UNCONFIRM = "unconfirm"  # 対向側の辺が片方向になった
+
+  # イベントを辞書型にしたときのキーの一覧
+  fieldnames = ["event", "device", "local_interface", "neighbor", "port_id", "bidirectional"]
+
+  def __init__(self, parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      parser {CiscoIosShowCdpNeghborsParser} -- 行配列をパースするときに使うパーサー (default: {None})
+    """
+    self.adjacency = {}
+    self.parser = parser if parser else CiscoIosShowCdpNeghborsParser()
+
+
+  def update_device_lines(self, device, lines):
+    """deviceで採取したshow cdp neighborsの行配列をパースして、その装置のネイバー情報を差し替えます。
+
+    Arguments:
+      device {str} -- 採取した装置の名前
+      lines {list} -- show cdp neighborsコマンド出力を行に分割した配列
+
+    Returns:
+      list -- 変化したリンクのイベント(辞書型)の配列
+    """
+    return self.update_device(device, self.parser.parse(lines))
+
+
+  def update_device(self, device, neighbors):
+    """deviceのネイバー情報をneighborsで差し替え、変化したリンクをイベントとして返却します。
+
+    処理量はその装置のネイバー数に比例します。他の装置のリンクは対向側の辺を1つ確認するだけです。
+
+    Arguments:
+      device {str} -- 採取した装置の名前
+      neighbors {list} -- CiscoIosShowCdpNeghborsParser.parse()で得た辞書型の配列
+
+    Returns:
+      list -- 変化したリンクのイベント(辞書型)の配列
+
+    >>> topo = CdpTopology()
+    >>> events = topo.update_device("A", [{"device_id": "B", "local_interface": "Ten 1/1/1", "port_id": "Ten 2/1/1"}])
+    >>> [(e["event"], e["bidirectional"]) for e in events]
+    [('add', False)]
+    >>> events = topo.update_device("B", [{"device_id": "A", "local_interface": "Ten 2/1/1", "port_id": "Ten 1/1/1"}])
+    >>> [(e["event"], e["device"], e["bidirectional"]) for e in events]
+    [('add', 'B', True), ('confirm', 'A', True)]
+    >>> events = topo.update_device("A", [])
+    >>> [(e["event"], e["device"], e["bidirectional"]) for e in events]
+    [('delete', 'A', False), ('unconfirm', 'B', False)]
+    >>> len(list(topo.links()))
+    1
+
+    自分自身をネイバーとして表示する装置(ループバックケーブルなど)も扱えます。
+
+    >>> loop = [{"device_id": "C", "local_interface": "Gi1", "port_id": "Gi2"}, {"device_id": "C", "local_interface": "Gi2", "port_id": "Gi1"}]
+    >>> [(e["event"], e["local_interface"], e["bidirectional"]) for e in topo.update_device("C", loop)]
+    [('add', 'Gi1', True), ('add', 'Gi2', True)]
+    >>> [(e["event"], e["local_interface"], e["bidirectional"]) for e in topo.update_device("C", loop[:1])]
+    [('delete', 'Gi2', False), ('unconfirm', 'Gi1', False)]
+    >>> [(e["event"], e["local_interface"]) for e in topo.update_device("C", [])]
+    [('delete', 'Gi1')]
+    """
+
+    # 新しいネイバー情報をローカルインタフェースをキーにした辞書型にする
+    new_edges = {}
+    for d in neighbors:
+      local_interface = d.get("local_interface", "")
+      if not local_interface:
+        continue
+      new_edges[local_interface] = (d.get("device_id", ""), d.get("port_id", ""))
+
+    old_edges = self.adjacency.get(device, {})
+
+    # 影響を受ける対向側の辺と、差し替え前に双方向だったかどうか
+    reverse_edges = OrderedDict()
+    for edge in list(old_edges.values()) + list(new_edges.values()):
+      if edge not in reverse_edges and edge[0] in self.adjacency:
+        reverse_edges[edge] = self.is_bidirectional(*edge)
+
+    if new_edges:
+      self.adjacency[device] = new_edges
+    else:
+      self.adjacency.pop(device, None)
+
+    events = []
+
+    # 消えたリンク、向きが変わったリンク
+    for local_interface, edge in old_edges.items():
+      new_edge = new_edges.get(local_interface)
+      if new_edge is None:
+        events.append(self.make_event(self.EVENT_DELETE, device, local_interface, edge))
+      elif new_edge != edge:
+        events.append(self.make_event(self.EVENT_CHANGE, device, local_interface, new_edge))
+
+    # 新しく見えたリンク
+    for local_interface, edge in new_edges.items():
+      if local_interface not in old_edges:
+        events.append(self.make_event(self.EVENT_ADD, device, local_interface, edge))
+
+    # 双方向かどうかが変わった対向側の辺
+    # 自分自身がネイバーの場合、対向側の辺は上で報告済みか、差し替えで消えていることがある
+    reported = set(e["local_interface"] for e in events)
+    for (neighbor, port_id), was_bidirectional in reverse_edges.items():
+      if neighbor == device and port_id in reported:
+        continue
+      reverse_edge = self.adjacency.get(neighbor, {}).get(port_id)
+      if reverse_edge is None:
+        continue
+      if self.is_bidirectional(neighbor, port_id) != was_bidirectional:
+        event = self.EVENT_CONFIRM if not was_bidirectional else self.EVENT_UNCONFIRM
+        events.append(self.make_event(event, neighbor, port_id, reverse_edge))
+
+    return events
+
+
+  def make_event(self, event, device, local_interface, edge):
+    """リンクの変化を辞書型にして返却します
+
+    bidirectionalは対向装置からも逆向きの辺が見えているかどうかです。削除イベントでは常にFalseです。
+    """
+    neighbor, port_id = edge
+    d = OrderedDict()
+    d["event"] = event
+    d["device"] = device
+    d["local_interface"] = local_interface
+    d["neighbor"] = neighbor
+    d["port_id"] = port_id
+    d["bidirectional"] = event != self.EVENT_DELETE and self.is_bidirectional(device, local_interface)
+    return d
+
+
+  def is_bidirectional(self, device, local_interface):
+    """device, local_interfaceの辺について、対向装置からも逆向きの辺が見えていればTrueを返却します"""
+    edge = self.adjacency.get(device, {}).get(local_interface)
+    if edge is None:
+      return False
+    neighbor, port_id = edge
+    return self.adjacency.get(neighbor, {}).get(port_id) == (device, local_interface)
+
+
+  def links(self):
+    """保持している全リンクを(装置名, ローカルインタフェース, ネイバー装置名, ネイバーのポート)のタプルでyieldします。
+
+    双方向で確認できているリンクは片方の向きだけをyieldします。
+    """
+    for device, edges in self.adjacency.items():
+      for local_interface, (neighbor, port_id) in edges.items():
+        if self.is_bidirectional(device, local_interface) and (neighbor, port_id) < (device, local_interface):
+          # 逆向きの辺として既にyieldしている
+          continue
+        yield device, local_interface, neighbor, port_id
+
+
+
 #
 # ここからスクリプト
 #
 if __name__ == '__main__':
 
   import argparse
-  import csv  # 結果をCSVで保存
   import configparser  # python3 only
   import logging
   import os
   import sys
 
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import SINKS, RecordSink, SinkError, guess_format, open_sink
+  from cisco_ios_stream import RecordCounter, tap
+
   #
   # 共通スクリプト
   #
@@ -387,32 +651,6 @@ if __name__ == '__main__':
   # スクリプト固有関数
   #
 
-  def get_lines(filename):
-    """filenameのファイルを読み込んで各行をリストに格納して返却します。
-
-    Arguments:
-      filename {string} -- ファイル名
-
-    Returns:
-      [list] -- 行配列。右端の改行コードと空白文字列は削除済み。
-    """
-
-    # ファイル名が-だった場合は標準入力から読み込む
-    if not filename or filename == "-":
-      # return sys.stdin.readlines()
-      return [x.rstrip() for x in sys.stdin.readlines() ]
-
-    # ファイルを読み込む
-    try:
-      with open(filename, mode='r', encoding='utf-8') as f:
-        logger.info("open file %s", filename)
-        # return f.readlines()
-        return [x.rstrip() for x in f.readlines()]
-    except IOError:
-      logger.warn("failed to open %s", filename)
-      return None
-
-
   def dump(dicts, right_just=20):
     """OrderedDictの配列を受け取って、内容を表示します。
 
@@ -431,25 +669,34 @@ if __name__ == '__main__':
       sys.stderr.close()
 
 
-  def save(dicts, fieldnames, output_filename):
-    """OrderedDictの配列を受け取って、CSV形式で保存します。
+  def save(dicts, fieldnames, output_filename, output_format=None, batch_size=None):
+    """OrderedDictのイテレータを受け取って、指定の形式で保存します。
+
+    書き出しは別スレッドで行いますので、パーサーのジェネレータをそのまま渡せばリストに溜めずに保存できます。
 
     Arguments:
-      dicts {list} -- OrderedDictの配列
-      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
+      dicts {iterable} -- OrderedDictの配列、またはジェネレータ
+      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
       output_filename {str} -- 保存するファイル名
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+      batch_size {int} -- まとめて書き出す件数 (default: {None})
+
+    Returns:
+      int -- 保存した件数
     """
     try:
-      with open(output_filename, mode='w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(dicts)
-        logger.info("saved to %s", output_filename)
+      with open_sink(output_filename, output_format, fieldnames, batch_size=batch_size) as sink:
+        count = sink.consume(dicts)
+      logger.info("saved %s records to %s", count, output_filename)
+      return count
     except IOError:
       logger.warn("failed to open %s", output_filename)
-    except csv.Error as e:
-      logger.warn("csv error")
+    except SinkError as e:
+      logger.warn("%s error", output_format or guess_format(output_filename))
       logger.exception(e)
+    return 0
 
 
   def main():
@@ -462,6 +709,10 @@ if __name__ == '__main__':
     # 引数処理
     parser = argparse.ArgumentParser(description='main script.')
     parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, help='Records written at a time (default: %d)' % RecordSink.batch_size)
+    parser.add_argument('--stream', action='store_true', help='Display and save records as they are parsed instead of collecting them first')
+    parser.add_argument('--progress', dest='progress', type=int, default=0, metavar='N', help='Show a running record count every N records')
     parser.add_argument('input_filename', help='Filename to be parsed')  # , default='-'
     args = parser.parse_args()
 
@@ -476,24 +727,38 @@ if __name__ == '__main__':
       (name, _ext) = os.path.splitext(input_filename)
       # ファイル名だけを取り出して拡張子を差し替える
       # (name, _ext) = os.path.splitext(os.path.basename(input_filename))
-      output_filename = name + ".csv"
+      output_filename = name + SINKS[args.output_format or "csv"].extension
 
-    # 入力ファイルの各行を配列にする
-    lines = get_lines(input_filename)
-    if lines:
-      logger.info("found %s lines", str(len(lines)))
-    else:
+    # 入力ファイルの行を順に取り出すイテレータを得る。ここではまだ読み込まない
+    # ASCIIだけの行はbytesのまま取り出し、parse_bytes()でレコードにする部分だけをデコードする
+    lines = get_lines(input_filename, logger, binary=True)
+    if lines is None or lines.is_empty():
       logger.error("input data not found.")
       return 1
 
     # パーサーをインスタンス化する
     cdp_parser = CiscoIosShowCdpNeghborsParser()
 
+    # パースした件数を数えながら流す
+    counter = RecordCounter(args.progress, label="neighbors")
+    records = counter(cdp_parser.parse_bytes(lines))
+
+    if args.stream:
+      # 行の読み込み、パース、表示、保存を1件ずつ行い、結果をリストに溜めない
+      records = tap(records, None, lambda d: dump([d], right_just=RIGHT_JUST))
+      save(records, cdp_parser.fieldnames, output_filename, args.output_format, args.batch_size)
+      logger.info("found %s lines", str(lines.count))
+      logger.info("%s neighbors found", str(counter.count))
+      return 0
+
     # ネイバーごとに行を分割して、中身を辞書型に変換する
     results = []
-    for d in cdp_parser.parse(lines):
+    for d in records:
       results.append(d)
 
+    # 行数は読み終えてから分かる
+    logger.info("found %s lines", str(lines.count))
+
     # 結果を画面に表示
     dump(results, right_just=RIGHT_JUST)
 
@@ -503,7 +768,7 @@ if __name__ == '__main__':
     # 保存したいキー名を一覧にする
     # fieldnames = ["device_id", "local_interface", "holdtime", "capability", "platform", "port_id"]
     fieldnames = cdp_parser.fieldnames
-    save(results, fieldnames, output_filename)
+    save(results, fieldnames, output_filename, args.output_format, args.batch_size)
 
     return 0
 
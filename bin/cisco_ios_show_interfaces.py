@@ -24,6 +24,8 @@ __date__ = "2018/02/25"  # classを使うように書き換え
 #
 import re
 from collections import OrderedDict
+from cisco_ios_interface_name import add_interface_ids
+from cisco_ios_pattern import LazyPattern, compile_once
 
 #
 # クラス定義
@@ -75,6 +77,41 @@ class CiscoIosShowInterfacesParser(object):
   fieldnames = []
   """token_dictのキーの一覧。CSVに変換するときのヘッダになる"""
 
+  # (インタフェース名が入っているキー, parse_ids()が番号を入れるキー)
+  interface_keys = (("name", "name_id"),)
+
+  # インタフェースの区切りを検出する正規表現
+  # TenGigabitEthernet1/1/1 is administratively down, line protocol is down (disabled)
+  # ここにも欲しい情報が含まれるので、この行を見つけても即座に次の行には移れない
+  re_start = LazyPattern(r"^(\S+) is .*, line protocol is .*$")
+
+  # ブロックの終わり
+  re_end = LazyPattern(r"^(\S+)")
+
+  # 注目しているトークンと、それを得るための正規表現の文字列
+  # 画面表示やファイル保存時のカラムの順番は、ここで定義した順番になります。
+  token_patterns = OrderedDict([
+    ("name", r"^(\S+) is .*, line protocol is .*$"),
+    ("status", r"^\S+ is (.*), line protocol is .*$"),
+    ("line protocol", r"^\S+ is .*, line protocol is (.*)$"),
+    ("Description", r"^\s+Description: (.*)$"),
+    ("duplex", r"^\s+(.*), .*, media type is .*$"),
+    ("speed", r"^\s+\S+, (.*)b/s, media type is .*$"),
+    ("media", r"^\s+\S+, .*, media type is (.*)$"),
+    ("output drops", r"^\s+.* Total output drops: (\d+)"),
+    ("5 minute input bps", r"^\s+5 minute input rate (\d+) bits/sec.*$"),
+    ("5 minute input pps", r"^\s+5 minute input rate .* bits/sec, (\d+) packets/sec$"),
+    ("5 minute output bps", r"^\s+5 minute output rate (\d+) bits/sec.*$"),
+    ("5 minute output pps", r"^\s+5 minute output rate .* bits/sec, (\d+) packets/sec$"),
+    ("input packets", r"^\s+(\d+) packets input, .*$"),
+    ("input bytes", r"^\s+\d+ packets input, (\d+) bytes, .*$"),
+    ("input errors", r"^\s+(\d+) input errors, \d+ CRC, \d+ frame, \d+ overrun, \d+ ignored$"),
+    ("crc", r"^\s+\d+ input errors, (\d+) CRC, \d+ frame, \d+ overrun, \d+ ignored$"),
+    ("output packets", r"^\s+(\d+) packets output, .*$"),
+    ("output bytes", r"^\s+(\d+) packets output, (\d+) bytes, .*$"),
+    ("output errors", r"\s+(\d+) output errors, \d+ collisions, \d+ interface resets$"),
+  ])
+
   #
   # メソッド
   #
@@ -82,31 +119,15 @@ class CiscoIosShowInterfacesParser(object):
   def __init__(self):
     """コンストラクタ
 
-    注目しているトークンとそれを得るための正規表現を辞書型に格納し、クラス変数にします。
-    画面表示やファイル保存時のカラムの順番は、ここで定義した順番になります。
+    token_patternsの正規表現をコンパイルして、トークンをキーにした辞書型に格納します。
+    コンパイルはcompile_once()で最初のインスタンスのときだけ行い、以降のインスタンスは同じ正規表現を共有します。
     """
-    self.token_dict = OrderedDict()
-    self.token_dict["name"] = re.compile(r"^(\S+) is .*, line protocol is .*$")
-    self.token_dict["status"] = re.compile(r"^\S+ is (.*), line protocol is .*$")
-    self.token_dict["line protocol"] = re.compile(r"^\S+ is .*, line protocol is (.*)$")
-    self.token_dict["Description"] = re.compile(r"^\s+Description: (.*)$")
-    self.token_dict["duplex"] = re.compile(r"^\s+(.*), .*, media type is .*$")
-    self.token_dict["speed"] = re.compile(r"^\s+\S+, (.*)b/s, media type is .*$")
-    self.token_dict["media"] = re.compile(r"^\s+\S+, .*, media type is (.*)$")
-    self.token_dict["output drops"] = re.compile(r"^\s+.* Total output drops: (\d+)")
-    self.token_dict["5 minute input bps"] = re.compile(r"^\s+5 minute input rate (\d+) bits/sec.*$")
-    self.token_dict["5 minute input pps"] = re.compile(r"^\s+5 minute input rate .* bits/sec, (\d+) packets/sec$")
-    self.token_dict["5 minute output bps"] = re.compile(r"^\s+5 minute output rate (\d+) bits/sec.*$")
-    self.token_dict["5 minute output pps"] = re.compile(r"^\s+5 minute output rate .* bits/sec, (\d+) packets/sec$")
-    self.token_dict["input packets"] = re.compile(r"^\s+(\d+) packets input, .*$")
-    self.token_dict["input bytes"] = re.compile(r"^\s+\d+ packets input, (\d+) bytes, .*$")
-    self.token_dict["input errors"] = re.compile(r"^\s+(\d+) input errors, \d+ CRC, \d+ frame, \d+ overrun, \d+ ignored$")
-    self.token_dict["crc"] = re.compile(r"^\s+\d+ input errors, (\d+) CRC, \d+ frame, \d+ overrun, \d+ ignored$")
-    self.token_dict["output packets"] = re.compile(r"^\s+(\d+) packets output, .*$")
-    self.token_dict["output bytes"] = re.compile(r"^\s+(\d+) packets output, (\d+) bytes, .*$")
-    self.token_dict["output errors"] = re.compile(r"\s+(\d+) output errors, \d+ collisions, \d+ interface resets$")
+    self.token_dict = OrderedDict((k, compile_once(v)) for k, v in self.token_patterns.items())
     self.fieldnames = self.token_dict.keys()
 
+    # bytesの行に適用するために同じ正規表現をbytesでコンパイルし直したもの
+    self.token_dict_bytes = OrderedDict((k, compile_once(v.encode())) for k, v in self.token_patterns.items())
+
 
   def parse(self, lines):
     """リストの各行を精査してインターフェースごとに分類してyieldします。
@@ -136,13 +157,9 @@ class CiscoIosShowInterfacesParser(object):
     # 処理中かどうか
     is_section = False
 
-    # インタフェースの区切りを検出する正規表現
-    # TenGigabitEthernet1/1/1 is administratively down, line protocol is down (disabled)
-    # ここにも欲しい情報が含まれるので、この行を見つけても即座に次の行には移れない
-    re_start = re.compile(r"^(\S+) is .*, line protocol is .*$")
-
-    # ブロックの終わり
-    re_end = re.compile(r"^(\S+)")
+    # インタフェースの区切りとブロックの終わりを検出する正規表現
+    re_start = self.re_start
+    re_end = self.re_end
 
     # インタフェース情報を格納する辞書型
     d = OrderedDict()
@@ -198,6 +215,91 @@ class CiscoIosShowInterfacesParser(object):
           d[k] = match.group(1)
 
 
+  def parse_bytes(self, lines):
+    """bytesのままの行を精査してインターフェースごとに分類してyieldします。
+
+    cisco_ios_input.read_byte_lines()が返す行を想定しています。
+    bytesの行にはtoken_dict_bytesの正規表現を適用し、取り出したトークンだけをデコードします。
+    strの行はparse()と同じように処理しますので、結果はparse()と同じになります。
+
+    Arguments:
+      lines {iterable} -- 右端の余白を削除済みのbytesまたはstrの行
+
+    Yields:
+      {dict} -- インターフェースに関する情報を辞書型に変換したもの
+
+    >>> lines = []
+    >>> lines.append(b"TenGigabitEthernet1/1/1 is administratively down, line protocol is down (disabled)")
+    >>> lines.append("  Description: \u30b5\u30fc\u30d0\u30fc")
+    >>> lines.append(b"  Full-duplex, 1000Mb/s, media type is 1000BaseLH")
+    >>> lines.append(b"swith#")
+    >>> parser = CiscoIosShowInterfacesParser()
+    >>> results = list(parser.parse_bytes(lines))
+    >>> results == list(parser.parse([x.decode() if isinstance(x, bytes) else x for x in lines]))
+    True
+    >>> results[0].get("duplex") == "Full-duplex"
+    True
+    """
+
+    # parse()と同じ正規表現を、行の型ごとに用意する
+    tokens = {str: self.token_dict, bytes: self.token_dict_bytes}
+    re_start = {str: self.re_start}
+    re_end = {str: self.re_end}
+    for rex in (re_start, re_end):
+      rex[bytes] = compile_once(rex[str].pattern.encode())
+
+    def match_tokens(d, line, t):
+      for k, v in tokens[t].items():
+        match = v.match(line)
+        if match:
+          value = match.group(1)
+          d[k] = value.decode() if t is bytes else value
+
+    # 処理中かどうか
+    is_section = False
+
+    # インタフェース情報を格納する辞書型
+    d = OrderedDict()
+
+    for line in lines:
+      t = line.__class__
+
+      if re_start[t].match(line):
+        # 処理中なら一つ前のインタフェースの情報をyieldする
+        if is_section:
+          yield d
+        is_section = True
+        d = OrderedDict()
+        match_tokens(d, line, t)
+        continue
+
+      if not is_section:
+        continue
+
+      # ブロックが終わっていないかどうかを判定
+      if re_end[t].match(line):
+        is_section = False
+        yield d
+        continue
+
+      match_tokens(d, line, t)
+
+
+  def parse_ids(self, lines, table=None):
+    """parse()の結果に、インタフェース名の番号をinterface_keysのキーで加えてyieldします
+
+    番号はcisco_ios_interface_nameのInterfaceIdTableで振ります。
+    TenGigabitEthernet1/1/1とTe1/1/1のように表記が違っても、同じポートなら同じ番号になります。
+
+    Arguments:
+      lines {list} -- parse()に渡す行
+
+    Keyword Arguments:
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+    """
+    return add_interface_ids(self.parse(lines), self.interface_keys, table)
+
+
   def filter_dict(self, key="", value_query=""):
     """辞書型のkeyバリューがqueryに合致すればそれを返却する関数を返却
 
@@ -243,10 +345,12 @@ class CiscoIosShowInterfacesParser(object):
     Returns:
       d -- フィルタ関数をすべて適用して残ったオブジェクト、一致しない場合はNoneを返す
     """
-    func = funcs[0]
-    result = func(d)
-    if result and funcs[1:]:
-      return self.get_filter_result(d, funcs[1:])
+    # 再帰せずに順に適用し、一致しなかった時点でやめる
+    result = None
+    for func in funcs:
+      result = func(d)
+      if not result:
+        break
     return result
 
 
@@ -258,11 +362,14 @@ if __name__ == '__main__':
 
   import argparse
   import configparser  # python3 only
-  import csv  # 結果をCSVで保存
   import logging
   import os
   import sys
 
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import SINKS, RecordSink, SinkError, guess_format, open_sink
+  from cisco_ios_stream import RecordCounter, tap
+
   #
   # 共通スクリプト
   #
@@ -376,31 +483,6 @@ if __name__ == '__main__':
   # 固有スクリプト
   #
 
-  def get_lines(filename):
-    """filenameのファイルを読み込んで各行をリストに格納して返却します。
-
-    Arguments:
-      filename {string} -- ファイル名
-
-    Returns:
-      [list] -- 行配列。右端の改行コードと空白文字列は削除済み。
-    """
-    # ファイル名が-だった場合は標準入力から読み込む
-    if not filename or filename == "-":
-      # return sys.stdin.readlines()
-      return [x.rstrip() for x in sys.stdin.readlines() ]
-
-    # ファイルを読み込む
-    try:
-      with open(filename, mode="r", encoding="utf-8") as f:
-        logger.info("open file %s", filename)
-        # return f.readlines()
-        return [x.rstrip() for x in f.readlines()]
-    except IOError:
-      logger.warn("failed to open %s", filename)
-      return None
-
-
   def dump(dicts, right_just=20, exclude_admindown=False, exclude_zero=False):
     """OrderedDictの配列を受け取って、内容を表示します。
 
@@ -438,25 +520,34 @@ if __name__ == '__main__':
       sys.stderr.close()
 
 
-  def save(dicts, fieldnames, output_filename):
-    """OrderedDictの配列を受け取って、CSV形式で保存します。
+  def save(dicts, fieldnames, output_filename, output_format=None, batch_size=None):
+    """OrderedDictのイテレータを受け取って、指定の形式で保存します。
+
+    書き出しは別スレッドで行いますので、パーサーのジェネレータをそのまま渡せばリストに溜めずに保存できます。
 
     Arguments:
-      dicts {list} -- OrderedDictの配列
-      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
+      dicts {iterable} -- OrderedDictの配列、またはジェネレータ
+      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
       output_filename {str} -- 保存するファイル名
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+      batch_size {int} -- まとめて書き出す件数 (default: {None})
+
+    Returns:
+      int -- 保存した件数
     """
     try:
-      with open(output_filename, mode='w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(dicts)
-        logger.info("saved to %s", output_filename)
+      with open_sink(output_filename, output_format, fieldnames, batch_size=batch_size) as sink:
+        count = sink.consume(dicts)
+      logger.info("saved %s records to %s", count, output_filename)
+      return count
     except IOError:
       logger.warn("failed to open %s", output_filename)
-    except csv.Error as e:
-      logger.warn("csv error")
+    except SinkError as e:
+      logger.warn("%s error", output_format or guess_format(output_filename))
       logger.exception(e)
+    return 0
 
 
   def main():
@@ -469,6 +560,10 @@ if __name__ == '__main__':
     # 引数処理
     parser = argparse.ArgumentParser(description='main script.')
     parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, help='Records written at a time (default: %d)' % RecordSink.batch_size)
+    parser.add_argument('--stream', action='store_true', help='Display and save records as they are parsed instead of collecting them first')
+    parser.add_argument('--progress', dest='progress', type=int, default=0, metavar='N', help='Show a running record count every N records')
     parser.add_argument('input_filename', help='Filename to be parsed')  # , default='-'
     args = parser.parse_args()
 
@@ -484,20 +579,37 @@ if __name__ == '__main__':
       (name, _ext) = os.path.splitext(input_filename)
       # ファイル名だけを取り出して拡張子を差し替える
       # (name, _ext) = os.path.splitext(os.path.basename(input_filename))
-      output_filename = name + ".csv"
+      output_filename = name + SINKS[args.output_format or "csv"].extension
 
-    # 入力ファイルの各行を配列にする
-    lines = get_lines(input_filename)
-    if not lines:
+    # 入力ファイルの行を順に取り出すイテレータを得る。ここではまだ読み込まない
+    # ASCIIだけの行はbytesのまま取り出し、parse_bytes()でレコードにする部分だけをデコードする
+    lines = get_lines(input_filename, logger, binary=True)
+    if lines is None or lines.is_empty():
       logger.error("input data not found.")
       return 1
 
     # パーサーをインスタンス化する
     int_parser = CiscoIosShowInterfacesParser()
 
+    # パースした件数を数えながら流す
+    counter = RecordCounter(args.progress, label="interfaces")
+    records = counter(int_parser.parse_bytes(lines))
+
+    if args.stream:
+      # 行の読み込み、パース、絞り込んだものの表示、保存を1件ずつ行い、結果をリストに溜めない
+      print("outpput dropsがゼロでないものだけを抽出して表示します")
+      f = int_parser.filter_dict(key="output drops", value_query="[^0]")
+      records = tap(records, f, lambda d: dump([d]))
+      save(records, int_parser.fieldnames, output_filename, args.output_format, args.batch_size)
+      if not counter.count:
+        logger.info("nothing detected")
+        return 1
+      logger.info("Number of interfaces parsed = " + str(counter.count))
+      return 0
+
     # パーサーに全行を分析させて辞書型を得る
     results = []
-    for d in int_parser.parse(lines):
+    for d in records:
       results.append(d)
 
     # 結果表示
@@ -511,7 +623,7 @@ if __name__ == '__main__':
 
     # 結果をCSV形式でフィアルに書き込む
     fieldnames = int_parser.fieldnames
-    save(results, fieldnames, output_filename)
+    save(results, fieldnames, output_filename, args.output_format, args.batch_size)
 
     # "outpput drops"がゼロでないものだけを抽出して表示
     # 正規表現でゼロじゃないもの[^0]を指定する
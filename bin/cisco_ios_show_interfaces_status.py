@@ -25,6 +25,7 @@ __date__ = "2018/02/25"  # classを使うように改造
 #
 import re
 from collections import OrderedDict
+from cisco_ios_interface_name import add_interface_ids, interface_ids
 
 #
 # クラス定義
@@ -65,6 +66,9 @@ class CiscoIosShowInterfacesStatusParser(object):
   # 辞書型のデータを表示する際のキー一覧
   fieldnames = ["Port", "Name", "Status", "Vlan", "Duplex", "Speed", "Type"]
 
+  # (インタフェース名が入っているキー, parse_ids()が番号を入れるキー)
+  interface_keys = (("Port", "Port_id"),)
+
 
   def parse(self, lines):
     """リストの各行を精査してパラメータを辞書型にしたものをyieldします。
@@ -104,6 +108,75 @@ class CiscoIosShowInterfacesStatusParser(object):
       yield self.make_dict_by_line(line)
 
 
+  def parse_bytes(self, lines):
+    """bytesのままの行を精査してパラメータを辞書型にしたものをyieldします。
+
+    cisco_ios_input.read_byte_lines()が返す行を想定しています。
+    セクションの判定はbytesのまま行い、インタフェースの情報を取り出す行だけをデコードします。
+    ASCIIの行ならバイト位置と文字位置は一致しますので、結果はparse()と同じになります。
+
+    Arguments:
+      lines {iterable} -- 右端の余白を削除済みのbytesまたはstrの行
+
+    Yields:
+      {dict} -- インタフェース状態に関する情報を辞書型に変換したもの
+
+    >>> lines = []
+    >>> lines.append(CiscoIosShowInterfacesStatusParser.start_string.encode())
+    >>> lines.append(b"Te1/1/1                          disabled     1            full   1000 1000BaseLH")
+    >>> parser = CiscoIosShowInterfacesStatusParser()
+    >>> list(parser.parse_bytes(lines)) == list(parser.parse([x.decode() for x in lines]))
+    True
+    """
+
+    # 処理中かどうか
+    is_section = False
+
+    # strとbytesのどちらの行とも比較できるように両方を用意する
+    start_string = self.start_string
+    start_bytes = start_string.encode()
+    min_len = self.min_len
+
+    # 行単位で走査。右端の余白はread_byte_lines()が削除済み
+    for line in lines:
+      if line == start_bytes or line == start_string:
+        is_section = True
+        continue
+
+      if len(line) < min_len :
+        is_section = False
+        continue
+
+      if not is_section :
+        continue
+
+      # 情報を取り出す行だけをデコードする
+      if line.__class__ is bytes:
+        line = line.decode()
+      yield self.make_dict_by_line(line)
+
+
+  def parse_ids(self, lines, table=None):
+    """parse()の結果に、インタフェース名の番号をinterface_keysのキーで加えてyieldします
+
+    番号はcisco_ios_interface_nameのInterfaceIdTableで振ります。
+    TenGigabitEthernet1/1/1とTe1/1/1のように表記が違っても、同じポートなら同じ番号になります。
+
+    Arguments:
+      lines {list} -- parse()に渡す行
+
+    Keyword Arguments:
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+
+    >>> line = "Te1/1/1                          disabled     1            full   1000 1000BaseLH"
+    >>> parser = CiscoIosShowInterfacesStatusParser()
+    >>> d = next(parser.parse_ids([parser.start_string, line]))
+    >>> d["Port"], interface_ids.name_of(d["Port_id"])
+    ('Te1/1/1', 'TenGigabitEthernet1/1/1')
+    """
+    return add_interface_ids(self.parse(lines), self.interface_keys, table)
+
+
   def make_dict_by_line(self, line):
     """１行の情報からインタフェースの情報を辞書型にして返却します
 
@@ -217,10 +290,12 @@ class CiscoIosShowInterfacesStatusParser(object):
     Returns:
       d -- フィルタ関数をすべて適用して残ったオブジェクト、一致しない場合はNoneを返す
     """
-    func = funcs[0]
-    result = func(d)
-    if result and funcs[1:]:
-      return self.get_filter_result(d, funcs[1:])
+    # 再帰せずに順に適用し、一致しなかった時点でやめる
+    result = None
+    for func in funcs:
+      result = func(d)
+      if not result:
+        break
     return result
 
 
@@ -230,12 +305,15 @@ class CiscoIosShowInterfacesStatusParser(object):
 if __name__ == '__main__':
 
   import argparse
-  import csv  # 結果をCSVで保存
   import configparser  # python3 only
   import logging
   import os
   import sys
 
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import SINKS, RecordSink, SinkError, guess_format, open_sink
+  from cisco_ios_stream import RecordCounter, tap
+
   #
   # 共通スクリプト
   #
@@ -350,32 +428,6 @@ if __name__ == '__main__':
   # スクリプト固有関数
   #
 
-  def get_lines(filename):
-    """filenameのファイルを読み込んで各行をリストに格納して返却します。
-
-    Arguments:
-      filename {string} -- ファイル名
-
-    Returns:
-      [list] -- 行配列。右端の改行コードと空白文字列は削除済み。
-    """
-
-    # ファイル名が-だった場合は標準入力から読み込む
-    if not filename or filename == "-":
-      # return sys.stdin.readlines()
-      return [x.rstrip() for x in sys.stdin.readlines() ]
-
-    # ファイルを読み込む
-    try:
-      with open(filename, mode='r', encoding='utf-8') as f:
-        logger.info("open file %s", filename)
-        # return f.readlines()
-        return [x.rstrip() for x in f.readlines()]
-    except IOError:
-      logger.warn("failed to open %s", filename)
-      return None
-
-
   def dump(dicts, right_just=20):
     """OrderedDictの配列を受け取って、内容を表示します。
 
@@ -394,25 +446,34 @@ if __name__ == '__main__':
       sys.stderr.close()
 
 
-  def save(dicts, fieldnames, output_filename):
-    """OrderedDictの配列を受け取って、CSV形式で保存します。
+  def save(dicts, fieldnames, output_filename, output_format=None, batch_size=None):
+    """OrderedDictのイテレータを受け取って、指定の形式で保存します。
+
+    書き出しは別スレッドで行いますので、パーサーのジェネレータをそのまま渡せばリストに溜めずに保存できます。
 
     Arguments:
-      dicts {list} -- OrderedDictの配列
-      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
+      dicts {iterable} -- OrderedDictの配列、またはジェネレータ
+      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
       output_filename {str} -- 保存するファイル名
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+      batch_size {int} -- まとめて書き出す件数 (default: {None})
+
+    Returns:
+      int -- 保存した件数
     """
     try:
-      with open(output_filename, mode='w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(dicts)
-        logger.info("saved to %s", output_filename)
+      with open_sink(output_filename, output_format, fieldnames, batch_size=batch_size) as sink:
+        count = sink.consume(dicts)
+      logger.info("saved %s records to %s", count, output_filename)
+      return count
     except IOError:
       logger.warn("failed to open %s", output_filename)
-    except csv.Error as e:
-      logger.warn("csv error")
+    except SinkError as e:
+      logger.warn("%s error", output_format or guess_format(output_filename))
       logger.exception(e)
+    return 0
 
 
   def main():
@@ -425,9 +486,25 @@ if __name__ == '__main__':
     # 引数処理
     parser = argparse.ArgumentParser(description='main script.')
     parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, help='Records written at a time (default: %d)' % RecordSink.batch_size)
+    parser.add_argument('-w', '--where', dest='where', metavar='expression', help='Filter expression to display, e.g. \'Status == connected and Vlan in (10, 20)\'')
+    parser.add_argument('--stream', action='store_true', help='Display and save records as they are parsed instead of collecting them first')
+    parser.add_argument('--progress', dest='progress', type=int, default=0, metavar='N', help='Show a running record count every N records')
     parser.add_argument('input_filename', help='Filename to be parsed')  # , default='-'
     args = parser.parse_args()
 
+    # 条件式のコンパイラは-wを指定したときだけ読み込む
+    # 式の誤りは入力を開く前に知らせる
+    where = None
+    if args.where:
+      from cisco_ios_filter import compile_filter
+      try:
+        where = compile_filter(args.where)
+      except ValueError as e:
+        logger.error("invalid filter expression: %s", e)
+        return 1
+
     input_filename = args.input_filename
     output_filename = args.output_filename
 
@@ -439,39 +516,65 @@ if __name__ == '__main__':
       (name, _ext) = os.path.splitext(input_filename)
       # ファイル名だけを取り出して拡張子を差し替える
       # (name, _ext) = os.path.splitext(os.path.basename(input_filename))
-      output_filename = name + ".csv"
+      output_filename = name + SINKS[args.output_format or "csv"].extension
 
-    # 入力ファイルの各行を配列にする
-    lines = get_lines(input_filename)
-    if lines:
-      logger.info("found %s lines", str(len(lines)))
-    else:
+    # 入力ファイルの行を順に取り出すイテレータを得る。ここではまだ読み込まない
+    # ASCIIだけの行はbytesのまま取り出し、parse_bytes()でレコードにする部分だけをデコードする
+    lines = get_lines(input_filename, logger, binary=True)
+    if lines is None or lines.is_empty():
       logger.error("input data not found.")
       return 1
 
     # パーサーをインスタンス化する
     status_parser = CiscoIosShowInterfacesStatusParser()
 
+    # パースした件数を数えながら流す
+    counter = RecordCounter(args.progress, label="interfaces")
+    records = counter(status_parser.parse_bytes(lines))
+
+    if args.stream:
+      # 行の読み込み、パース、絞り込んだものの表示、保存を1件ずつ行い、結果をリストに溜めない
+      if args.where:
+        print("{0} に一致するものだけを表示します".format(args.where))
+        predicate = where.predicate
+      else:
+        print("ステータスがconnectedかつスピードが10Gのものだけを表示します")
+        funcs = [status_parser.filter_speed("10G"), status_parser.filter_status("connected")]
+        predicate = lambda d: status_parser.get_filter_result(d, funcs)
+      records = tap(records, predicate, lambda d: dump([d], right_just=RIGHT_JUST))
+      save(records, status_parser.fieldnames, output_filename, args.output_format, args.batch_size)
+      logger.info("found %s lines", str(lines.count))
+      logger.info("%s interfaces found", str(counter.count))
+      return 0
+
     # ネイバーごとに行を分割して、中身を辞書型に変換する
     results = []
-    for d in status_parser.parse(lines):
+    for d in records:
       results.append(d)
 
+    # 行数は読み終えてから分かる
+    logger.info("found %s lines", str(lines.count))
+
     logger.info("%s interfaces found", str(len(results)))
 
     # 結果を画面に表示
     # dump(results, right_just=RIGHT_JUST)
 
-    print("ステータスがconnectedかつスピードが10Gのものだけを表示します")
-    f1 = status_parser.filter_speed("10G")
-    f2 = status_parser.filter_status("connected")
-    filtered = [d for d in results if status_parser.get_filter_result(d, [f1, f2])]
+    if args.where:
+      # 条件式は一度だけコンパイルし、全レコードをまとめて絞り込む
+      print("{0} に一致するものだけを表示します".format(args.where))
+      filtered = where.select(results)
+    else:
+      print("ステータスがconnectedかつスピードが10Gのものだけを表示します")
+      f1 = status_parser.filter_speed("10G")
+      f2 = status_parser.filter_status("connected")
+      filtered = [d for d in results if status_parser.get_filter_result(d, [f1, f2])]
     dump(filtered, right_just=RIGHT_JUST)
 
     # 結果をCSV形式で保存
     # 保存したいキー名を一覧にする
     fieldnames = status_parser.fieldnames
-    save(results, fieldnames, output_filename)
+    save(results, fieldnames, output_filename, args.output_format, args.batch_size)
 
     return 0
 
@@ -19,6 +19,10 @@ __date__ = '2018/02/22'  # Python3用に書き換え
 #
 
 import re
+from collections import OrderedDict
+
+from cisco_ios_interface_name import add_interface_ids
+from cisco_ios_pattern import LazyPattern, compile_once
 
 
 class IPv4RouteEntry(object):
@@ -77,6 +81,14 @@ class IPv4RouteEntry(object):
     """greater or equal"""
     return self.addr32 >= other.addr32
 
+  def to_dict(self):
+    """保存する属性を辞書型にして返却します。インタフェース名の前の空白は削除します
+
+    >>> IPv4RouteEntry("O", "10.244.1.0", "24", "10.245.11.2", " Vlan111").to_dict()
+    OrderedDict([('proto', 'O'), ('addr', '10.244.1.0'), ('mask', 24), ('gw', '10.245.11.2'), ('interface', 'Vlan111')])
+    """
+    return OrderedDict([("proto", self.proto), ("addr", self.addr), ("mask", getattr(self, "mask", "")), ("gw", self.gw), ("interface", self.interface.strip())])
+
   def __repr__(self):
     """print"""
     # return '{0} {1}/{2} via {3} {4}'.format(self.proto, self.addr, self.mask, self.gw, self.interface)
@@ -97,29 +109,33 @@ class CiscoIosShowIpRouteParser(object):
   # (?:正規表現)　・・・カッコで括った部分をグループ扱いしない（あとから取り出す必要がない）
 
   # 10.1.22.0
-  re_ipv4_addr = re.compile(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})')
+  re_ipv4_addr = LazyPattern(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})')
 
   # 10.1.22.0/24
-  re_ipv4_prefix = re.compile(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2})')
+  re_ipv4_prefix = LazyPattern(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2})')
 
   # 100.0.0.0/16 is subnetted, 63 subnets
-  re_fixed_mask = re.compile(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is subnetted')
+  re_fixed_mask = LazyPattern(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is subnetted')
 
   # 110.0.0.0/8 is variably subnetted, 7 subnets, 2 masks
-  re_variable_mask = re.compile(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is variably subnetted')
+  re_variable_mask = LazyPattern(r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is variably subnetted')
 
   # S        110.0.0.0/8 is directly connected, Null0
-  re_directly_connected = re.compile(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is directly connected,(?P<interface>.*)')
+  re_directly_connected = LazyPattern(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is directly connected,(?P<interface>.*)')
 
   # O E1     100.3.0.0 [110/122] via 10.245.2.2, 7w0d, Vlan102
-  re_ipv4_fixed_prefix = re.compile(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3}) \[\d+/\d+] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
+  re_ipv4_fixed_prefix = LazyPattern(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3}) \[\d+/\d+] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
 
   # O        10.244.1.0/24 [110/2] via 10.245.11.2, 7w0d, Vlan111
-  re_ipv4_variable_prefix = re.compile(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) \[\d+/\d+\] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
+  re_ipv4_variable_prefix = LazyPattern(r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) \[\d+/\d+\] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
 
   # O    192.168.23.0/24 [110/2] via 192.168.13.3, 7w0d, Vlan13
   #                   [110/2] via 192.168.12.2, 7w0d, Vlan12
-  re_ipv4_prefix_ecmp = re.compile(r'\s+\[\d+/\d+] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
+  re_ipv4_prefix_ecmp = LazyPattern(r'\s+\[\d+/\d+] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)')
+
+
+  # (インタフェース名が入っている属性, parse_ids()が番号を入れる属性)
+  interface_keys = (("interface", "interface_id"),)
 
 
   def parse_lines(self, lines):
@@ -140,7 +156,7 @@ class CiscoIosShowIpRouteParser(object):
 
       #       106.0.0.0/16 is subnetted, 7 subnets
       # r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is subnetted'
-      match = re.search(self.re_fixed_mask, line)
+      match = self.re_fixed_mask.search(line)
       if match:
         current_addr = match.group('addr')
         current_mask = match.group('mask')
@@ -148,13 +164,13 @@ class CiscoIosShowIpRouteParser(object):
 
       #       110.0.0.0/8 is variably subnetted, 7 subnets, 2 masks
       # r'(?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) is variably subnetted'
-      match = re.search(self.re_variable_mask, line)
+      match = self.re_variable_mask.search(line)
       if match:
         continue
 
       # S        110.0.0.0/8 is directly connected, Null0
       # r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2})is directly connected,(?P<interface>.*)'
-      match = re.match(self.re_directly_connected, line)
+      match = self.re_directly_connected.match(line)
       if match:
         p = match.group('proto').strip()
         a = match.group('addr')
@@ -167,7 +183,7 @@ class CiscoIosShowIpRouteParser(object):
 
       # O        10.244.1.0/24 [110/2] via 10.245.11.2, 7w0d, Vlan111
       # r'(?P<proto>.*) (?P<addr>(?:\d{1,3}\.){3}\d{1,3})/(?P<mask>\d{1,2}) \[\d+/\d+\] via (?P<gw>(?:\d{1,3}\.){3}\d{1,3}),.*,(?P<interface>.*)'
-      match = re.match(self.re_ipv4_variable_prefix, line)
+      match = self.re_ipv4_variable_prefix.match(line)
       if match:
         p = match.group('proto').strip()
         a = match.group('addr')
@@ -181,7 +197,7 @@ class CiscoIosShowIpRouteParser(object):
         yield ipv4_route_entry, line
         continue
 
-      match = re.match(self.re_ipv4_fixed_prefix, line)
+      match = self.re_ipv4_fixed_prefix.match(line)
       if match:
         current_addr = match.group('addr')
         p = match.group('proto').strip()
@@ -195,7 +211,7 @@ class CiscoIosShowIpRouteParser(object):
         yield ipv4_route_entry, line
         continue
 
-      match = re.match(self.re_ipv4_prefix_ecmp, line)
+      match = self.re_ipv4_prefix_ecmp.match(line)
       if match:
         p = current_proto
         a = current_addr
@@ -209,6 +225,103 @@ class CiscoIosShowIpRouteParser(object):
   #
 
 
+  def parse_lines_bytes(self, lines):
+    """bytesのままの行を走査してIPv4RouteEntryオブジェクトをyieldする
+
+    cisco_ios_input.read_byte_lines()が返す行を想定しています。
+    bytesの行には同じ正規表現をbytesでコンパイルし直したものを適用し、取り出した値と経路の行だけをデコードします。
+    strの行はparse_lines()と同じように処理しますので、結果はparse_lines()と同じになります。
+
+    Arguments:
+      lines {iterable}: 右端の余白を削除済みのbytesまたはstrの行
+
+    Yields:
+      {obj:`IPv4RouteEntry`} -- IPv4RouteEntryクラスのオブジェクト
+
+    >>> lines = []
+    >>> lines.append(b"      100.0.0.0/16 is subnetted, 63 subnets")
+    >>> lines.append(b"O E1     100.3.0.0 [110/122] via 10.245.2.2, 7w0d, Vlan102")
+    >>> lines.append(b"                  [110/122] via 10.245.1.2, 7w0d, Vlan101")
+    >>> parser = CiscoIosShowIpRouteParser()
+    >>> [(repr(r), l) for r, l in parser.parse_lines_bytes(lines)] == [(repr(r), l) for r, l in parser.parse_lines([x.decode() for x in lines])]
+    True
+    """
+
+    # parse_lines()と同じ正規表現を、行の型ごとに用意する
+    patterns = (
+      self.re_fixed_mask,
+      self.re_variable_mask,
+      self.re_directly_connected,
+      self.re_ipv4_variable_prefix,
+      self.re_ipv4_fixed_prefix,
+      self.re_ipv4_prefix_ecmp)
+    rex = {str: patterns, bytes: tuple(compile_once(r.pattern.encode()) for r in patterns)}
+
+    current_proto = None
+    current_mask = None
+    current_addr = None
+
+    for line in lines:
+      t = line.__class__
+      re_fixed_mask, re_variable_mask, re_directly_connected, re_ipv4_variable_prefix, re_ipv4_fixed_prefix, re_ipv4_prefix_ecmp = rex[t]
+
+      # bytesの行ならマッチした部分だけをデコードする
+      decode = bytes.decode if t is bytes else str
+
+      match = re_fixed_mask.search(line)
+      if match:
+        current_addr = decode(match.group('addr'))
+        current_mask = decode(match.group('mask'))
+        continue
+
+      if re_variable_mask.search(line):
+        continue
+
+      match = re_directly_connected.match(line)
+      if match:
+        p, a, m, i = map(decode, match.group('proto', 'addr', 'mask', 'interface'))
+        yield IPv4RouteEntry(p.strip(), a, m, "", i), decode(line)
+        continue
+
+      match = re_ipv4_variable_prefix.match(line)
+      if match:
+        p, a, m, g, i = map(decode, match.group('proto', 'addr', 'mask', 'gw', 'interface'))
+        current_proto = p = p.strip()
+        current_addr = a
+        current_mask = m
+        yield IPv4RouteEntry(p, a, m, g, i), decode(line)
+        continue
+
+      match = re_ipv4_fixed_prefix.match(line)
+      if match:
+        p, a, g, i = map(decode, match.group('proto', 'addr', 'gw', 'interface'))
+        current_proto = p = p.strip()
+        current_addr = a
+        yield IPv4RouteEntry(p, a, current_mask, g, i), decode(line)
+        continue
+
+      match = re_ipv4_prefix_ecmp.match(line)
+      if match:
+        g, i = map(decode, match.group('gw', 'interface'))
+        yield IPv4RouteEntry(current_proto, current_addr, current_mask, g, i), decode(line)
+        continue
+
+
+  def parse_ids(self, lines, table=None):
+    """parse_lines()の結果に、インタフェース名の番号をIPv4RouteEntryのinterface_idの属性に加えてyieldします
+
+    番号はcisco_ios_interface_nameのInterfaceIdTableで振ります。
+    TenGigabitEthernet1/1/1とTe1/1/1のように表記が違っても、同じポートなら同じ番号になります。
+
+    Arguments:
+      lines {list} -- parse_lines()に渡す行
+
+    Keyword Arguments:
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+    """
+    return add_interface_ids(self.parse_lines(lines), self.interface_keys, table)
+
+
   def filter_addr(self, query):
     """アドレスを文字列で比較して条件にあえばそのIPv4RouteEntryを返却する関数を返却
 
@@ -362,10 +475,12 @@ class CiscoIosShowIpRouteParser(object):
     Returns:
       d -- フィルタ関数をすべて適用して残ったオブジェクト、一致しない場合はNoneを返す
     """
-    func = funcs[0]
-    result = func(d)
-    if result and funcs[1:]:
-      return self.get_filter_result(d, funcs[1:])
+    # 再帰せずに順に適用し、一致しなかった時点でやめる
+    result = None
+    for func in funcs:
+      result = func(d)
+      if not result:
+        break
     return result
 
 
@@ -376,10 +491,14 @@ if __name__ == '__main__':
 
   import argparse
   import configparser  # python3 only
-  import csv  # 結果をCSVで保存
   import logging
   import os
   import sys
+  from collections import OrderedDict
+
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import SINKS, RecordSink, SinkError, guess_format, open_sink
+  from cisco_ios_stream import RecordCounter
 
   #
   # 共通スクリプト
@@ -494,36 +613,11 @@ if __name__ == '__main__':
   # 固有スクリプト
   #
 
-  def get_lines(filename):
-    """filenameのファイルを読み込んで各行をリストに格納して返却します。
-
-    Arguments:
-      filename {string} -- ファイル名
-
-    Returns:
-      [list] -- 行配列。右端の改行コードと空白文字列は削除済み。
-    """
-    # ファイル名が-だった場合は標準入力から読み込む
-    if not filename or filename == "-":
-      # return sys.stdin.readlines()
-      return [x.rstrip() for x in sys.stdin.readlines() ]
-
-    # ファイルを読み込む
-    try:
-      with open(filename, mode="r", encoding="utf-8") as f:
-        logger.info("open file %s", filename)
-        # return f.readlines()
-        return [x.rstrip() for x in f.readlines()]
-    except IOError:
-      logger.warn("failed to open %s", filename)
-      return None
-
-
   def test_ecmp():
     """ECMPを含む経路をパースするテスト"""
 
     # ファイルを行配列にする
-    lines = get_lines(os.path.join(testdata_dir, "show_ip_route3.log"))
+    lines = get_lines(os.path.join(testdata_dir, "show_ip_route3.log"), logger)
 
     # パーサーをインスタンス化する
     parser = CiscoIosShowIpRouteParser()
@@ -541,7 +635,7 @@ if __name__ == '__main__':
     """フィルタのテスト"""
     # ファイルを行配列にする
     filename1 = "testdata/show_ip_route1.log"
-    lines1 = get_lines(filename1)
+    lines1 = get_lines(filename1, logger)
     # パーサーをインスタンス化する
     parser = CiscoIosShowIpRouteParser()
     # リストに格納する
@@ -566,8 +660,8 @@ if __name__ == '__main__':
     # ファイルを行配列にする
     filename1 = "testdata/show_ip_route1.log"
     filename2 = "testdata/show_ip_route2.log"
-    lines1 = get_lines(filename1)
-    lines2 = get_lines(filename2)
+    lines1 = get_lines(filename1, logger)
+    lines2 = get_lines(filename2, logger)
 
     # パーサーをインスタンス化する
     parser = CiscoIosShowIpRouteParser()
@@ -602,7 +696,7 @@ if __name__ == '__main__':
 
   def test_print():
     filename = "testdata/show_ip_route1.log"
-    lines = get_lines(filename)
+    lines = get_lines(filename, logger)
     parser = CiscoIosShowIpRouteParser()
     route_entries = []
     for ipv4_route_entry, _line in parser.parse_lines(lines):
@@ -612,12 +706,106 @@ if __name__ == '__main__':
       print(ipv4_route_entry)
 
 
+  # 経路を保存するときのキーの一覧
+  fieldnames = ["proto", "addr", "mask", "gw", "interface"]
+
+
+  def route_dicts(records):
+    """parse_lines()の(IPv4RouteEntry, 行)を辞書型にしてyieldします"""
+    for entry, _line in records:
+      yield entry.to_dict()
+
+
+  def save(dicts, fieldnames, output_filename, output_format=None, batch_size=None):
+    """OrderedDictのイテレータを受け取って、指定の形式で保存します。
+
+    書き出しは別スレッドで行いますので、ジェネレータをそのまま渡せばリストに溜めずに保存できます。
+
+    Arguments:
+      dicts {iterable} -- OrderedDictの配列、またはジェネレータ
+      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
+      output_filename {str} -- 保存するファイル名
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+      batch_size {int} -- まとめて書き出す件数 (default: {None})
+
+    Returns:
+      int -- 保存した件数
+    """
+    try:
+      with open_sink(output_filename, output_format, fieldnames, batch_size=batch_size) as sink:
+        count = sink.consume(dicts)
+      logger.info("saved %s records to %s", count, output_filename)
+      return count
+    except IOError:
+      logger.warn("failed to open %s", output_filename)
+    except SinkError as e:
+      logger.warn("%s error", output_format or guess_format(output_filename))
+      logger.exception(e)
+    return 0
+
+
   def main():
-    """メイン関数"""
-    #test_print()
-    test_diff()
-    #test_filter()
-    #test_ecmp()
+    """メイン関数
+
+    入力ファイルの指定がなければ、テストデータで差分を取るテストを実行します。
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='main script.')
+    parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, help='Records written at a time (default: %d)' % RecordSink.batch_size)
+    parser.add_argument('--stream', action='store_true', help='Save records as they are parsed instead of collecting them first')
+    parser.add_argument('--progress', dest='progress', type=int, default=0, metavar='N', help='Show a running record count every N records')
+    parser.add_argument('input_filename', nargs='?', help='Filename to be parsed')
+    args = parser.parse_args()
+
+    if not args.input_filename:
+      #test_print()
+      test_diff()
+      #test_filter()
+      #test_ecmp()
+      return 0
+
+    input_filename = args.input_filename
+    output_filename = args.output_filename
+
+    if input_filename == "-" and not output_filename:
+      output_filename = DEFAULT_OUTPUT_FILENAME
+
+    # 保存するファイル名が未定の場合、入力ファイルのパスの拡張子だけを差し替える
+    if not output_filename:
+      (name, _ext) = os.path.splitext(input_filename)
+      output_filename = name + SINKS[args.output_format or "csv"].extension
+
+    # 入力ファイルの行を順に取り出すイテレータを得る。ここではまだ読み込まない
+    # ASCIIだけの行はbytesのまま取り出し、parse_bytes()でレコードにする部分だけをデコードする
+    lines = get_lines(input_filename, logger, binary=True)
+    if lines is None or lines.is_empty():
+      logger.error("input data not found.")
+      return 1
+
+    # パーサーをインスタンス化する
+    route_parser = CiscoIosShowIpRouteParser()
+
+    # パースした件数を数えながら流す
+    counter = RecordCounter(args.progress, label="routes")
+    records = counter(route_dicts(route_parser.parse_lines_bytes(lines)))
+
+    if args.stream:
+      # 行の読み込み、パース、保存を1件ずつ行い、結果をリストに溜めない
+      save(records, fieldnames, output_filename, args.output_format, args.batch_size)
+    else:
+      results = list(records)
+      save(results, fieldnames, output_filename, args.output_format, args.batch_size)
+
+    logger.info("found %s lines", str(lines.count))
+    logger.info("%s routes found", str(counter.count))
     return 0
 
   sys.exit(main())
@@ -18,8 +18,15 @@ __date__ = '2018/02/27'  # Python3用に書き換え
 # 標準ライブラリのインポート
 #
 
+import bisect
+import hashlib
+import heapq
+import os
 import re
+import time
 from collections import OrderedDict
+from cisco_ios_interface_name import add_interface_ids, interface_ids
+from cisco_ios_pattern import LazyPattern
 
 
 class CiscoIosShowLoggingParser(object):
@@ -31,48 +38,37 @@ class CiscoIosShowLoggingParser(object):
   # クラス変数
   #
 
-  token_dict = None
-  """注目しているトークンをキーに、それを得るための正規表現を値にしたOrderedDict"""
-
-  fieldnames = []
-  """tokensのキーの一覧。CSVに変換するときのヘッダになる"""
-
-  #
-  # メソッド
+  # ログのフォーマットは設定次第で変わってしまうため、環境に合わせてカスタマイズが必要かも。
+  # Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down
   #
+  # 1回のマッチで全トークンを取り出せるように、1つの正規表現にまとめています。
+  # グループの順番がそのまま辞書型のキーの順番になります。
+  rex_log = re.compile(r"^(?P<date>\S.*?): %(?P<facility>\S+)-(?P<severity>\d)-(?P<mnemonic>\S+): (?P<description>.*)$")
+  """ログの行から日付、ファシリティ、severity、ニモニック、メッセージを取り出す正規表現"""
 
-  def __init__(self):
-    """コンストラクタ
-
-    注目しているトークンとそれを得るための正規表現を辞書型に格納し、クラス変数にします。
-    画面表示やファイル保存時のカラムの順番は、ここで定義した順番になります。
-    """
-
-    # 注目しているトークンとそれを得るための正規表現を定義して、辞書型に格納する
-    # CSV保存するときのカラムの順番は、ここで定義した順番になる
-    # ログのフォーマットは設定次第で変わってしまうため、環境に合わせてカスタマイズが必要かも。
-    # Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down
+  fieldnames = list(rex_log.groupindex)
+  """rex_logのグループ名の一覧。CSVに変換するときのヘッダになる"""
 
-    self.token_dict = OrderedDict()
-    self.token_dict["date"] = re.compile(r"^(\S.*): %.*-\d-.*: .*$")
-    self.token_dict["facility"] = re.compile(r"^\S.*: %(\S+)-\d-.*: .*$")
-    self.token_dict["severity"] = re.compile(r"^\S.*: %.*-(\d)-.*: .*$")
-    self.token_dict["mnemonic"] = re.compile(r"^\S.*: %.*-\d-(\S+): .*$")
-    self.token_dict["description"] = re.compile(r"^\S.*: %.*-\d-.*: (.*)$")
+  rex_log_bytes = LazyPattern(rex_log.pattern.encode())
+  """rex_logをbytesの行に適用するためにコンパイルし直したもの"""
 
-    self.fieldnames = self.token_dict.keys()
+  interface_keys = (("interface", "interface_id"),)
+  """(メッセージから取り出したインタフェース名のキー, parse_ids()が番号を入れるキー)"""
 
+  #
+  # メソッド
+  #
 
   def parse(self, lines):
     """リストの各行を精査してログ情報を辞書型にしたものをyieldします。
 
-    インターフェースの区切りを検出したら処理を開始し、インタフェースのブロックを抜けたら辞書型をyieldします。
+    ログのフォーマットにあった行を見つけたら、その行を辞書型にしてyieldします。
 
     Arguments:
       lines {list} -- show loggingコマンド出力を行に分割した配列。
 
     Yields:
-      {dict} -- インターフェースに関する情報を辞書型に変換したもの
+      {dict} -- ログに関する情報を辞書型に変換したもの
 
     >>> lines = []
     >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
@@ -85,33 +81,103 @@ class CiscoIosShowLoggingParser(object):
     True
     """
 
-    # ログ表示かどうかを検出する正規表現
-    rex_log = re.compile(r"^\S.*: (%.*-\d-.*): .*")
+    # ループ内で属性を引かないようにローカル変数にしておく
+    match = self.rex_log.match
+    fieldnames = self.fieldnames
 
     # 行単位で走査
     for line in lines:
-      # 改行コードを含む右端の余白を削除
-      line = line.rstrip()
+      # 改行コードを含む右端の余白を削除し、ログのフォーマットにあっているかどうかを判定
+      m = match(line.rstrip())
+      if m:
+        yield OrderedDict(zip(fieldnames, m.groups()))
 
-      # この行がログのフォーマットにあっているかどうかを判定
-      match = rex_log.match(line)
-      if match :
-        yield self.make_dict_by_line(line)
 
+  def parse_bytes(self, lines):
+    """bytesのままの行を精査してログ情報を辞書型にしたものをyieldします。
 
-  def make_dict_by_line(self, line):
-    """１行の情報からログ情報を辞書型にして返却します"""
+    cisco_ios_input.read_byte_lines()が返す行を想定しています。
+    bytesの行にはrex_log_bytesを適用し、取り出したトークンだけをデコードします。
+    strの行はparse()と同じように処理しますので、結果はparse()と同じになります。
+
+    Arguments:
+      lines {iterable} -- 右端の余白を削除済みのbytesまたはstrの行
+
+    Yields:
+      {dict} -- ログに関する情報を辞書型に変換したもの
+
+    >>> lines = []
+    >>> lines.append(b"Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+    >>> lines.append("Sep  5 22:56:49.497: %SYS-5-CONFIG_I: Configured from console by \\u7ba1\\u7406\\u8005")
+    >>> parser = CiscoIosShowLoggingParser()
+    >>> results = list(parser.parse_bytes(lines))
+    >>> results[0] == parser.make_dict_by_line(lines[0].decode())
+    True
+    >>> results[1].get("description") == "Configured from console by \\u7ba1\\u7406\\u8005"
+    True
+    """
+    match_bytes = self.rex_log_bytes.match
+    match = self.rex_log.match
+    fieldnames = self.fieldnames
+    decode = bytes.decode
+
+    for line in lines:
+      if line.__class__ is bytes:
+        m = match_bytes(line)
+        if m:
+          yield OrderedDict(zip(fieldnames, map(decode, m.groups())))
+        continue
+      m = match(line)
+      if m:
+        yield OrderedDict(zip(fieldnames, m.groups()))
+
+
+  def parse_ids(self, lines, table=None):
+    """parse()の結果に、メッセージに含まれる最初のインタフェース名をinterfaceのキーで、その番号をinterface_idのキーで加えてyieldします
+
+    インタフェース名はLogEventAggregator.rex_interfaceで取り出し、表記はメッセージのままにします。
+    インタフェース名がないログには、どちらのキーも加えません。
+
+    Arguments:
+      lines {list} -- show loggingコマンド出力を行に分割した配列。
+
+    Keyword Arguments:
+      table {InterfaceIdTable} -- 番号表。省略時はプロセスで共通のもの (default: {None})
+
+    >>> lines = ["Sep  5 22:57:15.455: %SPANTREE-SW1-6-PORT_STATE: Port Po111 instance 104 moving from forwarding to disabled"]
+    >>> d = next(CiscoIosShowLoggingParser().parse_ids(lines))
+    >>> d["interface"], interface_ids.name_of(d["interface_id"])
+    ('Po111', 'Port-channel111')
+    """
+    return add_interface_ids(self.with_interface(self.parse(lines)), self.interface_keys, table)
 
-    # ログ情報格納用に辞書型を新しく作る
-    d = OrderedDict()
 
-    # 関心のあるトークンが含まれるかどうかを正規表現で判定
-    for k,v in self.token_dict.items():
-      match = v.match(line)
-      if match:
-        d[k] = match.group(1)
+  def with_interface(self, records):
+    """ログの辞書型に、メッセージに含まれる最初のインタフェース名をinterfaceのキーで加えてyieldします"""
+    search = LogEventAggregator.rex_interface.search
+    for d in records:
+      m = search(d.get("description", ""))
+      if m:
+        d["interface"] = m.group(1)
+      yield d
 
-    return d
+
+  def make_dict_by_line(self, line):
+    """１行の情報からログ情報を辞書型にして返却します
+
+    ログのフォーマットにあっていない場合は空の辞書型を返却します。
+
+    >>> parser = CiscoIosShowLoggingParser()
+    >>> d = parser.make_dict_by_line("Sep  5 22:57:15.467: %OSPF-SW1-5-ADJCHG: Process 1, Nbr 1.1.1.3 on Vlan104 from FULL to DOWN, Neighbor Down: Interface down or detached")
+    >>> d.get("mnemonic") == "ADJCHG"
+    True
+    >>> d.get("description") == "Process 1, Nbr 1.1.1.3 on Vlan104 from FULL to DOWN, Neighbor Down: Interface down or detached"
+    True
+    """
+    m = self.rex_log.match(line)
+    if not m:
+      return OrderedDict()
+    return OrderedDict(zip(self.fieldnames, m.groups()))
 
 
   def filter_dict(self, key="", value_query=""):
@@ -138,6 +204,595 @@ class CiscoIosShowLoggingParser(object):
     return _filter
 
 
+class CiscoIosLogTimestampParser(object):
+  """ログの日付(dateの値)をエポックからのミリ秒(int)に変換するクラスです。
+
+  service timestampsの設定によって、次のような形式がありえます。
+
+    Sep  5 22:56:48.497          msecあり
+    Sep  5 22:56:48              msecなし
+    Sep  5 2016 22:56:48.497     yearあり
+    Sep  5 22:56:48.497 JST      show-timezoneあり
+    *Sep  5 22:56:48.497         時刻同期していない(*)、同期が外れた(.)
+    000123: Sep  5 22:56:48.497  sequence-numbersあり
+
+  年が含まれていない場合はコンストラクタで指定した年を使います。
+  タイムゾーンが含まれていない場合は、コンストラクタで指定したオフセットの時刻とみなします。
+  "1w2d"のような稼働時間形式の場合は変換できないのでNoneを返します。
+
+  同じ日付のログは大量に出てきますので、月日(年)の部分をキーにしてその日の0時のエポックをキャッシュします。
+  """
+
+  rex_timestamp = LazyPattern(
+    r"^(?:\d+: )?[*.]?"
+    r"(?P<day>(?P<mon>[A-Z][a-z]{2}) +(?P<mday>\d{1,2})(?: (?P<year>\d{4}))?) "
+    r"(?P<hour>\d{1,2}):(?P<min>\d{2}):(?P<sec>\d{2})(?:\.(?P<msec>\d{1,6}))?"
+    r"(?: (?P<tz>[A-Za-z][\w+-]*))?$")
+  """日付を取り出す正規表現"""
+
+  months = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+            "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+  """月の名前と数字の対応"""
+
+  timezones = {"UTC": 0, "GMT": 0, "JST": 9 * 3600, "KST": 9 * 3600, "CST": -6 * 3600, "CDT": -5 * 3600,
+               "EST": -5 * 3600, "EDT": -4 * 3600, "MST": -7 * 3600, "MDT": -6 * 3600,
+               "PST": -8 * 3600, "PDT": -7 * 3600, "CET": 3600, "CEST": 2 * 3600}
+  """タイムゾーン名とUTCからのオフセット(秒)の対応。clock timezoneで任意の名前を付けられるので、必要に応じて追加します"""
+
+  def __init__(self, year=None, utc_offset=0):
+    """コンストラクタ
+
+    Keyword Arguments:
+      year {int} -- 年が含まれていないログに使う年。省略時は今年 (default: {None})
+      utc_offset {int} -- タイムゾーンが含まれていないログのUTCからのオフセット(秒) (default: {0})
+    """
+    self.year = year if year else time.gmtime().tm_year
+    self.utc_offset = utc_offset
+
+    # 月日(年)の文字列をキーに、その日の0時(UTC)のエポック秒を値にしたキャッシュ
+    self.day_cache = {}
+
+
+  def to_epoch(self, date):
+    """日付の文字列をエポックからのミリ秒に変換して返却します。変換できない場合はNoneを返します。
+
+    Arguments:
+      date {str} -- ログの日付部分
+
+    Returns:
+      int -- エポックからのミリ秒
+
+    >>> p = CiscoIosLogTimestampParser(year=2016)
+    >>> p.to_epoch("Sep  5 22:56:48.497")
+    1473116208497
+    >>> p.to_epoch("Sep  5 22:56:48")
+    1473116208000
+    >>> p.to_epoch("000123: *Sep  5 2016 22:56:48.497")
+    1473116208497
+    >>> p.to_epoch("Sep  6 07:56:48.497 JST")
+    1473116208497
+    >>> p.to_epoch("1w2d") is None
+    True
+    """
+    m = self.rex_timestamp.match(date)
+    if not m:
+      return None
+
+    day, hour, minute, sec, msec, tz = m.group("day", "hour", "min", "sec", "msec", "tz")
+
+    day_epoch = self.day_cache.get(day)
+    if day_epoch is None:
+      mon, mday, year = m.group("mon", "mday", "year")
+      month = self.months.get(mon)
+      if month is None:
+        return None
+      year = int(year) if year else self.year
+      # calendarはインポートに時間がかかる(localeも読み込む)ので、日付を変換するときまで読み込まない
+      import calendar
+      day_epoch = calendar.timegm((year, month, int(mday), 0, 0, 0))
+      self.day_cache[day] = day_epoch
+
+    if tz is None:
+      offset = self.utc_offset
+    else:
+      offset = self.timezones.get(tz.upper(), self.utc_offset)
+
+    seconds = day_epoch + int(hour) * 3600 + int(minute) * 60 + int(sec) - offset
+    millis = int(msec[:3].ljust(3, "0")) if msec else 0
+    return seconds * 1000 + millis
+
+
+class LogTimeIndex(object):
+  """ログの辞書型を時刻順に並べて保持し、時間範囲で取り出すためのクラスです。
+
+  show loggingの表示はスーパーバイザごとに時刻が前後することがあるので、追加時には並べ替えず、
+  検索するときに一度だけ並べ替えます。範囲検索は二分探索です。
+
+  >>> parser = CiscoIosShowLoggingParser()
+  >>> lines = []
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("Sep  5 22:56:48.485: %EC-SW2_STBY-5-UNBUNDLE: Interface TenGigabitEthernet1/3/11 left the port-channel Port-channel111")
+  >>> lines.append("Sep  5 23:11:00.000: %SYS-5-CONFIG_I: Configured from console by vty0")
+  >>> index = LogTimeIndex(CiscoIosLogTimestampParser(year=2016))
+  >>> index.extend(parser.parse(lines))
+  3
+  >>> [d["facility"] for d in index.between("Sep  5 22:50:00", "Sep  5 23:10:00")]
+  ['EC-SW2_STBY', 'LINK-SW1']
+  """
+
+  def __init__(self, timestamp_parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      timestamp_parser {CiscoIosLogTimestampParser} -- 日付の変換に使うオブジェクト (default: {None})
+    """
+    self.timestamp_parser = timestamp_parser if timestamp_parser else CiscoIosLogTimestampParser()
+    self.epochs = []
+    self.records = []
+    self.is_sorted = True
+
+
+  def __len__(self):
+    return len(self.epochs)
+
+
+  def add(self, d):
+    """ログの辞書型を追加します。日付を変換できなかった場合はFalseを返します。"""
+    epoch = self.timestamp_parser.to_epoch(d.get("date", ""))
+    if epoch is None:
+      return False
+    if self.epochs and epoch < self.epochs[-1]:
+      self.is_sorted = False
+    self.epochs.append(epoch)
+    self.records.append(d)
+    return True
+
+
+  def extend(self, dicts):
+    """ログの辞書型をまとめて追加し、追加できた件数を返します。"""
+    count = 0
+    for d in dicts:
+      if self.add(d):
+        count += 1
+    return count
+
+
+  def sort(self):
+    """時刻順に並べ替えます。同じ時刻のものは追加した順番を保ちます。"""
+    if self.is_sorted:
+      return
+    order = sorted(range(len(self.epochs)), key=self.epochs.__getitem__)
+    self.epochs = [self.epochs[i] for i in order]
+    self.records = [self.records[i] for i in order]
+    self.is_sorted = True
+
+
+  def range(self, start=None, end=None):
+    """エポックミリ秒でstart以上end未満のログの辞書型を時刻順に返却します。Noneは無制限です。"""
+    self.sort()
+    lo = 0 if start is None else bisect.bisect_left(self.epochs, start)
+    hi = len(self.epochs) if end is None else bisect.bisect_left(self.epochs, end)
+    return self.records[lo:hi]
+
+
+  def between(self, start=None, end=None):
+    """ログと同じ形式の日付文字列でstart以上end未満のログの辞書型を時刻順に返却します。"""
+    to_epoch = self.timestamp_parser.to_epoch
+    return self.range(to_epoch(start) if start else None, to_epoch(end) if end else None)
+
+
+class LogFileFollower(object):
+  """追記され続けるログファイルから、新しく追記された行だけを読み出すクラスです。
+
+  ファイルごとにinodeと読み終えたバイト位置を覚えておき、次回はその位置から読み始めます。
+  inodeが変わっていたらローテーションされたと判断し、サイズが読み終えた位置より小さければ
+  切り詰められたと判断して、どちらの場合も先頭から読み直します。
+
+  読み終えた位置はJSON形式でファイルに保存しますので、再起動しても過去の分を読み直すことはありません。
+  行の途中までしか書かれていない場合は、その行は次回に読みます。
+  """
+
+  # 一度に読み込むバイト数
+  chunk_size = 1024 * 1024
+
+  def __init__(self, state_filename=None, parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      state_filename {str} -- 読み終えた位置を保存するファイル名。Noneなら保存しない (default: {None})
+      parser {CiscoIosShowLoggingParser} -- 新しい行をパースするパーサー (default: {None})
+    """
+    self.state_filename = state_filename
+    self.parser = parser if parser else CiscoIosShowLoggingParser()
+
+    # ファイルの絶対パスをキーに、{"inode": inode, "offset": 読み終えた位置}を値にした辞書型
+    self.offsets = {}
+    self.load()
+
+
+  def load(self):
+    """保存しておいた読み終えた位置を読み込みます"""
+    if not self.state_filename or not os.path.exists(self.state_filename):
+      return
+    import json
+    with open(self.state_filename, mode="r", encoding="utf-8") as f:
+      self.offsets = json.load(f)
+
+
+  def save(self):
+    """読み終えた位置をファイルに保存します。書きかけのファイルが残らないように置き換えで保存します。"""
+    if not self.state_filename:
+      return
+    import json
+    tmp_filename = self.state_filename + ".tmp"
+    with open(tmp_filename, mode="w", encoding="utf-8") as f:
+      json.dump(self.offsets, f, indent=2)
+    os.replace(tmp_filename, self.state_filename)
+
+
+  def read_new_lines(self, filename):
+    """filenameに前回から追記された行をyieldします。右端の改行コードと空白文字列は削除済みです。
+
+    >>> import tempfile
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> filename = os.path.join(tmpdir, "syslog.log")
+    >>> with open(filename, "w") as f:
+    ...   _ = f.write("line1\\nline2\\nline3")
+    >>> follower = LogFileFollower(os.path.join(tmpdir, "state.json"))
+    >>> list(follower.read_new_lines(filename))
+    ['line1', 'line2']
+    >>> with open(filename, "a") as f:
+    ...   _ = f.write(" continued\\n")
+    >>> list(follower.read_new_lines(filename))
+    ['line3 continued']
+    >>> list(LogFileFollower(os.path.join(tmpdir, "state.json")).read_new_lines(filename))
+    []
+    >>> with open(filename, "w") as f:
+    ...   _ = f.write("truncated\\n")
+    >>> list(follower.read_new_lines(filename))
+    ['truncated']
+    """
+    path = os.path.abspath(filename)
+    try:
+      st = os.stat(path)
+    except OSError:
+      return
+
+    state = self.offsets.get(path)
+    if state is None or state.get("inode") != st.st_ino or st.st_size < state.get("offset", 0):
+      # 初めて見るファイル、ローテーションされたファイル、切り詰められたファイルは先頭から
+      state = {"inode": st.st_ino, "offset": 0}
+      self.offsets[path] = state
+
+    if st.st_size == state["offset"]:
+      return
+
+    with open(path, mode="rb") as f:
+      f.seek(state["offset"])
+      rest = b""
+      while True:
+        chunk = f.read(self.chunk_size)
+        if not chunk:
+          break
+        chunk = rest + chunk
+        pos = chunk.rfind(b"\n")
+        if pos < 0:
+          rest = chunk
+          continue
+        rest = chunk[pos + 1:]
+        for line in chunk[:pos].split(b"\n"):
+          yield line.decode("utf-8", errors="replace").rstrip()
+        # 改行まで読み終えた位置を覚えておく
+        state["offset"] = f.tell() - len(rest)
+        self.save()
+
+
+  def poll(self, filenames):
+    """filenamesの各ファイルに追記された行をパースしてログの辞書型をyieldします"""
+    for filename in filenames:
+      for d in self.parser.parse(self.read_new_lines(filename)):
+        yield d
+
+
+  def follow(self, filenames, interval=1.0):
+    """filenamesの各ファイルをinterval秒ごとに確認し続け、追記されたログの辞書型をyieldします"""
+    while True:
+      for d in self.poll(filenames):
+        yield d
+      time.sleep(interval)
+
+
+class SpaceSavingCounter(object):
+  """出現回数の多いキーを一定のメモリで数えるクラスです(Space-Savingアルゴリズム)。
+
+  保持するキーの数はcapacity個までです。いっぱいのときに新しいキーが来たら、一番少ないキーを追い出して
+  その回数を引き継ぎます。引き継いだ回数は誤差(error)として覚えておきます。
+  capacityより多く出現するキーは必ず残り、count - errorが真の回数の下限になります。
+
+  >>> c = SpaceSavingCounter(2)
+  >>> for k in "aabacad":
+  ...   c.add(k)
+  >>> c.top(1)
+  [('a', 4, 0)]
+  """
+
+  def __init__(self, capacity=1000):
+    self.capacity = capacity
+    # キーを値に[回数, 誤差]を値にした辞書型
+    self.counters = {}
+    # 一番少ないキーを探すためのヒープ。回数が古いエントリは取り出すときに直す
+    self.heap = []
+
+
+  def __len__(self):
+    return len(self.counters)
+
+
+  def add(self, key, count=1):
+    """keyの回数をcountだけ増やします"""
+    counter = self.counters.get(key)
+    if counter is not None:
+      counter[0] += count
+      return
+
+    if len(self.counters) < self.capacity:
+      self.counters[key] = [count, 0]
+      heapq.heappush(self.heap, (count, key))
+      return
+
+    # 一番少ないキーを追い出して、その回数を引き継ぐ
+    while True:
+      min_count, min_key = heapq.heappop(self.heap)
+      current = self.counters[min_key][0]
+      if current == min_count:
+        break
+      heapq.heappush(self.heap, (current, min_key))
+    del self.counters[min_key]
+    self.counters[key] = [min_count + count, min_count]
+    heapq.heappush(self.heap, (min_count + count, key))
+
+
+  def top(self, n=10):
+    """回数の多い順に(キー, 回数, 誤差)をn個返却します"""
+    items = heapq.nlargest(n, self.counters.items(), key=lambda x: x[1][0])
+    return [(k, v[0], v[1]) for k, v in items]
+
+
+class CountMinSketch(object):
+  """任意のキーの出現回数を一定のメモリで見積もるクラスです(Count-Min Sketch)。
+
+  見積もりは真の回数以上になり、誤差はおよそ 総数 * 2 / width 以下です。
+
+  位置はhash()ではなくblake2bで決めます。hash()はstrの値がプロセスごとに変わるので、
+  別のプロセス(バッチのワーカーやデーモン)で作ったスケッチを足し合わせたり、同じ結果を再現したりできません。
+
+  >>> cms = CountMinSketch(width=64, depth=4)
+  >>> for k in ["a"] * 5 + ["b"] * 2:
+  ...   cms.add(k)
+  >>> cms.estimate("a") >= 5
+  True
+  >>> cms.indexes(("LINK-SW1", "UPDOWN", "TenGigabitEthernet1/3/11"))
+  [50, 17, 48, 15]
+  >>> other = CountMinSketch(width=64, depth=4)
+  >>> other.add("a", 3)
+  >>> cms.merge(other)
+  >>> cms.estimate("a") >= 8
+  True
+  """
+
+  def __init__(self, width=2048, depth=4):
+    self.width = width
+    self.depth = depth
+    self.tables = [[0] * width for _ in range(depth)]
+
+
+  def indexes(self, key):
+    """keyを数える各行の位置のリストを返却します。どのプロセスでも同じ位置になります
+
+    blake2bのダイジェストを2つの64ビット整数h1、h2に分け、i行目の位置を(h1 + i * h2) % widthとします。
+    行ごとにハッシュを計算し直さなくても、行どうしで独立に近い位置になります。
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    width = self.width
+    return [(h1 + i * h2) % width for i in range(self.depth)]
+
+
+  def add(self, key, count=1):
+    """keyの回数をcountだけ増やします"""
+    for table, j in zip(self.tables, self.indexes(key)):
+      table[j] += count
+
+
+  def estimate(self, key):
+    """keyの回数の見積もりを返却します"""
+    return min(table[j] for table, j in zip(self.tables, self.indexes(key)))
+
+
+  def merge(self, other):
+    """同じwidthとdepthで作ったスケッチの回数を足し合わせます。別のプロセスで作ったものでも構いません"""
+    if (other.width, other.depth) != (self.width, self.depth):
+      raise ValueError("cannot merge sketches of different sizes")
+    for table, other_table in zip(self.tables, other.tables):
+      for j, count in enumerate(other_table):
+        if count:
+          table[j] += count
+
+
+class LogEventAggregator(object):
+  """パースしたログを(facility, mnemonic, interface)ごとに1分単位で数えるクラスです。
+
+  ログの辞書型を1件ずつ受け取って数えるだけなので、全件をリストに溜める必要はありません。
+  キーの種類がいくら多くてもメモリが一定になるように、次のように数えます。
+
+    全期間の上位         SpaceSavingCounterで上位capacity個
+    任意のキーの見積もり  CountMinSketch
+    1分ごとの上位        直近window分だけ、分ごとのSpaceSavingCounterを保持
+
+  >>> lines = []
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("Sep  5 22:56:49.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to up")
+  >>> lines.append("Sep  5 22:57:15.455: %SPANTREE-SW1-6-PORT_STATE: Port Po111 instance 104 moving from forwarding to disabled")
+  >>> agg = LogEventAggregator(timestamp_parser=CiscoIosLogTimestampParser(year=2016))
+  >>> agg.add_all(CiscoIosShowLoggingParser().parse(lines))
+  3
+  >>> agg.top(1)
+  [(('LINK-SW1', 'UPDOWN', 'TenGigabitEthernet1/3/11'), 2, 0)]
+  >>> len(agg.minutes())
+  2
+  """
+
+  # メッセージからインタフェース名を取り出す正規表現
+  rex_interface = LazyPattern(
+    r"\b((?:[A-Z][A-Za-z]*Ethernet|Port-channel|Vlan|Loopback|Tunnel|Serial|Po|Gi|Te|Fa|Tw|Fo|Hu)"
+    r"\d+(?:/\d+)*(?:\.\d+)?)\b")
+
+  def __init__(self, capacity=1000, window=60, timestamp_parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      capacity {int} -- 上位として保持するキーの数 (default: {1000})
+      window {int} -- 1分ごとの集計を保持する分数 (default: {60})
+      timestamp_parser {CiscoIosLogTimestampParser} -- 日付の変換に使うオブジェクト (default: {None})
+    """
+    self.capacity = capacity
+    self.window = window
+    self.timestamp_parser = timestamp_parser if timestamp_parser else CiscoIosLogTimestampParser()
+    self.total = SpaceSavingCounter(capacity)
+    self.sketch = CountMinSketch()
+    # 分(エポックミリ秒 // 60000)をキーに、SpaceSavingCounterを値にした辞書型
+    self.buckets = {}
+    # 一番新しい分
+    self.latest = None
+    self.count = 0
+
+
+  def make_key(self, d):
+    """ログの辞書型から(facility, mnemonic, interface)のキーを作ります"""
+    match = self.rex_interface.search(d.get("description", ""))
+    interface = match.group(1) if match else ""
+    return (d.get("facility", ""), d.get("mnemonic", ""), interface)
+
+
+  def add(self, d):
+    """ログの辞書型を1件数えます"""
+    key = self.make_key(d)
+    self.count += 1
+    self.total.add(key)
+    self.sketch.add(key)
+
+    epoch = self.timestamp_parser.to_epoch(d.get("date", ""))
+    if epoch is None:
+      return
+    minute = epoch // 60000
+
+    counter = self.buckets.get(minute)
+    if counter is None:
+      if self.latest is not None and minute <= self.latest - self.window:
+        # 保持している範囲より古いので分ごとの集計には入れない
+        return
+      counter = self.buckets[minute] = SpaceSavingCounter(self.capacity)
+      if self.latest is None or minute > self.latest:
+        self.latest = minute
+        # 古いバケツを捨てる
+        for old_minute in [m for m in self.buckets if m <= minute - self.window]:
+          del self.buckets[old_minute]
+    counter.add(key)
+
+
+  def add_all(self, dicts):
+    """ログの辞書型をまとめて数え、数えた件数を返します"""
+    count = 0
+    for d in dicts:
+      self.add(d)
+      count += 1
+    return count
+
+
+  def top(self, n=10):
+    """全期間で回数の多い(キー, 回数, 誤差)をn個返却します"""
+    return self.total.top(n)
+
+
+  def estimate(self, facility, mnemonic, interface=""):
+    """任意のキーの回数の見積もりを返却します"""
+    return self.sketch.estimate((facility, mnemonic, interface))
+
+
+  def minutes(self, n=10):
+    """保持している各分について、(分の先頭のエポックミリ秒, 上位n個)の配列を返却します"""
+    return [(minute * 60000, self.buckets[minute].top(n)) for minute in sorted(self.buckets)]
+
+
+def collapse_bursts(dicts, gap=1000, key_func=None, timestamp_parser=None):
+  """同じキーのログが立て続けに出ている場合、1件にまとめてyieldします。
+
+  キーごとにまとめている途中のバーストを1つずつ持ち、同じキーのログが前のログからgapミリ秒以内に出ていれば同じバーストに加えます。
+  LINK-3-UPDOWNとLINEPROTO-5-UPDOWNのように、別のキーのログが交互に出ていてもキーごとにまとめます。
+  gapミリ秒を過ぎても次のログが出なかったバーストは閉じてyieldしますので、持っておくのはgapの間に出たキーの分だけです。
+  yieldするのはバーストが閉じた順です。
+
+  yieldする辞書型は最初のログにcount, first_date, last_dateを追加したものです。
+  時刻の読めないログはまとめずにそのままyieldします。
+
+  Arguments:
+    dicts {iterable} -- ログの辞書型
+
+  Keyword Arguments:
+    gap {int} -- 同じバーストとみなす間隔(ミリ秒) (default: {1000})
+    key_func {function} -- ログの辞書型からキーを作る関数。省略時は(facility, mnemonic, interface) (default: {None})
+    timestamp_parser {CiscoIosLogTimestampParser} -- 時刻の変換に使うオブジェクト (default: {None})
+
+  >>> lines = []
+  >>> lines.append("Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("Sep  5 22:56:48.498: %LINEPROTO-SW1-5-UPDOWN: Line protocol on Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> lines.append("Sep  5 22:56:48.997: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to up")
+  >>> lines.append("Sep  5 22:56:48.998: %LINEPROTO-SW1-5-UPDOWN: Line protocol on Interface TenGigabitEthernet1/3/11, changed state to up")
+  >>> lines.append("Sep  5 22:57:15.455: %LINK-SW1-3-UPDOWN: Interface TenGigabitEthernet1/3/11, changed state to down")
+  >>> [(d["facility"], d["count"], d["last_date"]) for d in collapse_bursts(CiscoIosShowLoggingParser().parse(lines))]
+  [('LINK-SW1', 2, 'Sep  5 22:56:48.997'), ('LINEPROTO-SW1', 2, 'Sep  5 22:56:48.998'), ('LINK-SW1', 1, 'Sep  5 22:57:15.455')]
+  """
+  aggregator = LogEventAggregator(timestamp_parser=timestamp_parser)
+  to_epoch = aggregator.timestamp_parser.to_epoch
+  if key_func is None:
+    key_func = aggregator.make_key
+
+  # キーをまとめている途中の[バースト, 最後のログのエポックミリ秒]にした辞書型。最後にログが出た順に並べる
+  bursts = OrderedDict()
+  for d in dicts:
+    epoch = to_epoch(d.get("date", ""))
+    if epoch is None:
+      burst = OrderedDict(d)
+      burst["count"] = 1
+      burst["first_date"] = burst["last_date"] = d.get("date", "")
+      yield burst
+      continue
+
+    # gapを過ぎたバーストを閉じる。先頭ほど古いので、新しいものが出たところで止める
+    while bursts:
+      key, (burst, last_epoch) = next(iter(bursts.items()))
+      if epoch - last_epoch <= gap:
+        break
+      del bursts[key]
+      yield burst
+
+    key = key_func(d)
+    entry = bursts.pop(key, None)
+    if entry is None:
+      burst = OrderedDict(d)
+      burst["count"] = 1
+      burst["first_date"] = d.get("date", "")
+    else:
+      burst = entry[0]
+      burst["count"] += 1
+    burst["last_date"] = d.get("date", "")
+    bursts[key] = [burst, epoch]
+
+  for burst, _last_epoch in bursts.values():
+    yield burst
+
+
 #
 # ここからスクリプト
 #
@@ -145,11 +800,14 @@ if __name__ == '__main__':
 
   import argparse
   import configparser  # python3 only
-  import csv  # 結果をCSVで保存
   import logging
   import os
   import sys
 
+  from cisco_ios_input import get_lines
+  from cisco_ios_sink import SINKS, RecordSink, SinkError, guess_format, open_sink
+  from cisco_ios_stream import RecordCounter, tap
+
   #
   # 共通スクリプト
   #
@@ -264,32 +922,6 @@ if __name__ == '__main__':
   # 固有スクリプト
   #
 
-  def get_lines(filename):
-    """filenameのファイルを読み込んで各行をリストに格納して返却します。
-
-    Arguments:
-      filename {string} -- ファイル名
-
-    Returns:
-      [list] -- 行配列。右端の改行コードと空白文字列は削除済み。
-    """
-
-    # ファイル名が-だった場合は標準入力から読み込む
-    if not filename or filename == "-":
-      # return sys.stdin.readlines()
-      return [x.rstrip() for x in sys.stdin.readlines() ]
-
-    # ファイルを読み込む
-    try:
-      with open(filename, mode="r", encoding="utf-8") as f:
-        logger.info("open file %s", filename)
-        # return f.readlines()
-        return [x.rstrip() for x in f.readlines()]
-    except IOError:
-      logger.warn("failed to open %s", filename)
-      return None
-
-
   def dump(dicts, right_just=20):
     """OrderedDictの配列を受け取って、内容を表示します。
 
@@ -305,31 +937,113 @@ if __name__ == '__main__':
       for d in dicts:
         for k,v in d.items():
           # キーとバリューのペアを表示
-          print(k.rjust(RIGHT_JUST) + " : " + v)
+          print(k.rjust(RIGHT_JUST) + " : " + str(v))
         print("")
     except (BrokenPipeError, IOError):
       sys.stderr.close()
 
 
-  def save(dicts, fieldnames, output_filename):
-    """OrderedDictの配列を受け取って、CSV形式で保存します。
+  def save(dicts, fieldnames, output_filename, output_format=None, batch_size=None):
+    """OrderedDictのイテレータを受け取って、指定の形式で保存します。
+
+    書き出しは別スレッドで行いますので、パーサーのジェネレータをそのまま渡せばリストに溜めずに保存できます。
 
     Arguments:
-      dicts {list} -- OrderedDictの配列
-      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
+      dicts {iterable} -- OrderedDictの配列、またはジェネレータ
+      fieldnames {list} -- 保存対象とする辞書型のキーの一覧
       output_filename {str} -- 保存するファイル名
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+      batch_size {int} -- まとめて書き出す件数 (default: {None})
+
+    Returns:
+      int -- 保存した件数
     """
     try:
-      with open(output_filename, mode='w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(dicts)
-        logger.info("saved to %s", output_filename)
+      with open_sink(output_filename, output_format, fieldnames, batch_size=batch_size) as sink:
+        count = sink.consume(dicts)
+      logger.info("saved %s records to %s", count, output_filename)
+      return count
     except IOError:
       logger.warn("failed to open %s", output_filename)
-    except csv.Error as e:
-      logger.warn("csv error")
+    except SinkError as e:
+      logger.warn("%s error", output_format or guess_format(output_filename))
       logger.exception(e)
+    return 0
+
+
+  def print_top(aggregator, n=10):
+    """LogEventAggregatorの集計結果を表示します。
+
+    Arguments:
+      aggregator {LogEventAggregator} -- 集計済みのオブジェクト
+
+    Keyword Arguments:
+      n {int} -- 表示する件数 (default: {10})
+    """
+    try:
+      print("")
+      print("全期間の上位{0}件 (総数 {1})".format(n, aggregator.count))
+      for (facility, mnemonic, interface), count, error in aggregator.top(n):
+        print("{0:>10} (+-{1}) : {2} {3} {4}".format(count, error, facility, mnemonic, interface))
+
+      print("")
+      print("1分ごとの上位3件")
+      for epoch, top in aggregator.minutes(3):
+        minute = time.strftime("%Y-%m-%d %H:%M", time.gmtime(epoch // 1000))
+        for (facility, mnemonic, interface), count, _error in top:
+          print("{0} {1:>10} : {2} {3} {4}".format(minute, count, facility, mnemonic, interface))
+    except (BrokenPipeError, IOError):
+      sys.stderr.close()
+
+
+  def follow(input_filename, output_filename, output_format=None, state_filename=None, interval=1.0):
+    """input_filenameに追記されたログをパースし続け、指定の形式のファイルに追記します。
+
+    1件パースするたびにファイルに反映します。columnarは追記できないので使えません。
+    Ctrl-Cで終了します。
+
+    Arguments:
+      input_filename {str} -- 追記され続けるログファイル
+      output_filename {str} -- 追記先のファイル
+
+    Keyword Arguments:
+      output_format {str} -- csv、jsonl、sqlite。省略時は拡張子から判断する (default: {None})
+      state_filename {str} -- 読み終えた位置を保存するファイル。省略時はlogフォルダに保存 (default: {None})
+      interval {float} -- 確認する間隔(秒) (default: {1.0})
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+    if input_filename == "-":
+      logger.error("follow mode needs a file.")
+      return 1
+
+    output_format = output_format or guess_format(output_filename)
+    if not SINKS[output_format].appendable:
+      logger.error("follow mode cannot append to %s format.", output_format)
+      return 1
+
+    if not state_filename:
+      state_filename = os.path.join(log_dir, app_name + ".offsets.json")
+
+    logging_parser = CiscoIosShowLoggingParser()
+    follower = LogFileFollower(state_filename, logging_parser)
+    logger.info("follow %s (offsets are saved to %s)", input_filename, state_filename)
+
+    try:
+      # 1件ずつ書き出し用のスレッドに渡し、既存のファイルには追記する
+      with open_sink(output_filename, output_format, logging_parser.fieldnames, batch_size=1, append=True) as sink:
+        for d in follower.follow([input_filename], interval=interval):
+          sink.write(d)
+          dump([d])
+    except KeyboardInterrupt:
+      pass
+    except IOError:
+      logger.warn("failed to open %s", output_filename)
+      return 1
+    return 0
 
 
   def main():
@@ -342,6 +1056,19 @@ if __name__ == '__main__':
     # 引数処理
     parser = argparse.ArgumentParser(description='main script.')
     parser.add_argument('-o', '--output', dest='output_filename', metavar='output_file', help='Output filename')
+    parser.add_argument('--format', dest='output_format', choices=list(SINKS), help='Output format (default: from the output file extension, otherwise csv)')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, help='Records written at a time (default: %d)' % RecordSink.batch_size)
+    parser.add_argument('--stream', action='store_true', help='Display and save records as they are parsed instead of collecting them first')
+    parser.add_argument('--progress', dest='progress', type=int, default=0, metavar='N', help='Show a running record count every N records')
+    parser.add_argument('--since', dest='since', metavar='date', help='Keep logs at or after this date, e.g. "Sep  5 22:50:00"')
+    parser.add_argument('--until', dest='until', metavar='date', help='Keep logs before this date, e.g. "Sep  5 23:10:00"')
+    parser.add_argument('--year', dest='year', type=int, help='Year of logs without year (default: this year)')
+    parser.add_argument('--collapse', dest='collapse', type=int, metavar='ms', help='Merge logs with the same facility, mnemonic and interface that repeat within ms milliseconds')
+    parser.add_argument('--top', dest='top', type=int, metavar='N', help='Print the top N (facility, mnemonic, interface) instead of saving records')
+    parser.add_argument('--bytes', action='store_true', help='Decode only the matched fields of ASCII lines; faster when most lines are not logs')
+    parser.add_argument('-f', '--follow', action='store_true', help='Keep reading lines appended to the input file')
+    parser.add_argument('--state', dest='state_filename', metavar='state_file', help='File to persist read offsets in follow mode')
+    parser.add_argument('--interval', dest='interval', type=float, default=1.0, help='Polling interval in seconds in follow mode')
     parser.add_argument('input_filename', help='Filename to be parsed')  # , default='-'
     args = parser.parse_args()
 
@@ -357,22 +1084,82 @@ if __name__ == '__main__':
       (name, _ext) = os.path.splitext(input_filename)
       # ファイル名だけを取り出して拡張子を差し替える
       # (name, _ext) = os.path.splitext(os.path.basename(input_filename))
-      output_filename = name + ".csv"
+      output_filename = name + SINKS[args.output_format or "csv"].extension
+
+    if args.follow:
+      return follow(input_filename, output_filename, args.output_format, args.state_filename, args.interval)
 
-    # 入力ファイルの各行を配列にする
-    lines = get_lines(input_filename)
-    if not lines:
+    # 入力ファイルの行を順に取り出すイテレータを得る。ここではまだ読み込まない
+    # --bytesなら、ASCIIだけの行はbytesのまま取り出し、parse_bytes()でログの行だけをデコードする
+    # ほとんどの行がログの場合は、strで読むparse()の方が速い
+    lines = get_lines(input_filename, logger, binary=args.bytes)
+    if lines is None or lines.is_empty():
       logger.error("input data not found.")
       return 1
 
     # パーサーをインスタンス化する
     logging_parser = CiscoIosShowLoggingParser()
+    parse = logging_parser.parse_bytes if args.bytes else logging_parser.parse
+
+    # 集計だけなら結果を溜めずに数える
+    if args.top:
+      aggregator = LogEventAggregator(timestamp_parser=CiscoIosLogTimestampParser(year=args.year))
+      aggregator.add_all(parse(lines))
+      print_top(aggregator, args.top)
+      return 0
+
+    # まとめる場合は回数と最初と最後の時刻も保存する
+    fieldnames = logging_parser.fieldnames
+    if args.collapse:
+      fieldnames = fieldnames + ["count", "first_date", "last_date"]
+
+    # パースした件数を数えながら流す
+    counter = RecordCounter(args.progress, label="logs")
+    records = counter(parse(lines))
+
+    if args.stream:
+      # 行の読み込み、パース、絞り込んだものの表示、保存を1件ずつ行い、結果をリストに溜めない
+      # 時間範囲は並べ替えずに、各ログの時刻で判定する。出力はログに出てきた順のまま
+      if args.since or args.until:
+        to_epoch = CiscoIosLogTimestampParser(year=args.year).to_epoch
+        start = to_epoch(args.since) if args.since else None
+        end = to_epoch(args.until) if args.until else None
+
+        def in_range(d):
+          epoch = to_epoch(d.get("date", ""))
+          return epoch is not None and (start is None or epoch >= start) and (end is None or epoch < end)
+
+        records = (d for d in records if in_range(d))
+
+      # 繰り返し出ているログを1件にまとめる
+      if args.collapse:
+        records = collapse_bursts(records, args.collapse, timestamp_parser=CiscoIosLogTimestampParser(year=args.year))
+
+      print("severityが3のものを抽出して表示します")
+      f = logging_parser.filter_dict(key="severity", value_query="3")
+      records = tap(records, f, lambda d: dump([d]))
+      count = save(records, fieldnames, output_filename, args.output_format, args.batch_size)
+      if not count:
+        logger.info("nothing detected")
+        return 1
+      logger.info("Number of logs parsed = " + str(counter.count))
+      return 0
 
     # パーサーに全行を分析させて辞書型を得る
     results = []
-    for d in logging_parser.parse(lines):
+    for d in records:
       results.append(d)
 
+    # 時間範囲の指定があれば、時刻順に並べてその範囲だけを残す
+    if args.since or args.until:
+      index = LogTimeIndex(CiscoIosLogTimestampParser(year=args.year))
+      index.extend(results)
+      results = index.between(args.since, args.until)
+
+    # 繰り返し出ているログを1件にまとめる
+    if args.collapse:
+      results = list(collapse_bursts(results, args.collapse, timestamp_parser=CiscoIosLogTimestampParser(year=args.year)))
+
     # 結果表示
     # dump(results, exclude_admindown=False, exclude_zero=False)
 
@@ -383,8 +1170,7 @@ if __name__ == '__main__':
       return 1
 
     # 結果をCSV形式でフィアルに書き込む
-    fieldnames = logging_parser.fieldnames
-    save(results, fieldnames, output_filename)
+    save(results, fieldnames, output_filename, args.output_format, args.batch_size)
 
     #
     # フィルタ機能のテスト
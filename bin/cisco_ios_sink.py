@@ -0,0 +1,479 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーがyieldする辞書型を、リストに溜めずにそのままファイルに書き出すモジュールです。
+
+書き出しは別スレッドで行います。
+write()はbatch_size件ずつまとめてキューに入れるだけで、変換と書き込みは書き出し用のスレッドが行います。
+キューの長さはqueue_sizeで制限しますので、書き出しが遅くても溜まるのは最大で(queue_size + 1) * batch_size件です。
+ファイルへの書き込みとSQLiteの処理はGILを解放するため、その間にパースが進みます。
+
+  csv       CSV。これまでのsave()と同じ形式
+  jsonl     JSON Lines。1行に1レコード
+  sqlite    SQLiteの1つのテーブル。batch_size件ずつ1トランザクションで挿入し、インデックスは最後に作る
+  columnar  列ごとに辞書圧縮してzlibで圧縮したバイナリ。read_columnar()で読み戻す
+
+columnarの形式は次の通りです。数値はリトルエンディアンです。
+
+  ヘッダ      MAGIC、キーの一覧のJSONのバイト数(uint32)、キーの一覧のJSON
+  行グループ  行数(uint32)、圧縮後のバイト数(uint32)、zlibで圧縮した列の並び
+  列          コードの型(1文字)、値の一覧のJSONのバイト数(uint32)、値の一覧のJSON、行ごとの値の番号の配列
+
+Examples:
+  $ python -m doctest bin/cisco_ios_sink.py
+
+  >>> import os, tempfile
+  >>> records = [OrderedDict([("Port", "Te1/1/%d" % i), ("Status", "connected")]) for i in range(5)]
+  >>> filename = os.path.join(tempfile.mkdtemp(), "status.col")
+  >>> with open_sink(filename, batch_size=2) as sink:
+  ...   sink.consume(iter(records))
+  5
+  >>> list(read_columnar(filename)) == records
+  True
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import csv
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+# columnarのファイルの先頭
+MAGIC = b"CIOSCOL1"
+
+#
+# クラス定義
+#
+
+class SinkError(Exception):
+  """書き出し用のスレッドで起きた例外です。元の例外は__cause__にあります。
+
+  ファイルを開けなかったときのIOErrorは、この例外にせずにそのまま送出します。
+  呼び出し側はcsvやsqlite3をインポートしなくても、この例外だけで書き出しの失敗を扱えます。
+
+  >>> import os, tempfile
+  >>> sink = open_sink(os.path.join(tempfile.mkdtemp(), "no_such_dir", "status.db"), fieldnames=["Port"])
+  >>> sink.close()
+  Traceback (most recent call last):
+    ...
+  cisco_ios_sink.SinkError: OperationalError: unable to open database file
+  """
+
+
+class RecordSink(object):
+  """辞書型を受け取り、別スレッドでまとめて書き出すクラスの基底クラスです。
+
+  派生クラスはopen()、write_batch()、finish()を実装します。これらは書き出し用のスレッドで呼ばれます。
+  書き出し用のスレッドで起きた例外は、次のwrite()かclose()でSinkErrorとして呼び出し側に送出します。
+
+  Attributes:
+    count (int): これまでに受け取ったレコード数
+  """
+
+  # ファイル名の拡張子
+  extension = ""
+
+  # まとめて書き出す件数
+  batch_size = 1000
+
+  # キューに溜めるまとまりの数
+  queue_size = 4
+
+  # 既存のファイルに追記できるか
+  appendable = True
+
+  def __init__(self, filename, fieldnames=None, batch_size=None, queue_size=None, append=False):
+    """コンストラクタ
+
+    Arguments:
+      filename {str} -- 書き出すファイル名
+
+    Keyword Arguments:
+      fieldnames {list} -- 書き出すキーの一覧。省略時は最初のレコードのキー (default: {None})
+      batch_size {int} -- まとめて書き出す件数。省略時はクラス変数のbatch_size (default: {None})
+      queue_size {int} -- キューに溜めるまとまりの数。省略時はクラス変数のqueue_size (default: {None})
+      append {bool} -- 既存のファイルに追記し、まとまりを書くたびにファイルに反映する場合はTrue (default: {False})
+    """
+    if append and not self.appendable:
+      raise ValueError("%s cannot append to an existing file" % type(self).__name__)
+    self.filename = filename
+    self.append = append
+    self.fieldnames = list(fieldnames) if fieldnames else None
+    if batch_size:
+      self.batch_size = batch_size
+    if queue_size:
+      self.queue_size = queue_size
+    self.count = 0
+    self.batch = []
+    self.error = None
+    self.closed = False
+    self.queue = queue.Queue(self.queue_size)
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    self.thread.start()
+
+
+  def __enter__(self):
+    return self
+
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if exc_type is None:
+      self.close()
+      return
+    # 本体の例外を優先し、書き出しの例外では上書きしない
+    try:
+      self.close()
+    except Exception:  # pylint: disable=broad-except
+      pass
+
+
+  def write(self, record):
+    """レコードを1件受け取ります"""
+    if self.fieldnames is None:
+      self.fieldnames = list(record)
+    self.batch.append(record)
+    self.count += 1
+    if len(self.batch) >= self.batch_size:
+      self.flush()
+
+
+  def extend(self, records):
+    """レコードの配列をまとめて受け取ります。1件ずつwrite()するより速く、まとまりはbatch_sizeを超えることがあります"""
+    if not records:
+      return
+    if self.fieldnames is None:
+      self.fieldnames = list(records[0])
+    self.batch.extend(records)
+    self.count += len(records)
+    if len(self.batch) >= self.batch_size:
+      self.flush()
+
+
+  def consume(self, records):
+    """recordsをすべて受け取り、これまでに受け取ったレコード数を返却します"""
+    write = self.write
+    for record in records:
+      write(record)
+    return self.count
+
+
+  def flush(self):
+    """溜めているレコードを書き出し用のスレッドに渡します"""
+    if self.error is not None:
+      self.raise_error()
+    if self.batch:
+      self.queue.put(self.batch)
+      self.batch = []
+
+
+  def close(self):
+    """残りのレコードを書き出してファイルを閉じ、受け取ったレコード数を返却します"""
+    if not self.closed:
+      self.closed = True
+      self.flush()
+      self.queue.put(None)
+      self.thread.join()
+    if self.error is not None:
+      self.raise_error()
+    return self.count
+
+
+  def raise_error(self):
+    """書き出し用のスレッドで起きた例外を送出します。IOErrorはそのまま、それ以外はSinkErrorにします"""
+    if isinstance(self.error, IOError):
+      raise self.error
+    raise SinkError("%s: %s" % (type(self.error).__name__, self.error)) from self.error
+
+
+  def run(self):
+    """スレッドの本体。キューからまとまりを取り出して書き出し、Noneを受け取ったら閉じます。"""
+    done = False
+    try:
+      opened = False
+      while True:
+        batch = self.queue.get()
+        if batch is None:
+          done = True
+          break
+        if not opened:
+          # fieldnamesは最初のまとまりを受け取ったときには決まっている
+          self.open()
+          opened = True
+        self.write_batch(batch)
+      if not opened:
+        self.open()
+      self.finish()
+    except Exception as e:  # pylint: disable=broad-except
+      self.error = e
+      # 書き出せなくなっても、write()が待たされ続けないように残りを読み捨てる
+      while not done:
+        done = self.queue.get() is None
+
+
+  def rows(self, batch):
+    """レコードのまとまりをfieldnamesの順の値のタプルにします。ないキーは空文字列にします"""
+    fieldnames = self.fieldnames or []
+    return [tuple(d.get(k, "") for k in fieldnames) for d in batch]
+
+
+  def open(self):
+    raise NotImplementedError
+
+
+  def write_batch(self, batch):
+    raise NotImplementedError
+
+
+  def finish(self):
+    raise NotImplementedError
+
+
+class CsvSink(RecordSink):
+  """CSVで書き出します。fieldnamesにないキーは書き出しません"""
+
+  extension = ".csv"
+
+  def open(self):
+    # 追記するときは、空のファイルにだけヘッダを書く
+    exists = self.append and os.path.exists(self.filename) and os.path.getsize(self.filename) > 0
+    self.f = open(self.filename, mode="a" if self.append else "w", newline="")
+    self.writer = csv.DictWriter(self.f, self.fieldnames or [], extrasaction="ignore")
+    if not exists:
+      self.writer.writeheader()
+
+
+  def write_batch(self, batch):
+    self.writer.writerows(batch)
+    if self.append:
+      self.f.flush()
+
+
+  def finish(self):
+    self.f.close()
+
+
+class JsonLinesSink(RecordSink):
+  """JSON Linesで書き出します。レコードのキーはすべて書き出します
+
+  >>> import os, tempfile
+  >>> filename = os.path.join(tempfile.mkdtemp(), "log.jsonl")
+  >>> with JsonLinesSink(filename) as sink:
+  ...   sink.consume([{"a": "1"}, {"a": "2", "b": "3"}])
+  2
+  >>> open(filename).read().splitlines()[1]
+  '{"a": "2", "b": "3"}'
+  >>> with JsonLinesSink(filename, append=True) as sink:
+  ...   sink.consume([{"a": "4"}])
+  1
+  >>> len(open(filename).read().splitlines())
+  3
+  """
+
+  extension = ".jsonl"
+
+  def open(self):
+    self.f = open(self.filename, mode="a" if self.append else "w", encoding="utf-8")
+
+
+  def write_batch(self, batch):
+    dumps = json.dumps
+    self.f.write("".join([dumps(d, ensure_ascii=False) + "\n" for d in batch]))
+    if self.append:
+      self.f.flush()
+
+
+  def finish(self):
+    self.f.close()
+
+
+class SqliteSink(RecordSink):
+  """SQLiteの1つのテーブルに挿入します。
+
+  挿入中は同期と書き込みログを止めて速度を優先します。インデックスはすべて挿入し終えてから作ります。
+  テーブルが既にあれば追記します。appendの指定によらず、まとまりごとにコミットします。
+
+  >>> import os, sqlite3, tempfile
+  >>> filename = os.path.join(tempfile.mkdtemp(), "status.db")
+  >>> with SqliteSink(filename, table="status", indexes=["Status"], batch_size=2) as sink:
+  ...   sink.consume([{"Port": "Te1/1/1", "Status": "connected"}, {"Port": "Te1/1/2", "Status": "notconnect"}])
+  2
+  >>> sqlite3.connect(filename).execute('SELECT Port FROM status WHERE Status = "connected"').fetchall()
+  [('Te1/1/1',)]
+  """
+
+  extension = ".db"
+
+  def __init__(self, filename, fieldnames=None, batch_size=None, queue_size=None, append=False, table="records", indexes=()):
+    """コンストラクタ
+
+    Keyword Arguments:
+      table {str} -- テーブル名 (default: {"records"})
+      indexes {list} -- インデックスを作るキーの一覧 (default: {()})
+    """
+    self.table = table
+    self.indexes = list(indexes)
+    super(SqliteSink, self).__init__(filename, fieldnames, batch_size, queue_size, append)
+
+
+  @staticmethod
+  def quote(name):
+    """テーブル名やカラム名をSQLの識別子にします"""
+    return '"%s"' % name.replace('"', '""')
+
+
+  def open(self):
+    # sqlite3はSQLiteに保存するときまで読み込まない
+    import sqlite3
+
+    # 接続は作ったスレッドでしか使えないので、書き出し用のスレッドで作る
+    self.conn = sqlite3.connect(self.filename)
+    self.conn.execute("PRAGMA synchronous = OFF")
+    self.conn.execute("PRAGMA journal_mode = OFF")
+    if not self.fieldnames:
+      # 1件もなければテーブルは作らない
+      self.indexes = []
+      return
+    columns = ", ".join(self.quote(k) for k in self.fieldnames or [])
+    self.conn.execute("CREATE TABLE IF NOT EXISTS %s (%s)" % (self.quote(self.table), columns))
+    self.sql = "INSERT INTO %s VALUES (%s)" % (self.quote(self.table), ", ".join("?" * len(self.fieldnames or [])))
+
+
+  def write_batch(self, batch):
+    with self.conn:
+      self.conn.executemany(self.sql, self.rows(batch))
+
+
+  def finish(self):
+    try:
+      for key in self.indexes:
+        name = "idx_%s_%s" % (self.table, key)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s)" % (self.quote(name), self.quote(self.table), self.quote(key)))
+      self.conn.commit()
+    finally:
+      self.conn.close()
+
+
+class ColumnarSink(RecordSink):
+  """batch_size件を1つの行グループにして、列ごとに辞書圧縮したバイナリで書き出します。
+
+  showコマンドの結果は同じ値(Status、Vlan、facilityなど)が繰り返されるので、列ごとに値の一覧と番号に分けると小さくなります。
+  値はJSONにできるものに限ります。ヘッダにキーの一覧を持つため、追記はできません。
+  """
+
+  extension = ".col"
+
+  appendable = False
+
+  def open(self):
+    self.f = open(self.filename, mode="wb")
+    header = json.dumps(self.fieldnames or []).encode("utf-8")
+    self.f.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+
+  def write_batch(self, batch):
+    parts = []
+    for column in zip(*self.rows(batch)):
+      values = {}
+      codes = [values.setdefault(v, len(values)) for v in column]
+      typecode = "B" if len(values) <= 0x100 else "H" if len(values) <= 0x10000 else "I"
+      codes = array(typecode, codes)
+      if sys.byteorder == "big":
+        codes.byteswap()
+      dictionary = json.dumps(list(values), ensure_ascii=False).encode("utf-8")
+      parts.append(typecode.encode() + struct.pack("<I", len(dictionary)) + dictionary + codes.tobytes())
+    data = zlib.compress(b"".join(parts), 1)
+    self.f.write(struct.pack("<II", len(batch), len(data)) + data)
+
+
+  def finish(self):
+    self.f.close()
+
+#
+# 関数定義
+#
+
+# 形式の名前と書き出すクラスの対応
+SINKS = OrderedDict([
+  ("csv", CsvSink),
+  ("jsonl", JsonLinesSink),
+  ("sqlite", SqliteSink),
+  ("columnar", ColumnarSink),
+])
+
+
+def guess_format(filename, default="csv"):
+  """ファイル名の拡張子から形式の名前を返却します
+
+  >>> guess_format("a.jsonl"), guess_format("a.sqlite"), guess_format("a.txt")
+  ('jsonl', 'sqlite', 'csv')
+  """
+  ext = os.path.splitext(filename)[1].lower()
+  for name, sink_class in SINKS.items():
+    if ext == sink_class.extension:
+      return name
+  if ext in (".sqlite", ".sqlite3"):
+    return "sqlite"
+  return default
+
+
+def open_sink(filename, format=None, fieldnames=None, **kwargs):  # pylint: disable=redefined-builtin
+  """形式に合ったRecordSinkを作って返却します
+
+  Arguments:
+    filename {str} -- 書き出すファイル名
+
+  Keyword Arguments:
+    format {str} -- csv、jsonl、sqlite、columnar。省略時は拡張子から判断する (default: {None})
+    fieldnames {list} -- 書き出すキーの一覧 (default: {None})
+    kwargs -- batch_sizeなど、RecordSinkのコンストラクタに渡す引数
+
+  Returns:
+    RecordSink -- 書き出すオブジェクト
+  """
+  format = format or guess_format(filename)
+  if format not in SINKS:
+    raise ValueError("unknown format: %s" % format)
+  return SINKS[format](filename, fieldnames, **kwargs)
+
+
+def read_columnar(filename):
+  """ColumnarSinkで書き出したファイルを読み、辞書型をyieldします"""
+  with open(filename, mode="rb") as f:
+    if f.read(len(MAGIC)) != MAGIC:
+      raise ValueError("not a columnar file: %s" % filename)
+    size, = struct.unpack("<I", f.read(4))
+    fieldnames = json.loads(f.read(size).decode("utf-8"))
+    while True:
+      head = f.read(8)
+      if len(head) < 8:
+        return
+      nrows, size = struct.unpack("<II", head)
+      data = zlib.decompress(f.read(size))
+      columns = []
+      pos = 0
+      for _ in fieldnames:
+        typecode = chr(data[pos])
+        size, = struct.unpack_from("<I", data, pos + 1)
+        pos += 5
+        values = json.loads(data[pos:pos + size].decode("utf-8"))
+        pos += size
+        codes = array(typecode)
+        end = pos + codes.itemsize * nrows
+        codes.frombytes(data[pos:end])
+        if sys.byteorder == "big":
+          codes.byteswap()
+        pos = end
+        columns.append([values[i] for i in codes])
+      for row in zip(*columns):
+        yield OrderedDict(zip(fieldnames, row))
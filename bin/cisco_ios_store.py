@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パースした結果を、装置をまたいで問い合わせられるようにSQLiteに格納します。
+
+装置(devices)と取り込んだ単位(snapshots)を軸に、コマンドごとのテーブルに正規化して格納します。
+
+  devices           装置。ホスト名はプロンプトから取る
+  snapshots         1台の装置の1つのコマンドを取り込んだ記録
+  routes            show ip route。プレフィックスの範囲(net_start、net_end)を整数で持つ
+  interfaces        show interfaces。カウンタは整数
+  interface_status  show interfaces status
+  cdp_neighbors     show cdp neighbors
+  logs              show logging。日時(ts)をエポックからのミリ秒で持つ
+
+logs以外は、同じ装置の同じコマンドを取り込み直すと新しい内容に置き換わります(UPSERT)。
+主キーが同じ行は更新し、新しい内容になかった行は削除します。変わっていない行はそのまま残ります。
+logsは追記だけで、同じ行を二度取り込んでも重複しません。
+
+取り込みの間はsynchronousをOFFにして、executemanyで1つのトランザクションにまとめて挿入します。
+ジャーナルはWALなので、取り込みながら別のプロセスから問い合わせることができます。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_store.py
+  $ python bin/cisco_ios_store.py fleet.db load captures/*.log
+  $ python bin/cisco_ios_store.py fleet.db query "SELECT hostname, prefix, masklen FROM routes JOIN devices USING (device_id) WHERE net_start <= 167772673 AND 167772673 <= net_end"
+
+  >>> store = FleetStore(":memory:")
+  >>> lines = []
+  >>> lines.append("sw1#show ip route")
+  >>> lines.append("      10.0.0.0/24 is subnetted, 2 subnets")
+  >>> lines.append("O        10.0.1.0 [110/2] via 192.168.1.2, 7w0d, Vlan101")
+  >>> lines.append("O        10.0.2.0 [110/2] via 192.168.1.2, 7w0d, Vlan101")
+  >>> lines.append("sw1#")
+  >>> store.load_session(lines)
+  2
+  >>> store.covering_routes("10.0.2.5")
+  [('sw1', '10.0.2.0', 24, '192.168.1.2', 'Vlan101')]
+
+  取り込み直すと、なくなった経路は削除されます。
+
+  >>> store.load_session(lines[:3] + lines[4:])
+  1
+  >>> store.covering_routes("10.0.2.5")
+  []
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import itertools
+import socket
+import sqlite3
+import struct
+import time
+from collections import OrderedDict
+
+from cisco_ios_session import CiscoIosSessionSplitter, to_dict
+from cisco_ios_show_logging import CiscoIosLogTimestampParser
+
+#
+# クラス変数
+#
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+  device_id INTEGER PRIMARY KEY,
+  hostname TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+  snapshot_id INTEGER PRIMARY KEY,
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  command TEXT NOT NULL,
+  source TEXT,
+  loaded_at REAL NOT NULL,
+  records INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_device ON snapshots (device_id, command);
+
+CREATE TABLE IF NOT EXISTS routes (
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  snapshot_id INTEGER NOT NULL,
+  proto TEXT,
+  prefix TEXT NOT NULL,
+  masklen INTEGER NOT NULL,
+  net_start INTEGER NOT NULL,
+  net_end INTEGER NOT NULL,
+  gw TEXT NOT NULL,
+  interface TEXT,
+  PRIMARY KEY (device_id, prefix, masklen, gw)
+);
+CREATE INDEX IF NOT EXISTS idx_routes_range ON routes (net_start, net_end);
+CREATE INDEX IF NOT EXISTS idx_routes_interface ON routes (interface);
+
+CREATE TABLE IF NOT EXISTS interfaces (
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  snapshot_id INTEGER NOT NULL,
+  interface TEXT NOT NULL,
+  status TEXT,
+  line_protocol TEXT,
+  description TEXT,
+  duplex TEXT,
+  speed TEXT,
+  media TEXT,
+  output_drops INTEGER,
+  input_bps INTEGER,
+  input_pps INTEGER,
+  output_bps INTEGER,
+  output_pps INTEGER,
+  input_packets INTEGER,
+  input_bytes INTEGER,
+  input_errors INTEGER,
+  crc INTEGER,
+  output_packets INTEGER,
+  output_bytes INTEGER,
+  output_errors INTEGER,
+  PRIMARY KEY (device_id, interface)
+);
+CREATE INDEX IF NOT EXISTS idx_interfaces_interface ON interfaces (interface);
+
+CREATE TABLE IF NOT EXISTS interface_status (
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  snapshot_id INTEGER NOT NULL,
+  interface TEXT NOT NULL,
+  name TEXT,
+  status TEXT,
+  vlan TEXT,
+  duplex TEXT,
+  speed TEXT,
+  type TEXT,
+  PRIMARY KEY (device_id, interface)
+);
+CREATE INDEX IF NOT EXISTS idx_interface_status_interface ON interface_status (interface);
+CREATE INDEX IF NOT EXISTS idx_interface_status_vlan ON interface_status (vlan);
+
+CREATE TABLE IF NOT EXISTS cdp_neighbors (
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  snapshot_id INTEGER NOT NULL,
+  interface TEXT NOT NULL,
+  neighbor TEXT NOT NULL,
+  holdtime INTEGER,
+  capability TEXT,
+  platform TEXT,
+  port_id TEXT,
+  PRIMARY KEY (device_id, interface, neighbor)
+);
+CREATE INDEX IF NOT EXISTS idx_cdp_neighbors_neighbor ON cdp_neighbors (neighbor);
+
+CREATE TABLE IF NOT EXISTS logs (
+  log_id INTEGER PRIMARY KEY,
+  device_id INTEGER NOT NULL REFERENCES devices (device_id),
+  snapshot_id INTEGER NOT NULL,
+  ts INTEGER,
+  date TEXT NOT NULL,
+  facility TEXT NOT NULL,
+  severity INTEGER,
+  mnemonic TEXT NOT NULL,
+  description TEXT NOT NULL,
+  UNIQUE (device_id, date, facility, mnemonic, description)
+);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs (ts);
+CREATE INDEX IF NOT EXISTS idx_logs_device_ts ON logs (device_id, ts);
+CREATE INDEX IF NOT EXISTS idx_logs_mnemonic ON logs (mnemonic);
+"""
+"""テーブルとインデックスの定義"""
+
+#
+# 関数定義
+#
+
+def to_int(value):
+  """数字の文字列を整数にします。数字でなければNoneを返却します
+
+  >>> to_int("123"), to_int(""), to_int(None), to_int(24)
+  (123, None, None, 24)
+  """
+  if isinstance(value, int):
+    return value
+  if value and value.isdigit():
+    return int(value)
+  return None
+
+
+def ipv4_to_int(addr):
+  """IPv4アドレスの文字列を整数にします
+
+  >>> ipv4_to_int("10.0.2.5")
+  167772677
+  """
+  return struct.unpack("!I", socket.inet_aton(addr))[0]
+
+
+def prefix_range(addr, masklen):
+  """プレフィックスの最初と最後のアドレスを整数の組で返却します
+
+  >>> prefix_range("10.0.2.0", 24)
+  (167772672, 167772927)
+  """
+  host_bits = 32 - masklen
+  start = ipv4_to_int(addr) >> host_bits << host_bits
+  return start, start + (1 << host_bits) - 1
+
+
+def classful_masklen(addr):
+  """マスク長が分からない経路に使う、クラスフルなマスク長を返却します
+
+  >>> classful_masklen("10.1.0.0"), classful_masklen("172.16.0.0"), classful_masklen("192.168.1.0")
+  (8, 16, 24)
+  """
+  first = int(addr.split(".", 1)[0])
+  return 8 if first < 128 else 16 if first < 192 else 24
+
+#
+# クラス定義
+#
+
+class FleetStore(object):
+  """パースした結果を装置ごとにSQLiteに格納し、問い合わせるクラスです。"""
+
+  # コマンドと、(テーブル名, 主キーのカラム, レコードを行のタプルにする関数の名前)の対応
+  tables = OrderedDict([
+    ("show ip route", ("routes", ("device_id", "prefix", "masklen", "gw"), "route_row")),
+    ("show interfaces", ("interfaces", ("device_id", "interface"), "interface_row")),
+    ("show interfaces status", ("interface_status", ("device_id", "interface"), "status_row")),
+    ("show cdp neighbors", ("cdp_neighbors", ("device_id", "interface", "neighbor"), "cdp_row")),
+    ("show logging", ("logs", None, "log_row")),
+  ])
+  """主キーがNoneのテーブルは追記だけを行う"""
+
+  def __init__(self, filename, year=None, utc_offset=0):
+    """コンストラクタ
+
+    Arguments:
+      filename {str} -- データベースのファイル名
+
+    Keyword Arguments:
+      year {int} -- 年が含まれていないログに使う年。省略時は今年 (default: {None})
+      utc_offset {int} -- タイムゾーンが含まれていないログのUTCからのオフセット(秒) (default: {0})
+    """
+    self.filename = filename
+    self.conn = sqlite3.connect(filename)
+    self.conn.execute("PRAGMA journal_mode = WAL")
+    self.conn.execute("PRAGMA synchronous = NORMAL")
+    self.conn.execute("PRAGMA foreign_keys = ON")
+    self.conn.executescript(SCHEMA)
+    self.timestamp_parser = CiscoIosLogTimestampParser(year=year, utc_offset=utc_offset)
+    self.columns = {}
+    self.device_cache = {}
+
+
+  def __enter__(self):
+    return self
+
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+
+  def close(self):
+    self.conn.close()
+
+
+  def device_id(self, hostname):
+    """ホスト名に対応する装置の番号を返却します。なければ追加します"""
+    device_id = self.device_cache.get(hostname)
+    if device_id is None:
+      self.conn.execute("INSERT OR IGNORE INTO devices (hostname) VALUES (?)", (hostname,))
+      device_id = self.conn.execute("SELECT device_id FROM devices WHERE hostname = ?", (hostname,)).fetchone()[0]
+      self.device_cache[hostname] = device_id
+    return device_id
+
+
+  def table_columns(self, table):
+    """テーブルのカラム名の一覧を返却します。自動で採番するINTEGER PRIMARY KEYは除きます"""
+    columns = self.columns.get(table)
+    if columns is None:
+      info = self.conn.execute("PRAGMA table_info(%s)" % table).fetchall()
+      pks = [row for row in info if row[5]]
+      rowid = pks[0][1] if len(pks) == 1 and pks[0][2].upper() == "INTEGER" else None
+      columns = self.columns[table] = [row[1] for row in info if row[1] != rowid]
+    return columns
+
+
+  def upsert_sql(self, table, keys):
+    """テーブルに挿入するSQLを作ります。主キーがあれば更新、なければ無視します"""
+    columns = self.table_columns(table)
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (table, ", ".join(columns), ", ".join("?" * len(columns)))
+    if keys is None:
+      return sql.replace("INSERT", "INSERT OR IGNORE", 1)
+    updates = ", ".join("%s = excluded.%s" % (c, c) for c in columns if c not in keys)
+    return sql + " ON CONFLICT (%s) DO UPDATE SET %s" % (", ".join(keys), updates)
+
+  #
+  # レコードを行のタプルにする関数。先頭の2つはdevice_idとsnapshot_id
+  #
+
+  @staticmethod
+  def route_row(ids, d):
+    addr = d["addr"]
+    masklen = to_int(d.get("mask"))
+    if masklen is None:
+      masklen = classful_masklen(addr)
+    start, end = prefix_range(addr, masklen)
+    return ids + (d.get("proto"), addr, masklen, start, end, d.get("gw") or "", (d.get("interface") or "").strip())
+
+
+  @staticmethod
+  def interface_row(ids, d):
+    g = d.get
+    return ids + (g("name"), g("status"), g("line protocol"), g("Description"), g("duplex"), g("speed"), g("media"),
+                  to_int(g("output drops")), to_int(g("5 minute input bps")), to_int(g("5 minute input pps")),
+                  to_int(g("5 minute output bps")), to_int(g("5 minute output pps")),
+                  to_int(g("input packets")), to_int(g("input bytes")), to_int(g("input errors")), to_int(g("crc")),
+                  to_int(g("output packets")), to_int(g("output bytes")), to_int(g("output errors")))
+
+
+  @staticmethod
+  def status_row(ids, d):
+    g = d.get
+    return ids + (g("Port"), g("Name"), g("Status"), g("Vlan"), g("Duplex"), g("Speed"), g("Type"))
+
+
+  @staticmethod
+  def cdp_row(ids, d):
+    g = d.get
+    return ids + (g("local_interface"), g("device_id"), to_int(g("holdtime")), g("capability"), g("platform"), g("port_id"))
+
+
+  def log_row(self, ids, d):
+    date = d.get("date", "")
+    return ids + (self.timestamp_parser.to_epoch(date), date, d.get("facility"), to_int(d.get("severity")), d.get("mnemonic"), d.get("description"))
+
+
+  def load(self, hostname, command, records, source=None):
+    """1台の装置の1つのコマンドの結果を取り込み、取り込んだ件数を返却します
+
+    Arguments:
+      hostname {str} -- ホスト名
+      command {str} -- "show ip route"などの正式なコマンド名
+      records {iterable} -- パーサーがyieldしたもの。リストに溜めずにそのまま流し込みます
+
+    Keyword Arguments:
+      source {str} -- 取り込んだファイル名など (default: {None})
+
+    Returns:
+      int -- 取り込んだ件数
+    """
+    if command not in self.tables:
+      raise ValueError("unsupported command: %s" % command)
+    table, keys, row_func = self.tables[command]
+    row_func = getattr(self, row_func)
+    sql = self.upsert_sql(table, keys)
+
+    conn = self.conn
+    with conn:
+      device_id = self.device_id(hostname)
+
+    # 取り込みの間だけ、電源断に対する安全性よりも速度を優先する
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+      with conn:
+        cursor = conn.execute("INSERT INTO snapshots (device_id, command, source, loaded_at) VALUES (?, ?, ?, ?)",
+                              (device_id, command, source, time.time()))
+        snapshot_id = cursor.lastrowid
+        ids = (device_id, snapshot_id)
+
+        count = [0]
+        def rows():
+          for record in records:
+            count[0] += 1
+            yield row_func(ids, to_dict(record))
+        conn.executemany(sql, rows())
+
+        if keys is not None:
+          # 今回の内容に含まれていなかった行を削除する
+          conn.execute("DELETE FROM %s WHERE device_id = ? AND snapshot_id != ?" % table, ids)
+        conn.execute("UPDATE snapshots SET records = ? WHERE snapshot_id = ?", (count[0], snapshot_id))
+    finally:
+      conn.execute("PRAGMA synchronous = NORMAL")
+    return count[0]
+
+
+  def load_session(self, lines, source=None):
+    """ターミナルのログをコマンドごとに分割して取り込み、取り込んだ件数を返却します
+
+    同じ装置の同じコマンドが続けて現れたら、それぞれを1つの取り込みとして順に置き換えます。
+    """
+    splitter = CiscoIosSessionSplitter()
+    total = 0
+    for (host, command), group in itertools.groupby(splitter.parse(lines), key=lambda r: (r[0], r[1])):
+      if command in self.tables:
+        total += self.load(host, command, (record for _, _, record in group), source)
+    return total
+
+
+  def query(self, sql, params=()):
+    """SQLを実行して、(カラム名の一覧, 行のイテレータ)を返却します"""
+    cursor = self.conn.execute(sql, params)
+    return [c[0] for c in cursor.description or ()], cursor
+
+
+  def covering_routes(self, addr):
+    """addrを含む経路を全装置から探し、(ホスト名, プレフィックス, マスク長, ゲートウェイ, インタフェース)のリストを返却します"""
+    n = ipv4_to_int(addr)
+    sql = ("SELECT hostname, prefix, masklen, gw, interface FROM routes JOIN devices USING (device_id)"
+           " WHERE net_start <= ? AND ? <= net_end ORDER BY hostname, masklen DESC")
+    return self.conn.execute(sql, (n, n)).fetchall()
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import sys
+
+  from cisco_ios_batch import find_files
+  from cisco_ios_input import read_lines
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='load parsed captures into SQLite and query across devices.')
+    parser.add_argument('database', help='SQLite database file')
+    subparsers = parser.add_subparsers(dest='action')
+    load_parser = subparsers.add_parser('load', help='Load terminal logs, split by prompt')
+    load_parser.add_argument('--year', type=int, help='Year of logs without year (default: this year)')
+    load_parser.add_argument('files', nargs='+', help='Files, directories or globs')
+    query_parser = subparsers.add_parser('query', help='Run SQL and print tab separated rows')
+    query_parser.add_argument('sql', help='SQL to run')
+    args = parser.parse_args()
+
+    if args.action == 'load':
+      with FleetStore(args.database, year=args.year) as store:
+        for filename in find_files(args.files):
+          lines = read_lines(filename, errors="replace")
+          try:
+            count = store.load_session(lines, source=filename)
+          finally:
+            lines.close()
+          print("{0}\t{1}".format(filename, count))
+      return 0
+
+    if args.action == 'query':
+      with FleetStore(args.database) as store:
+        columns, rows = store.query(args.sql)
+        print("\t".join(columns))
+        for row in rows:
+          print("\t".join("" if v is None else str(v) for v in row))
+      return 0
+
+    parser.print_help()
+    return 1
+
+
+  # 実行
+  sys.exit(main())
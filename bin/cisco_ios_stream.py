@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""パーサーの結果をリストに溜めずに、画面表示と保存へ流すための部品です。
+
+各スクリプトの--streamでは、次のようにジェネレータをつなぎます。
+
+  get_lines() -> parse() -> RecordCounter -> tap(絞り込んで表示) -> RecordSink
+
+レコードは1件ずつ表示と保存に流れていきますので、メモリの使用量は入力の大きさによらずほぼ一定です。
+保存はRecordSinkの書き出し用のスレッドが行い、キューの長さも上限がありますので、書き出しが遅くても溜まり続けることはありません。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_stream.py
+
+  >>> shown = []
+  >>> counter = RecordCounter()
+  >>> records = tap(counter(iter([1, 2, 3, 4])), lambda x: x % 2 == 0, shown.append)
+  >>> list(records), shown, counter.count
+  ([1, 2, 3, 4], [2, 4], 4)
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import sys
+
+#
+# クラス定義
+#
+
+class RecordCounter(object):
+  """レコードを素通ししながら数え、every件ごとにその時点の件数を表示するクラスです。
+
+  表示は同じ行を書き換えますので、標準出力に出す結果と混ざらないように既定では標準エラー出力に出します。
+
+  >>> import io
+  >>> out = io.StringIO()
+  >>> counter = RecordCounter(every=2, stream=out, label="interfaces")
+  >>> sum(1 for _ in counter(range(5)))
+  5
+  >>> out.getvalue().split("\\r")[1:]
+  ['2 interfaces', '4 interfaces', '5 interfaces\\n']
+  """
+
+  def __init__(self, every=0, stream=None, label="records"):
+    """コンストラクタ
+
+    Keyword Arguments:
+      every {int} -- 件数を表示する間隔。0なら表示しない (default: {0})
+      stream {file} -- 表示先。省略時は標準エラー出力 (default: {None})
+      label {str} -- 件数の後ろに付ける言葉 (default: {"records"})
+    """
+    self.every = every
+    self.stream = stream
+    self.label = label
+    self.count = 0
+
+
+  def show(self, end=""):
+    """その時点の件数を表示します"""
+    stream = self.stream or sys.stderr
+    stream.write("\r{0:,} {1}{2}".format(self.count, self.label, end))
+    stream.flush()
+
+
+  def __call__(self, records):
+    """recordsを数えながらyieldします"""
+    every = self.every
+    for record in records:
+      self.count += 1
+      if every and self.count % every == 0:
+        self.show()
+      yield record
+    if every:
+      self.show("\n")
+
+#
+# 関数定義
+#
+
+def tap(records, predicate, func):
+  """recordsをそのままyieldし、predicateに一致したものだけfuncにも渡します。
+
+  絞り込んで画面に表示しながら、全件を保存するときに使います。predicateがNoneなら全件をfuncに渡します。
+
+  Arguments:
+    records {iterable} -- レコード
+    predicate {function} -- レコードを受け取り、funcに渡すかどうかを返す関数
+    func {function} -- 一致したレコードを受け取る関数
+  """
+  for record in records:
+    if predicate is None or predicate(record):
+      func(record)
+    yield record
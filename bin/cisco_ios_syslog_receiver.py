@@ -0,0 +1,704 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Cisco IOS装置からのsyslogを直接受信して、show loggingと同じ形式の辞書型に変換します。
+
+syslogをいったんファイルに書いてからCiscoIosShowLoggingParserでパースし直す代わりに、
+受信したメッセージからsyslogのヘッダを取り除いて、そのままパースします。
+
+  受信      UDP/TCP(改行区切り、またはRFC6587のoctet counting)
+  キュー    上限付き。UDPはあふれたら捨てて数える。TCPは空くまで読むのを待つ(バックプレッシャー)
+  パース    CiscoIosShowLoggingParserの正規表現
+  出力      バッチ単位でcisco_ios_sinkのRecordSink(JSON Lines、SQLiteなど)に渡す
+
+動作確認用に、testdata/show_logging.logのメッセージを送り続ける負荷生成機能も持っています。
+
+benchで20万件を送ったときの計測例です。CPU 1コアの仮想マシンで、負荷生成のプロセスも同じコアで動かしています。
+
+  TCP                  取りこぼしなし。受信側のCPU時間あたり約14万〜18万件/秒、経過時間では約9万〜10万件/秒
+  UDP(送信制限なし)    受信側のキューがあふれて約17%を捨てる。パースできた分は経過時間で約5万件/秒
+  UDP(--rate 50000)    取りこぼしなし
+  JSON LinesとSQLite   両方に保存すると受信側のCPU時間あたり約4.6万件/秒
+
+1コアで10万件/秒に届くのは、保存しない場合のTCPだけです。
+UDPで取りこぼしたくない場合は、送信側の速さを抑えるかTCPを使ってください。
+
+Examples:
+  $ python -m doctest bin/cisco_ios_syslog_receiver.py
+  $ python bin/cisco_ios_syslog_receiver.py listen --port 5514 --jsonl syslog.jsonl
+  $ python bin/cisco_ios_syslog_receiver.py loadgen --port 5514 -n 100000
+  $ python bin/cisco_ios_syslog_receiver.py bench -n 200000 --proto tcp
+"""
+
+__author__ = 'Takamitsu IIDA'
+__version__ = '0.1'
+__date__ = '2026/10/18'  # 初版
+
+#
+# 標準ライブラリのインポート
+#
+import asyncio
+import re
+import socket
+import time
+from collections import OrderedDict, deque
+
+from cisco_ios_pattern import compile_once
+from cisco_ios_show_logging import CiscoIosShowLoggingParser
+from cisco_ios_sink import RecordSink, open_sink
+
+#
+# クラス定義
+#
+
+class SyslogMessageParser(object):
+  """syslogのメッセージからヘッダを取り除き、IOSのログ部分をパースするクラスです。
+
+  次のようなヘッダに対応しています。
+
+    <189>123: Sep  5 22:56:48.497: %LINK-...                      IOSから直接(シーケンス番号あり)
+    <189>Sep  5 22:56:48 10.1.1.1 123: Sep  5 22:56:48.497: %...  RFC3164(リレー経由でホスト名付き)
+    <189>1 2016-09-05T22:56:48Z router1 - - - - Sep  5 ...: %...  RFC5424
+  """
+
+  # <PRI>とRFC5424のバージョン、タイムスタンプ、ホスト名、アプリ名、PROCID、MSGID、構造化データ
+  rex_rfc5424 = re.compile(r"^<\d{1,3}>\d{1,2} \S+ (?P<host>\S+) \S+ \S+ \S+ (?:-|\[.*?\]) ?")
+
+  # <PRI>とRFC3164のタイムスタンプ、ホスト名
+  rex_rfc3164 = re.compile(r"^<\d{1,3}>(?:[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d (?P<host>[^\s:]+) )?")
+
+  # parse()で使う、どちらかのヘッダとIOSのログ部分をまとめて1回で取り出すための前半部分
+  message_header = r"^(?:<\d{1,3}>(?:\d{1,2} \S+ (?P<host>\S+) \S+ \S+ \S+ (?:-|\[.*?\]) ?|(?:[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d (?P<host3164>[^\s:]+) )?))?"
+
+  def __init__(self, parser=None):
+    """コンストラクタ
+
+    Keyword Arguments:
+      parser {CiscoIosShowLoggingParser} -- IOSのログ部分のパーサー (default: {None})
+    """
+    self.parser = parser if parser else CiscoIosShowLoggingParser()
+    self.fieldnames = ["host"] + list(self.parser.fieldnames)
+    self.rex_message = compile_once(self.message_header + self.parser.rex_log.pattern.lstrip("^"))
+
+
+  def strip_header(self, message):
+    """syslogのヘッダを取り除いて(ホスト名, IOSのログ部分)を返却します。ホスト名がなければNoneです。
+
+    >>> p = SyslogMessageParser()
+    >>> p.strip_header("<187>123: Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102, changed state to down")
+    (None, '123: Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102, changed state to down')
+    >>> p.strip_header("<187>Sep  5 22:56:48 10.1.1.1 123: Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102")
+    ('10.1.1.1', '123: Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102')
+    >>> p.strip_header("<187>1 2016-09-05T22:56:48Z router1 - - - - Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102")
+    ('router1', 'Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102')
+    """
+    m = self.rex_rfc5424.match(message)
+    if m is None:
+      m = self.rex_rfc3164.match(message)
+    if m is None:
+      return None, message
+    return m.group("host"), message[m.end():]
+
+
+  def parse(self, message, peer=None):
+    """syslogのメッセージを辞書型にして返却します。IOSのログの形式でなければNoneを返します。
+
+    ヘッダにホスト名がなければ、送信元のアドレス(peer)をhostにします。
+
+    >>> d = SyslogMessageParser().parse("<187>Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102, changed state to down\\n", "10.1.1.1")
+    >>> d["host"], d["facility"], d["description"]
+    ('10.1.1.1', 'LINK-SW1', 'Interface Vlan102, changed state to down')
+    """
+    # strip_header()とrex_logを順に使うのと同じ結果を、正規表現1回で得る
+    m = self.rex_message.match(message.rstrip())
+    if not m:
+      return None
+    groups = m.groups()
+    return OrderedDict(zip(self.fieldnames, (groups[0] or groups[1] or peer or "",) + groups[2:]))
+
+
+class CallbackSink(RecordSink):
+  """受信したログをまとまりごとにコールバック関数に渡すRecordSinkです。
+
+  コールバック関数は書き出し用のスレッドで呼ばれます。
+  """
+
+  def __init__(self, callback, batch_size=None, queue_size=None):
+    """コンストラクタ
+
+    Arguments:
+      callback {function} -- 辞書型の配列を受け取る関数
+    """
+    self.callback = callback
+    super(CallbackSink, self).__init__(None, batch_size=batch_size, queue_size=queue_size)
+
+
+  def open(self):
+    pass
+
+
+  def write_batch(self, batch):
+    self.callback(batch)
+
+
+  def finish(self):
+    pass
+
+
+class MessageBuffer(object):
+  """受信したメッセージをパースするまで溜めておく上限付きのバッファです。
+
+  asyncio.Queueはメッセージごとにコルーチンの切り替えが発生して遅いので、dequeとイベントで実装しています。
+  put_nowait()はいっぱいならFalseを返し、put()は空きができるまで待ちます。
+  """
+
+  def __init__(self, maxsize):
+    self.maxsize = maxsize
+    self.items = deque()
+    self.not_empty = asyncio.Event()
+    self.not_full = asyncio.Event()
+    self.not_full.set()
+    self.closed = False
+
+
+  def __len__(self):
+    return len(self.items)
+
+
+  def put_nowait(self, item):
+    """itemを追加します。いっぱいなら追加せずにFalseを返します。"""
+    items = self.items
+    if len(items) >= self.maxsize:
+      return False
+    items.append(item)
+    self.not_empty.set()
+    if len(items) >= self.maxsize:
+      self.not_full.clear()
+    return True
+
+
+  async def put(self, item):
+    """itemを追加します。いっぱいなら空きができるまで待ちます。"""
+    while not self.put_nowait(item):
+      await self.not_full.wait()
+
+
+  async def put_many(self, items):
+    """itemsを順に追加します。入りきらない分は空きができるまで待ちます。"""
+    while items:
+      room = self.maxsize - len(self.items)
+      if room <= 0:
+        await self.not_full.wait()
+        continue
+      self.items.extend(items[:room])
+      items = items[room:]
+      self.not_empty.set()
+      if len(self.items) >= self.maxsize:
+        self.not_full.clear()
+
+
+  def take(self, n):
+    """最大n個を取り出して配列で返却します"""
+    items = self.items
+    n = min(n, len(items))
+    taken = [items.popleft() for _ in range(n)]
+    if not items:
+      self.not_empty.clear()
+    if len(items) < self.maxsize:
+      self.not_full.set()
+    return taken
+
+
+  def close(self):
+    """これ以上追加されないことを知らせます"""
+    self.closed = True
+    self.not_empty.set()
+
+
+class SyslogReceiver(object):
+  """UDP/TCPでsyslogを受信し、パースしてバッチ単位で出力先に渡すクラスです。
+
+  >>> received = []
+  >>> receiver = SyslogReceiver([CallbackSink(received.extend)], port=0, proto="udp")
+  >>> async def run():
+  ...   await receiver.start()
+  ...   port = receiver.server_port()
+  ...   await send_messages("127.0.0.1", port, ["<187>Sep  5 22:56:48.497: %LINK-SW1-3-UPDOWN: Interface Vlan102, changed state to down"], proto="udp")
+  ...   await asyncio.sleep(0.2)
+  ...   await receiver.stop()
+  >>> asyncio.run(run())
+  >>> received[0]["host"], received[0]["mnemonic"]
+  ('127.0.0.1', 'UPDOWN')
+  >>> receiver.stats["parsed"], receiver.stats["dropped"]
+  (1, 0)
+  """
+
+  # UDPの受信バッファのサイズ
+  rcvbuf = 8 * 1024 * 1024
+
+  # TCPで一度に読むバイト数
+  read_size = 256 * 1024
+
+  def __init__(self, sinks, host="127.0.0.1", port=514, proto="udp", queue_size=100000, batch_size=1000, flush_interval=0.5, message_parser=None):
+    """コンストラクタ
+
+    Arguments:
+      sinks {list} -- 出力先のRecordSinkのリスト
+
+    Keyword Arguments:
+      host {str} -- 待ち受けるアドレス (default: {"127.0.0.1"})
+      port {int} -- 待ち受けるポート。0なら空いているポート (default: {514})
+      proto {str} -- "udp"または"tcp" (default: {"udp"})
+      queue_size {int} -- パース待ちのメッセージの上限 (default: {100000})
+      batch_size {int} -- 出力先にまとめて渡す件数 (default: {1000})
+      flush_interval {float} -- バッチが埋まらなくても出力する間隔(秒) (default: {0.5})
+    """
+    self.sinks = sinks
+    self.host = host
+    self.port = port
+    self.proto = proto
+    self.queue_size = queue_size
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.message_parser = message_parser if message_parser else SyslogMessageParser()
+    self.stats = OrderedDict([("received", 0), ("parsed", 0), ("unparsed", 0), ("dropped", 0), ("batches", 0)])
+    self.queue = None
+    self.sock = None
+    self.server = None
+    self.worker = None
+
+
+  async def start(self):
+    """受信を開始します"""
+    loop = asyncio.get_running_loop()
+    self.queue = MessageBuffer(self.queue_size)
+    if self.proto == "udp":
+      # asyncioのDatagramProtocolは1回の通知で1個しか読まないので、ソケットを直接読んで溜まっている分を全部取り出す
+      sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      try:
+        # 取りこぼしを減らすためにカーネルの受信バッファを大きくしておく
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+      except OSError:
+        pass
+      sock.bind((self.host, self.port))
+      sock.setblocking(False)
+      self.sock = sock
+      loop.add_reader(sock.fileno(), self.read_udp)
+    else:
+      self.server = await asyncio.start_server(self.handle_tcp, self.host, self.port)
+    self.worker = asyncio.ensure_future(self.consume())
+
+
+  def server_port(self):
+    """実際に待ち受けているポート番号を返却します"""
+    if self.sock is not None:
+      return self.sock.getsockname()[1]
+    return self.server.sockets[0].getsockname()[1]
+
+
+  async def stop(self):
+    """受信を止め、キューに残ったメッセージを出力してから出力先を閉じます"""
+    if self.sock is not None:
+      asyncio.get_running_loop().remove_reader(self.sock.fileno())
+      self.sock.close()
+    if self.server is not None:
+      self.server.close()
+      await self.server.wait_closed()
+    self.queue.close()
+    await self.worker
+    for sink in self.sinks:
+      sink.close()
+
+
+  def read_udp(self):
+    """UDPのソケットに溜まっているデータグラムを全部読んでバッファに入れます。いっぱいなら捨てて数えます。"""
+    recvfrom = self.sock.recvfrom
+    put_nowait = self.queue.put_nowait
+    stats = self.stats
+    while True:
+      try:
+        data, addr = recvfrom(65535)
+      except (BlockingIOError, InterruptedError):
+        return
+      stats["received"] += 1
+      if not put_nowait((data.decode("utf-8", errors="replace"), addr[0])):
+        stats["dropped"] += 1
+
+
+  async def handle_tcp(self, reader, writer):
+    """TCPの接続からメッセージを読み出してキューに入れます。キューが空くまで次を読みません。
+
+    接続の先頭が数字ならRFC6587のoctet counting("長さ 空白 メッセージ")、そうでなければ改行区切りとみなします。
+    メッセージごとに読むとasyncioの呼び出しが重いので、届いている分をまとめて読んでから区切ります。
+    """
+    peer = writer.get_extra_info("peername")[0]
+    octet_counting = None
+    rest = b""
+    try:
+      while True:
+        data = await reader.read(self.read_size)
+        if not data:
+          break
+        rest += data
+        if octet_counting is None:
+          octet_counting = rest[:1].isdigit()
+        messages, rest = split_frames(rest, octet_counting)
+        if len(rest) > self.read_size:
+          # 区切りの来ないメッセージを溜め続けないように接続を切る
+          break
+        if messages:
+          self.stats["received"] += len(messages)
+          await self.queue.put_many([(m.decode("utf-8", errors="replace"), peer) for m in messages])
+      # 改行で終わっていない最後のメッセージ
+      if rest and not octet_counting and len(rest) <= self.read_size:
+        self.stats["received"] += 1
+        await self.queue.put((rest.decode("utf-8", errors="replace"), peer))
+    except (ValueError, ConnectionError):
+      pass
+    finally:
+      writer.close()
+
+
+  async def consume(self):
+    """バッファからメッセージを取り出してパースし、バッチ単位で出力先に渡します
+
+    バッチが埋まるか、flush_interval秒たっても新しいメッセージが来なければ出力します。
+    """
+    parse = self.message_parser.parse
+    queue = self.queue
+    batch = []
+    while True:
+      if not queue:
+        if queue.closed:
+          break
+        if batch:
+          try:
+            await asyncio.wait_for(queue.not_empty.wait(), self.flush_interval)
+          except asyncio.TimeoutError:
+            self.flush(batch)
+            batch = []
+            continue
+        else:
+          await queue.not_empty.wait()
+        continue
+
+      for message, peer in queue.take(self.batch_size - len(batch)):
+        d = parse(message, peer)
+        if d is None:
+          self.stats["unparsed"] += 1
+        else:
+          batch.append(d)
+      if len(batch) >= self.batch_size:
+        self.flush(batch)
+        batch = []
+      # 受信側にも処理を回す
+      await asyncio.sleep(0)
+
+    if batch:
+      self.flush(batch)
+
+
+  def flush(self, batch):
+    """バッチを出力先に渡します。書き出しは各RecordSinkのスレッドが行います"""
+    self.stats["parsed"] += len(batch)
+    self.stats["batches"] += 1
+    for sink in self.sinks:
+      sink.extend(batch)
+      # RecordSinkのbatch_sizeに満たなくても、受信側のバッチごとに書き出しに回す
+      sink.flush()
+
+
+def split_frames(data, octet_counting=False):
+  """TCPで受信したバイト列をメッセージに区切り、(メッセージの配列, 残りのバイト列)を返却します
+
+  残りのバイト列は途中までしか届いていないメッセージで、次に受信したものの前につなげます。
+
+  >>> split_frames(b"<187>a\\n<187>b\\n<187>c")
+  ([b'<187>a', b'<187>b'], b'<187>c')
+  >>> split_frames(b"6 <187>a6 <187>b6 <18", octet_counting=True)
+  ([b'<187>a', b'<187>b'], b'6 <18')
+  """
+  if not octet_counting:
+    messages = data.split(b"\n")
+    rest = messages.pop()
+    return messages, rest
+
+  messages = []
+  pos = 0
+  end = len(data)
+  while pos < end:
+    space = data.find(b" ", pos)
+    if space < 0:
+      break
+    length = int(data[pos:space])
+    if space + 1 + length > end:
+      break
+    messages.append(data[space + 1:space + 1 + length])
+    pos = space + 1 + length
+  return messages, data[pos:]
+
+
+async def send_messages(host, port, messages, proto="udp", rate=0):
+  """syslogのメッセージを送信します。負荷生成や動作確認に使います。
+
+  Arguments:
+    host {str} -- 送信先のアドレス
+    port {int} -- 送信先のポート
+    messages {iterable} -- 送信するメッセージ
+
+  Keyword Arguments:
+    proto {str} -- "udp"または"tcp" (default: {"udp"})
+    rate {int} -- 1秒あたりの送信数の上限。0なら無制限 (default: {0})
+
+  Returns:
+    int -- 送信した件数
+  """
+  loop = asyncio.get_running_loop()
+  count = 0
+  start = time.perf_counter()
+  if proto == "udp":
+    transport, _protocol = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    send = lambda m: transport.sendto(m.encode("utf-8"))
+  else:
+    reader, writer = await asyncio.open_connection(host, port)
+    send = lambda m: writer.write(m.encode("utf-8") + b"\n")
+
+  # UDPは受信側に処理する時間を与えないとカーネルで捨てられるので、こまめに制御を返す
+  interval = 1000 if proto == "tcp" else 50
+  for message in messages:
+    send(message)
+    count += 1
+    if count % interval == 0:
+      if proto == "tcp":
+        await writer.drain()
+      if rate:
+        wait = count / rate - (time.perf_counter() - start)
+        if wait > 0:
+          await asyncio.sleep(wait)
+      else:
+        await asyncio.sleep(0)
+
+  if proto == "udp":
+    transport.close()
+  else:
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+  return count
+
+
+def generate_messages(filename, count, pri=187):
+  """filenameに含まれるIOSのログを繰り返して、syslogのメッセージをcount個yieldします"""
+  parser = CiscoIosShowLoggingParser()
+  with open(filename, mode="r", encoding="utf-8") as f:
+    logs = [line.rstrip() for line in f if parser.rex_log.match(line.rstrip())]
+  for i in range(count):
+    yield "<%d>%d: %s" % (pri, i, logs[i % len(logs)])
+
+
+def run_load_generator(host, port, filename, count, proto="udp", rate=0):
+  """別プロセスで負荷を生成するときの入り口です。send_messages()の結果を返却します。"""
+  return asyncio.run(send_messages(host, port, generate_messages(filename, count), proto=proto, rate=rate))
+
+
+#
+# ここからスクリプト
+#
+if __name__ == '__main__':
+
+  import argparse
+  import configparser  # python3 only
+  import logging
+  import multiprocessing
+  import os
+  import sys
+
+  #
+  # 共通スクリプト
+  #
+
+  def here(path=''):
+    """相対パスを絶対パスに変換して返却します"""
+    if getattr(sys, 'frozen', False):
+      # cx_Freezeで固めた場合は実行ファイルからの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(sys.executable), path))
+    else:
+      # 通常はこのファイルの場所からの相対パス
+      return os.path.abspath(os.path.join(os.path.dirname(__file__), path))
+
+  # ./libフォルダにおいたpythonスクリプトをインポートできるようにするための処理
+  if not here("../lib") in sys.path:
+    sys.path.append(here("../lib"))
+
+  if not here("../lib/site-packages") in sys.path:
+    sys.path.append(here("../lib/site-packages"))
+
+  # アプリケーションのホームディレクトリは一つ上
+  app_home = here("..")
+
+  # 自身の名前から拡張子を除いてプログラム名を得る
+  app_name = os.path.splitext(os.path.basename(__file__))[0]
+
+  # ディレクトリ
+  conf_dir = os.path.join(app_home, "conf")
+  testdata_dir = os.path.join(app_home, "testdata")
+
+  #
+  # 設定ファイルを読む
+  #
+
+  # 設定ファイルのパス
+  config_file = os.path.join(conf_dir, "config.ini")  # $app_home/conf/config.ini
+
+  if not os.path.exists(config_file):
+    logging.error("File not found %s : ", config_file)
+    sys.exit(1)
+
+  try:
+    cp = configparser.ConfigParser()
+    cp.read(config_file, encoding='utf8')
+
+    # [default] セクション
+    config = cp['default']
+
+    # ログをファイルに残すか
+    USE_FILE_HANDLER = config.getboolean('USE_FILE_HANDLER', False)
+
+  except configparser.Error as e:
+    logging.exception(e)
+    sys.exit(1)
+
+  #
+  # ログ設定
+  #
+
+  # ログファイルの名前
+  log_file = app_name + ".log"
+
+  # ログファイルを置くディレクトリ
+  log_dir = os.path.join(app_home, "log")
+  try:
+    if not os.path.isdir(log_dir):
+      os.makedirs(log_dir)
+  except OSError:
+    pass
+
+  # ロガーを取得
+  logger = logging.getLogger(app_name)  # __package__
+
+  # ログレベル設定
+  logger.setLevel(logging.INFO)
+
+  # フォーマット
+  formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+  # 標準出力へのハンドラ
+  stdout_handler = logging.StreamHandler(sys.stdout)
+  stdout_handler.setFormatter(formatter)
+  stdout_handler.setLevel(logging.INFO)
+  logger.addHandler(stdout_handler)
+
+  # ログファイルのハンドラ
+  if USE_FILE_HANDLER:
+    file_handler = logging.FileHandler(os.path.join(log_dir, log_file), 'a+')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.addHandler(file_handler)
+
+  #
+  # 固有スクリプト
+  #
+
+  def make_sinks(args, fieldnames):
+    """引数で指定された出力先のリストを返却します。どちらも既存のファイルに追記します"""
+    sinks = []
+    if args.jsonl:
+      sinks.append(open_sink(args.jsonl, "jsonl", fieldnames, batch_size=args.batch_size, append=True))
+    if args.sqlite:
+      sinks.append(open_sink(args.sqlite, "sqlite", fieldnames, batch_size=args.batch_size, append=True, table="syslog"))
+    return sinks
+
+
+  async def listen(args):
+    """Ctrl-Cで止めるまで受信し続けます"""
+    receiver = SyslogReceiver(make_sinks(args, SyslogMessageParser().fieldnames), host=args.host, port=args.port, proto=args.proto,
+                              queue_size=args.queue_size, batch_size=args.batch_size)
+    await receiver.start()
+    logger.info("listening on %s/%s %s", args.host, receiver.server_port(), args.proto)
+    try:
+      while True:
+        await asyncio.sleep(10)
+        logger.info(", ".join("%s=%s" % (k, v) for k, v in receiver.stats.items()))
+    finally:
+      await receiver.stop()
+
+
+  async def loadgen(args):
+    """testdataのログを繰り返して送信します"""
+    start = time.perf_counter()
+    count = await send_messages(args.host, args.port, generate_messages(args.input_filename, args.count), proto=args.proto, rate=args.rate)
+    elapsed = time.perf_counter() - start
+    logger.info("sent %s messages in %.2f sec (%.0f msgs/sec)", count, elapsed, count / elapsed)
+
+
+  async def bench(args):
+    """受信と負荷生成を別プロセスで同時に動かし、受信側1コアでの処理速度を計測します"""
+    counter = [0]
+    sinks = make_sinks(args, SyslogMessageParser().fieldnames)
+    sinks.append(CallbackSink(lambda records: counter.__setitem__(0, counter[0] + len(records))))
+    receiver = SyslogReceiver(sinks, host="127.0.0.1", port=0, proto=args.proto, queue_size=args.queue_size, batch_size=args.batch_size)
+    await receiver.start()
+
+    sender = multiprocessing.Process(target=run_load_generator,
+                                     args=("127.0.0.1", receiver.server_port(), args.input_filename, args.count, args.proto, args.rate))
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    sender.start()
+
+    # 送信が終わり、受信が落ち着くまで待つ
+    last = -1
+    while sender.is_alive() or last != receiver.stats["received"]:
+      last = receiver.stats["received"]
+      await asyncio.sleep(0.2)
+    await receiver.stop()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    sender.join()
+
+    # 送信側と同じコアで動かすと経過時間は送信側の速さで決まるので、受信側のCPU時間あたりの件数も出す
+    logger.info(", ".join("%s=%s" % (k, v) for k, v in receiver.stats.items()))
+    logger.info("%s of %s records in %.2f sec (%.0f msgs/sec)", counter[0], args.count, elapsed, counter[0] / elapsed)
+    logger.info("receiver used %.2f cpu sec (%.0f msgs/cpu sec)", cpu, receiver.stats["received"] / cpu if cpu else 0)
+
+
+  def main():
+    """メイン関数
+
+    Returns:
+      int -- 正常終了は0、異常時はそれ以外を返却
+    """
+
+    # 引数処理
+    parser = argparse.ArgumentParser(description='syslog receiver for Cisco IOS.')
+    parser.add_argument('command', choices=['listen', 'loadgen', 'bench'], help='listen, send test messages, or measure both in one process')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on / send to')
+    parser.add_argument('--port', type=int, default=5514, help='UDP/TCP port')
+    parser.add_argument('--proto', choices=['udp', 'tcp'], default='udp', help='Transport')
+    parser.add_argument('--jsonl', metavar='file', help='Append records to this JSON Lines file')
+    parser.add_argument('--sqlite', metavar='file', help='Insert records into this SQLite database')
+    parser.add_argument('--queue-size', dest='queue_size', type=int, default=100000, help='Max messages waiting to be parsed')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000, help='Records per sink write')
+    parser.add_argument('-n', '--count', type=int, default=100000, help='Messages to send (loadgen, bench)')
+    parser.add_argument('--rate', type=int, default=0, help='Max messages/sec to send, 0 for unlimited (loadgen, bench)')
+    parser.add_argument('--input', dest='input_filename', default=os.path.join(testdata_dir, "show_logging.log"), help='Log file to replay (loadgen, bench)')
+    args = parser.parse_args()
+
+    command = {"listen": listen, "loadgen": loadgen, "bench": bench}[args.command]
+    try:
+      asyncio.run(command(args))
+    except KeyboardInterrupt:
+      pass
+    return 0
+
+
+  # 実行
+  sys.exit(main())